@@ -5,6 +5,8 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from database import Database
 from payments import PaymentSystem
 from confirmations import ConfirmationSystem
+from catalog import Catalog
+from paginator import ItemPaginator
 from config import *
 import random
 
@@ -17,6 +19,7 @@ class AccessoryShop:
         self.db = db
         self.payments = payments
         self.confirmations = confirmations
+        self.paginator = ItemPaginator(db)
         
         # Стандартные аксессуары
         self.default_accessories = [
@@ -86,13 +89,42 @@ class AccessoryShop:
             }
         ]
         
-        # Здесь будут храниться кастомные аксессуары от админа
+        # Аксессуары от администрации (приходят из кэша товаров)
         self.custom_accessories = []
+        
+        self.category_map = {
+            'glasses': 'очки',
+            'watches': 'часы',
+            'shoes': 'обувь',
+            'clothes': 'одежда',
+            'jewelry': 'украшения',
+            'hats': 'головные уборы'
+        }
+        self.category_keys = {name: key for key, name in self.category_map.items()}
+        
+        self.rebuild_catalog()
 
     def get_all_accessories(self):
         """Получить все аксессуары (стандартные + кастомные)"""
         return self.default_accessories + self.custom_accessories
 
+    def rebuild_catalog(self):
+        """Пересобрать каталог после изменения списка аксессуаров"""
+        self.catalog = Catalog(
+            self.get_all_accessories(),
+            item_text=lambda item: (
+                f"{item['name']}\n"
+                f"   📝 {item['description']}\n"
+                f"   💰 {item['price']:,}{CURR}\n"
+                f"   ✨ Стиль: {item['style']}%\n\n"
+            ),
+            item_button=lambda item: f"{item['name']} - {item['price']:,}{CURR}",
+            view_prefix='acc_view_',
+            page_prefix='acc_page_',
+            footer=[InlineKeyboardButton("◀️ Назад", callback_data="accessories_menu")],
+            category_of=lambda item: self.category_keys.get(item.get('category'), item.get('category'))
+        )
+
     async def show_accessories_menu(self, message: types.Message):
         """Главное меню магазина аксессуаров"""
         keyboard = InlineKeyboardMarkup(row_width=2)
@@ -115,73 +147,32 @@ class AccessoryShop:
             reply_markup=keyboard
         )
 
-    async def show_by_category(self, callback_query: types.CallbackQuery, category: str):
+    async def show_by_category(self, callback_query: types.CallbackQuery, category: str, page: int = 1):
         """Показать аксессуары по категории"""
-        category_map = {
-            'glasses': 'очки',
-            'watches': 'часы',
-            'shoes': 'обувь',
-            'clothes': 'одежда',
-            'jewelry': 'украшения',
-            'hats': 'головные уборы'
-        }
-        
-        cat_name = category_map.get(category, category)
-        all_items = self.get_all_accessories()
-        items = [i for i in all_items if i.get('category') == cat_name]
+        catalog_page = self.catalog.page(category, page)
         
-        if not items:
+        if not catalog_page:
             await callback_query.answer("❌ В этой категории пока нет товаров!", show_alert=True)
             return
         
-        text = f"👕 *{cat_name.upper()}*\n\n"
-        
-        for item in items:
-            text += f"{item['name']}\n"
-            text += f"   📝 {item['description']}\n"
-            text += f"   💰 {item['price']:,}{CURR}\n"
-            text += f"   ✨ Стиль: {item['style']}%\n\n"
+        if category == 'all':
+            title = "ВСЕ АКСЕССУАРЫ"
+        else:
+            title = self.category_map.get(category, category).upper()
         
-        keyboard = InlineKeyboardMarkup(row_width=1)
-        for item in items:
-            keyboard.add(InlineKeyboardButton(
-                f"{item['name']} - {item['price']:,}{CURR}",
-                callback_data=f"acc_view_{item['id']}"
-            ))
-        
-        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="accessories_menu"))
+        text = f"👕 *{title}*\n\n{catalog_page.text}"
         
-        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
+        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=catalog_page.keyboard)
 
-    async def show_all(self, callback_query: types.CallbackQuery):
+    async def show_all(self, callback_query: types.CallbackQuery, page: int = 1):
         """Показать все аксессуары"""
-        items = self.get_all_accessories()
-        
-        text = "👕 *ВСЕ АКСЕССУАРЫ*\n\n"
-        
-        for item in items:
-            text += f"{item['name']}\n"
-            text += f"   📝 {item['description']}\n"
-            text += f"   💰 {item['price']:,}{CURR}\n"
-            text += f"   ✨ Стиль: {item['style']}%\n\n"
-        
-        keyboard = InlineKeyboardMarkup(row_width=1)
-        for item in items:
-            keyboard.add(InlineKeyboardButton(
-                f"{item['name']} - {item['price']:,}{CURR}",
-                callback_data=f"acc_view_{item['id']}"
-            ))
-        
-        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="accessories_menu"))
-        
-        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
+        await self.show_by_category(callback_query, 'all', page)
 
     async def view_accessory(self, callback_query: types.CallbackQuery, state: FSMContext):
         """Просмотр конкретного аксессуара"""
         item_id = int(callback_query.data.replace('acc_view_', ''))
         
-        all_items = self.get_all_accessories()
-        item = next((i for i in all_items if i['id'] == item_id), None)
+        item = self.catalog.get(item_id)
         
         if not item:
             await callback_query.answer("❌ Товар не найден!", show_alert=True)
@@ -192,11 +183,21 @@ class AccessoryShop:
         text = f"{item['name']}\n\n"
         text += f"📝 {item['description']}\n\n"
         text += f"💰 Цена: {item['price']:,}{CURR}\n"
-        text += f"✨ Стиль: {item['style']}%\n\n"
-        text += f"💳 Ваш баланс: {user['balance']:,}{CURR}\n"
+        text += f"✨ Стиль: {item['style']}%\n"
+        
+        in_stock = True
+        if 'catalog_id' in item:
+            stock_item = await self.db.get_catalog_item(item['catalog_id'])
+            in_stock = bool(stock_item and stock_item['stock'] > 0)
+            text += f"📦 В наличии: {stock_item['stock'] if stock_item else 0} шт\n"
         
-        can_afford = user['balance'] >= item['price']
-        status = "✅ Доступно для покупки" if can_afford else "❌ Недостаточно средств"
+        text += f"\n💳 Ваш баланс: {user['balance']:,}{CURR}\n"
+        
+        can_afford = user['balance'] >= item['price'] and in_stock
+        if can_afford:
+            status = "✅ Доступно для покупки"
+        else:
+            status = "❌ Недостаточно средств" if in_stock else "❌ Нет в наличии"
         text += status
         
         keyboard = InlineKeyboardMarkup(row_width=2)
@@ -204,15 +205,18 @@ class AccessoryShop:
             keyboard.add(InlineKeyboardButton("✅ Купить", callback_data=f"acc_buy_{item['id']}"))
         keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="acc_all"))
         
-        await state.update_data(accessory=item)
+        await state.update_data(accessory=dict(item))
         await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
     async def confirm_buy(self, callback_query: types.CallbackQuery, state: FSMContext):
         """Подтверждение покупки"""
         item_id = int(callback_query.data.replace('acc_buy_', ''))
         
-        all_items = self.get_all_accessories()
-        item = next((i for i in all_items if i['id'] == item_id), None)
+        item = self.catalog.get(item_id)
+        
+        if not item:
+            await callback_query.answer("❌ Товар не найден!", show_alert=True)
+            return
         
         await self.confirmations.ask_confirmation(
             callback_query.message,
@@ -223,7 +227,7 @@ class AccessoryShop:
                         f"💰 Цена: {item['price']:,}{CURR}\n\n"
                         f"Подтверждаете покупку?",
                 'user_id': callback_query.from_user.id,
-                'item': item
+                'item': dict(item)
             },
             'BUY_ACCESSORY_CONFIRM',
             'CANCEL'
@@ -235,57 +239,72 @@ class AccessoryShop:
         confirmed = data.get('confirmed_data', {})
         item = confirmed['item']
         
-        async with self.db.pool.acquire() as conn:
-            async with conn.transaction():
-                user = await conn.fetchrow('SELECT * FROM users WHERE user_id = $1', confirmed['user_id'])
-                if user['balance'] < item['price']:
-                    await callback_query.message.edit_text("❌ Недостаточно средств!")
-                    await state.finish()
-                    return
-                
-                await conn.execute('UPDATE users SET balance = balance - $1 WHERE user_id = $2', 
-                                  item['price'], confirmed['user_id'])
-                
-                # Сохраняем аксессуар в отдельную таблицу (нужно создать)
-                await conn.execute('''
-                    INSERT INTO accessories (user_id, accessory_id, accessory_name, price, category, style)
-                    VALUES ($1, $2, $3, $4, $5, $6)
-                ''', confirmed['user_id'], item['id'], item['name'], item['price'], 
-                    item['category'], item['style'])
+        # Товар от администрации - покупка со склада
+        if 'catalog_id' in item:
+            result = await self.db.buy_catalog_item(confirmed['user_id'], item['catalog_id'])
+            await callback_query.message.edit_text(result['message'])
+            await state.finish()
+            return
+        
+        result = await self.db.purchase(confirmed['user_id'], item['price'], 'accessories', {
+            'user_id': confirmed['user_id'],
+            'accessory_id': item['id'],
+            'accessory_name': item['name'],
+            'description': item['description'],
+            'price': item['price'],
+            'category': item['category'],
+            'style': item['style']
+        })
+        
+        if not result['success']:
+            await callback_query.message.edit_text(result['message'])
+            await state.finish()
+            return
         
         await callback_query.message.edit_text(
-            f"✅ Вы купили {item['name']} за {item['price']:,}{CURR}!"
+            f"✅ Вы купили {item['name']} за {item['price']:,}{CURR}!\n"
+            f"💳 Баланс: {result['balance']:,}{CURR}"
         )
         await state.finish()
 
-    async def show_my_accessories(self, callback_query: types.CallbackQuery):
-        """Показать мои аксессуары"""
+    async def show_my_accessories(self, callback_query: types.CallbackQuery, cursor: str = ''):
+        """Показать мои аксессуары (постранично, общая стоимость - по всем)"""
         user_id = callback_query.from_user.id
+        page = await self.paginator.fetch(user_id, 'accessory', cursor)
         
-        async with self.db.pool.acquire() as conn:
-            accessories = await conn.fetch('SELECT * FROM accessories WHERE user_id = $1', user_id)
-        
-        if not accessories:
+        if not page:
             await callback_query.answer("❌ У вас нет аксессуаров!", show_alert=True)
             return
         
+        summary = (await self.db.get_user_items_summary(user_id))['accessory']
         text = "👕 *МОИ АКСЕССУАРЫ* 👕\n\n"
-        total_value = 0
         
-        for acc in accessories:
+        for acc in page.items:
             text += f"• {acc['accessory_name']}\n"
             text += f"  💰 Цена: {acc['price']:,}{CURR}\n"
             text += f"  ✨ Стиль: {acc['style']}%\n\n"
-            total_value += acc['price']
         
-        text += f"💰 Общая стоимость: *{total_value:,}{CURR}*"
+        text += f"📦 Всего: {summary['count']} шт\n"
+        text += f"💰 Общая стоимость: *{summary['total']:,}{CURR}*"
         
         keyboard = InlineKeyboardMarkup()
+        page.add_nav(keyboard, "my_acc_page_")
         keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="accessories_menu"))
         
         await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
-    def add_custom_accessory(self, accessory: dict):
-        """Добавить кастомный аксессуар от админа"""
-        accessory['id'] = len(self.default_accessories) + len(self.custom_accessories) + 1
-        self.custom_accessories.append(accessory)
+    def set_custom_items(self, items: list):
+        """Заменить аксессуары от администрации и пересобрать каталог"""
+        self.custom_accessories = [
+            {
+                'id': CUSTOM_ITEM_ID_OFFSET + item['id'],
+                'catalog_id': item['id'],
+                'name': item['name'],
+                'description': item['description'],
+                'price': item['price'],
+                'category': item['attributes']['category'],
+                'style': item['attributes']['style']
+            }
+            for item in items
+        ]
+        self.rebuild_catalog()
@@ -6,6 +6,7 @@ from database import Database
 from payments import PaymentSystem
 from config import *
 import asyncio
+import json
 
 class AdminStates(StatesGroup):
     waiting_for_user_id = State()
@@ -24,12 +25,14 @@ class AdminStates(StatesGroup):
     waiting_for_item_category = State()
     waiting_for_item_style = State()
     waiting_for_item_quantity = State()
+    waiting_for_restock_amount = State()
 
 class AdminPanel:
-    def __init__(self, bot, db: Database, payments: PaymentSystem):
+    def __init__(self, bot, db: Database, payments: PaymentSystem, confirmations=None):
         self.bot = bot
         self.db = db
         self.payments = payments
+        self.confirmations = confirmations
         self.admin_id = MAIN_ADMIN_ID
 
     async def check_admin(self, user_id: int) -> bool:
@@ -289,9 +292,11 @@ class AdminPanel:
         await AdminStates.waiting_for_item_quantity.set()
 
     async def process_item_quantity(self, message: types.Message, state: FSMContext):
-        """Финальный шаг - создание предмета"""
+        """Финальный шаг - создание товара с остатком на складе"""
         try:
             quantity = int(message.text)
+            if quantity < 0:
+                raise ValueError
         except ValueError:
             await message.reply("❌ Введите корректное количество!")
             return
@@ -299,95 +304,102 @@ class AdminPanel:
         data = await state.get_data()
         item_type = data['item_type']
         
-        # Создаем предмет в зависимости от типа
+        # Характеристики в зависимости от типа
         if item_type == 'car':
-            for i in range(quantity):
-                await self.db.add_car(
-                    user_id=0,  # 0 означает что машина в магазине, а не у пользователя
-                    brand=data['item_name'].split()[0] if ' ' in data['item_name'] else data['item_name'],
-                    model=data['item_name'],
-                    price=data['item_price'],
-                    speed=data['item_speed'],
-                    description=data['item_description'],
-                    is_custom=True,
-                    created_by=message.from_user.id
-                )
-            result_text = f"✅ Создано {quantity} машин '{data['item_name']}'"
-            
+            attributes = {'speed': data['item_speed']}
         elif item_type == 'phone':
-            for i in range(quantity):
-                await self.db.add_phone(
-                    user_id=0,
-                    brand=data['item_name'].split()[0] if ' ' in data['item_name'] else data['item_name'],
-                    model=data['item_name'],
-                    price=data['item_price'],
-                    camera=data['item_camera'],
-                    description=data['item_description'],
-                    is_custom=True,
-                    created_by=message.from_user.id
-                )
-            result_text = f"✅ Создано {quantity} телефонов '{data['item_name']}'"
-            
+            attributes = {'camera': data['item_camera']}
         elif item_type == 'house':
-            house_data = {
-                'id': random.randint(1000, 9999),
-                'name': data['item_name'],
-                'description': data['item_description'],
-                'price': data['item_price'],
-                'rooms': data['item_rooms'],
-                'area': data['item_area'],
-                'comfort': data['item_comfort'],
-                'is_custom': True,
-                'created_by': message.from_user.id
-            }
-            for i in range(quantity):
-                await self.db.add_house(0, house_data)
-            result_text = f"✅ Создано {quantity} домов '{data['item_name']}'"
-            
-        elif item_type == 'accessory':
-            accessory_data = {
-                'id': random.randint(1000, 9999),
-                'name': data['item_name'],
-                'description': data['item_description'],
-                'price': data['item_price'],
-                'category': data['item_category'],
-                'style': data['item_style'],
-                'is_custom': True,
-                'created_by': message.from_user.id
-            }
-            for i in range(quantity):
-                await self.db.add_accessory(0, accessory_data)
-            result_text = f"✅ Создано {quantity} аксессуаров '{data['item_name']}'"
-        
-        await message.reply(result_text)
+            attributes = {'rooms': data['item_rooms'], 'area': data['item_area'], 'comfort': data['item_comfort']}
+        else:
+            attributes = {'category': data['item_category'], 'style': data['item_style']}
+        
+        # Одна строка со счётчиком остатка вместо строки на каждую единицу
+        await self.db.add_items_bulk('catalog', [{
+            'item_type': item_type,
+            'name': data['item_name'],
+            'description': data['item_description'],
+            'price': data['item_price'],
+            'attributes': json.dumps(attributes),
+            'stock': quantity,
+            'created_by': message.from_user.id
+        }])
+        
+        await message.reply(f"✅ Товар '{data['item_name']}' создан, на складе: {quantity} шт")
         await state.finish()
 
     # ========== ПРОСМОТР ПРЕДМЕТОВ ==========
 
     async def view_items(self, callback_query: types.CallbackQuery):
-        """Просмотр всех предметов в магазине"""
+        """Просмотр всех товаров в магазине"""
         if not await self.check_admin(callback_query.from_user.id):
             await callback_query.answer("❌ Нет прав!", show_alert=True)
             return
         
-        cars = await self.db.get_all_cars()
+        items = await self.db.get_catalog_items()
+        
+        type_names = {
+            'car': '🚗',
+            'phone': '📱',
+            'house': '🏠',
+            'accessory': '👕'
+        }
         
-        text = "📦 *ВСЕ ПРЕДМЕТЫ В МАГАЗИНЕ*\n\n"
+        text = "📦 *ВСЕ ТОВАРЫ В МАГАЗИНЕ*\n\n"
+        keyboard = InlineKeyboardMarkup(row_width=2)
         
-        if cars:
-            text += "*🚗 Машины:*\n"
-            for car in cars[:5]:
-                text += f"  • {car['model']} - {car['price']}{CURR}"
-                if car['user_id'] == 0:
-                    text += " [В МАГАЗИНЕ]"
-                text += "\n"
-            text += "\n"
+        if not items:
+            text += "Товаров пока нет"
+        
+        for item in items:
+            text += f"{type_names.get(item['item_type'], '📦')} {item['name']} - {item['price']}{CURR} | склад: {item['stock']} шт\n"
+            keyboard.add(
+                InlineKeyboardButton(f"📦 Пополнить: {item['name']}", callback_data=f"admin_restock_{item['id']}"),
+                InlineKeyboardButton("🔨 На аукцион", callback_data=f"auction_new_catalog_{item['id']}")
+            )
         
-        keyboard = InlineKeyboardMarkup()
         keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="admin_shop_menu"))
         
         await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
+    async def restock_start(self, callback_query: types.CallbackQuery, state: FSMContext):
+        """Начало пополнения склада"""
+        if not await self.check_admin(callback_query.from_user.id):
+            await callback_query.answer("❌ Нет прав!", show_alert=True)
+            return
+        
+        item_id = int(callback_query.data.replace('admin_restock_', ''))
+        item = await self.db.get_catalog_item(item_id)
+        
+        if not item:
+            await callback_query.answer("❌ Товар не найден!", show_alert=True)
+            return
+        
+        await state.update_data(restock_item_id=item_id)
+        await callback_query.message.edit_text(
+            f"📦 {item['name']}\n"
+            f"На складе: {item['stock']} шт\n\n"
+            f"Введите, сколько штук добавить (отрицательное число - списать):"
+        )
+        await AdminStates.waiting_for_restock_amount.set()
+
+    async def process_restock_amount(self, message: types.Message, state: FSMContext):
+        """Пополнение склада одним запросом"""
+        try:
+            amount = int(message.text)
+        except ValueError:
+            await message.reply("❌ Введите корректное количество!")
+            return
+        
+        data = await state.get_data()
+        stock = await self.db.restock_catalog_item(data['restock_item_id'], amount)
+        
+        if stock is None:
+            await message.reply("❌ На складе нет столько товара!")
+        else:
+            await message.reply(f"✅ Склад обновлён, остаток: {stock} шт")
+        await state.finish()
+
     # ========== УПРАВЛЕНИЕ ПОЛЬЗОВАТЕЛЯМИ ==========
 
     async def give_money_start(self, callback_query: types.CallbackQuery, state: FSMContext):
@@ -485,7 +497,7 @@ class AdminPanel:
         
         async with self.db.pool.acquire() as conn:
             total_users = await conn.fetchval('SELECT COUNT(*) FROM users')
-            total_balance = await conn.fetchval('SELECT COALESCE(SUM(balance), 0) FROM users')
+            total_balance = await conn.fetchval('SELECT COALESCE(SUM(balance), 0)::BIGINT FROM users')
             total_cars = await conn.fetchval('SELECT COUNT(*) FROM cars')
             total_phones = await conn.fetchval('SELECT COUNT(*) FROM phones')
             total_houses = await conn.fetchval('SELECT COUNT(*) FROM houses')
@@ -504,6 +516,11 @@ class AdminPanel:
         text += f"👕 Аксессуаров: {total_accessories}\n"
         text += f"🏰 Кланов: {total_clans}"
         
+        if self.confirmations:
+            conf_stats = self.confirmations.get_stats()
+            text += f"\n\n⏳ Подтверждений в ожидании: {conf_stats['active']}\n"
+            text += f"✅ Подтверждено: {conf_stats['confirmed']} | ❌ Отменено: {conf_stats['cancelled']} | ⌛ Истекло: {conf_stats['expired']}"
+        
         keyboard = InlineKeyboardMarkup()
         keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="admin"))
         
@@ -0,0 +1,101 @@
+from database import Database
+from market import CryptoMarketEngine
+from notifier import ThrottledSender
+from config import *
+from typing import Dict, List
+import bisect
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PriceAlerts:
+    """Ценовые алерты: отсортированные пороги по каждой монете"""
+    def __init__(self, db: Database, market: CryptoMarketEngine, sender: ThrottledSender):
+        self.db = db
+        self.market = market
+        self.sender = sender
+        self.alerts = {}  # alert_id -> алерт
+        self.thresholds = {}  # crypto_id -> отсортированный список (threshold, alert_id)
+
+    def _add(self, alert: Dict):
+        self.alerts[alert['id']] = alert
+        bisect.insort(self.thresholds.setdefault(alert['crypto_id'], []), (alert['threshold'], alert['id']))
+
+    def _remove(self, alert: Dict):
+        thresholds = self.thresholds.get(alert['crypto_id'], [])
+        i = bisect.bisect_left(thresholds, (alert['threshold'], alert['id']))
+        if i < len(thresholds) and thresholds[i][1] == alert['id']:
+            del thresholds[i]
+        self.alerts.pop(alert['id'], None)
+
+    async def load(self):
+        """Загрузить алерты из БД"""
+        for alert in await self.db.get_crypto_alerts():
+            self.alerts[alert['id']] = alert
+            self.thresholds.setdefault(alert['crypto_id'], []).append((alert['threshold'], alert['id']))
+        
+        for thresholds in self.thresholds.values():
+            thresholds.sort()
+        
+        logger.info(f"✅ Загружено {len(self.alerts)} ценовых алертов")
+
+    async def add_alert(self, user_id: int, crypto_id: int, threshold: float) -> Dict:
+        alert = await self.db.create_crypto_alert(user_id, crypto_id, threshold, CRYPTO_ALERTS_PER_USER)
+        
+        if not alert:
+            return {'success': False, 'message': f'❌ Можно держать не больше {CRYPTO_ALERTS_PER_USER} алертов!'}
+        
+        self._add(alert)
+        
+        coin = self.market.get_coin(crypto_id)
+        return {'success': True, 'message': f"🔔 Алерт установлен: {coin['symbol']} пересечёт {threshold:.2f}{CURR}"}
+
+    async def delete_alert(self, alert_id: int, user_id: int) -> Dict:
+        alert = await self.db.delete_crypto_alert(alert_id, user_id)
+        
+        if not alert:
+            return {'success': False, 'message': '❌ Алерт не найден'}
+        
+        self._remove(alert)
+        
+        return {'success': True, 'message': '✅ Алерт удалён'}
+
+    def crossed(self, crypto_id: int, old_price: float, new_price: float) -> List[Dict]:
+        """Вырезать алерты, пороги которых цена пересекла: O(log n + k)"""
+        thresholds = self.thresholds.get(crypto_id)
+        if not thresholds or old_price == new_price:
+            return []
+        
+        if new_price > old_price:
+            # Рост: old < threshold <= new
+            lo = bisect.bisect_right(thresholds, (old_price, float('inf')))
+            hi = bisect.bisect_right(thresholds, (new_price, float('inf')))
+        else:
+            # Падение: new <= threshold < old
+            lo = bisect.bisect_left(thresholds, (new_price, float('-inf')))
+            hi = bisect.bisect_left(thresholds, (old_price, float('-inf')))
+        
+        fired = [self.alerts.pop(alert_id) for _, alert_id in thresholds[lo:hi]]
+        del thresholds[lo:hi]
+        return fired
+
+    async def on_tick(self, old_prices: Dict[int, float], new_prices: Dict[int, float]):
+        """Найти сработавшие алерты и отправить уведомления"""
+        fired = []
+        for crypto_id, new_price in new_prices.items():
+            old_price = old_prices.get(crypto_id)
+            if old_price is None:
+                continue
+            
+            for alert in self.crossed(crypto_id, old_price, new_price):
+                fired.append(alert)
+                symbol = self.market.get_coin(crypto_id)['symbol']
+                direction = "📈 поднялся выше" if new_price > old_price else "📉 опустился ниже"
+                self.sender.send(
+                    alert['user_id'],
+                    f"🔔 {symbol} {direction} {alert['threshold']:.2f}{CURR}\n"
+                    f"Текущая цена: {new_price:.2f}{CURR}"
+                )
+        
+        if fired:
+            await self.db.delete_crypto_alerts([alert['id'] for alert in fired])
@@ -0,0 +1,136 @@
+from database import Database
+from notifier import ThrottledSender
+from config import *
+from typing import Dict, Optional
+import asyncio
+import datetime
+import heapq
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AuctionHouse:
+    """Аукционы: активные лоты лежат в куче по времени окончания, один таск закрывает их по порядку без опроса БД"""
+    def __init__(self, db: Database, sender: ThrottledSender):
+        self.db = db
+        self.sender = sender
+        self.heap = []  # (ends_at, auction_id)
+        self.ends = {}  # auction_id -> актуальное время окончания (записи кучи с другим временем устарели)
+        self.wakeup = asyncio.Event()
+        self.run_task = None
+        self.stats = {
+            'settled': 0,
+            'expired': 0
+        }
+
+    def schedule(self, auction_id: int, ends_at: datetime.datetime):
+        """Поставить аукцион в очередь закрытия. Продление добавляет новую запись, старая пропускается"""
+        self.ends[auction_id] = ends_at
+        heapq.heappush(self.heap, (ends_at, auction_id))
+        
+        # Будим таск, только если этот аукцион теперь закрывается раньше всех
+        if self.heap[0] == (ends_at, auction_id):
+            self.wakeup.set()
+
+    async def load(self):
+        """Восстановить очередь из БД после перезапуска (просроченные закроются сразу)"""
+        for auction in await self.db.get_active_auction_ends():
+            self.schedule(auction['id'], auction['ends_at'])
+        logger.info(f"🔨 Активных аукционов: {len(self.ends)}")
+
+    async def create(self, seller_id: int, item_type: str, item_id: int, start_price: int, hours: int) -> Optional[Dict]:
+        ends_at = datetime.datetime.now() + datetime.timedelta(hours=hours)
+        auction = await self.db.create_auction(seller_id, item_type, item_id, start_price, ends_at)
+        
+        if auction:
+            self.schedule(auction['id'], auction['ends_at'])
+        return auction
+
+    async def bid(self, auction_id: int, bidder_id: int, amount: int) -> Dict:
+        result = await self.db.place_auction_bid(auction_id, bidder_id, amount, datetime.datetime.now())
+        if not result['success']:
+            return result
+        
+        auction = result['auction']
+        if result['extended']:
+            self.schedule(auction_id, auction['ends_at'])
+        
+        if result['outbid_id']:
+            self.sender.send(
+                result['outbid_id'],
+                f"🔨 Вашу ставку на *{auction['item_name']}* перебили!\n"
+                f"💰 Новая ставка: {auction['current_bid']:,}{CURR}\n"
+                f"↩️ Ваши {result['outbid_amount']:,}{CURR} возвращены на баланс",
+                parse_mode="Markdown"
+            )
+        return result
+
+    async def close(self, auction_id: int):
+        result = await self.db.settle_auction(auction_id, datetime.datetime.now())
+        if result is None:
+            self.ends.pop(auction_id, None)
+            return
+        
+        # Аукцион продлили в другом процессе - ждём новое время
+        if result['status'] == 'active':
+            self.schedule(auction_id, result['ends_at'])
+            return
+        
+        self.ends.pop(auction_id, None)
+        self.stats[result['status']] += 1
+        
+        if result['status'] == 'settled':
+            self.sender.send(
+                result['bidder_id'],
+                f"🏆 Вы выиграли аукцион: *{result['item_name']}* за {result['current_bid']:,}{CURR}!",
+                parse_mode="Markdown"
+            )
+            self.sender.send(
+                result['seller_id'],
+                f"🔨 Аукцион завершён: *{result['item_name']}* продан за {result['current_bid']:,}{CURR}\n"
+                f"💰 Получено: {result['current_bid'] - result['fee']:,}{CURR} (комиссия {result['fee']:,}{CURR})",
+                parse_mode="Markdown"
+            )
+        else:
+            self.sender.send(
+                result['seller_id'],
+                f"🔨 Аукцион *{result['item_name']}* завершён без ставок, предмет возвращён",
+                parse_mode="Markdown"
+            )
+
+    async def run(self):
+        """Спим до окончания ближайшего аукциона или до появления более раннего"""
+        while True:
+            if not self.heap:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+            
+            ends_at, auction_id = self.heap[0]
+            delay = (ends_at - datetime.datetime.now()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+                continue
+            
+            heapq.heappop(self.heap)
+            if self.ends.get(auction_id) != ends_at:
+                continue
+            
+            try:
+                await self.close(auction_id)
+            except Exception as e:
+                logger.error(f"❌ Ошибка закрытия аукциона {auction_id}: {e}")
+                self.schedule(auction_id, datetime.datetime.now() + datetime.timedelta(seconds=AUCTION_RETRY_DELAY))
+
+    def start(self):
+        if self.run_task is None:
+            self.run_task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.run_task:
+            self.run_task.cancel()
+            self.run_task = None
@@ -0,0 +1,252 @@
+from aiogram import types
+from aiogram.dispatcher import FSMContext
+from aiogram.dispatcher.filters.state import State, StatesGroup
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from database import Database, ITEM_NAME_COLUMNS
+from auction_house import AuctionHouse
+from paginator import ItemPaginator
+from config import *
+import datetime
+
+class AuctionStates(StatesGroup):
+    waiting_for_start_price = State()
+    waiting_for_bid_amount = State()
+
+class Auctions:
+    def __init__(self, bot, db: Database, house: AuctionHouse):
+        self.bot = bot
+        self.db = db
+        self.house = house
+        self.paginator = ItemPaginator(db)
+        self.item_titles = {
+            'car': '🚗 Машины',
+            'phone': '📱 Телефоны',
+            'house': '🏠 Дома',
+            'accessory': '👕 Аксессуары'
+        }
+
+    @staticmethod
+    def can_auction(user_id: int, item_type: str) -> bool:
+        """Товары со склада (type=catalog) выставляет только администрация"""
+        return item_type != 'catalog' or user_id in ADMIN_IDS or user_id == MAIN_ADMIN_ID
+
+    def format_time_left(self, ends_at: datetime.datetime) -> str:
+        seconds = max(0, int((ends_at - datetime.datetime.now()).total_seconds()))
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        if hours:
+            return f"{hours} ч {minutes} мин"
+        return f"{minutes} мин {seconds} сек"
+
+    async def show_auctions(self, callback_query: types.CallbackQuery):
+        """Список аукционов, ближайшие к закрытию - сверху"""
+        auctions = await self.db.get_active_auctions(AUCTION_LIST_SIZE)
+        
+        keyboard = InlineKeyboardMarkup(row_width=1)
+        for auction in auctions:
+            price = auction['current_bid'] or auction['start_price']
+            keyboard.add(InlineKeyboardButton(
+                f"🔨 {auction['item_name']} - {price:,}{CURR} ({self.format_time_left(auction['ends_at'])})",
+                callback_data=f"auction_view_{auction['id']}"
+            ))
+        keyboard.add(
+            InlineKeyboardButton("💰 Выставить предмет", callback_data="auction_sell"),
+            InlineKeyboardButton("◀️ Назад", callback_data="menu")
+        )
+        
+        await callback_query.message.edit_text(
+            "🔨 *АУКЦИОН* 🔨\n\n"
+            f"Шаг ставки: от {AUCTION_MIN_STEP_PERCENT}%\n"
+            f"Ставка в последние {AUCTION_EXTEND_SECONDS // 60} мин продлевает торги\n"
+            f"Комиссия с продажи: {AUCTION_FEE*100:.0f}%\n\n"
+            + ("Выберите лот:" if auctions else "Сейчас аукционов нет"),
+            parse_mode="Markdown",
+            reply_markup=keyboard
+        )
+
+    async def view_auction(self, callback_query: types.CallbackQuery, auction_id: int = None):
+        if auction_id is None:
+            auction_id = int(callback_query.data.replace('auction_view_', ''))
+        auction = await self.db.get_auction(auction_id)
+        
+        if not auction:
+            await callback_query.answer("❌ Аукцион не найден!", show_alert=True)
+            return
+        
+        text = f"🔨 *{auction['item_name']}*\n\n"
+        text += f"💰 Стартовая цена: {auction['start_price']:,}{CURR}\n"
+        if auction['current_bid']:
+            leader = "вы" if auction['bidder_id'] == callback_query.from_user.id else "другой игрок"
+            text += f"📈 Текущая ставка: {auction['current_bid']:,}{CURR} ({leader})\n"
+        text += f"🔢 Ставок: {auction['bids_count']}\n"
+        
+        keyboard = InlineKeyboardMarkup(row_width=1)
+        if auction['status'] == 'active':
+            text += f"⏳ До конца: {self.format_time_left(auction['ends_at'])}\n"
+            text += f"⬆️ Минимальная ставка: {auction['min_bid']:,}{CURR}"
+            can_bid = auction['seller_id'] != callback_query.from_user.id and auction['bidder_id'] != callback_query.from_user.id
+            if auction['min_bid'] > AUCTION_MAX_PRICE:
+                text += "\n🔝 Достигнута максимальная ставка"
+            elif can_bid:
+                keyboard.add(
+                    InlineKeyboardButton(f"💰 Ставка {auction['min_bid']:,}{CURR}", callback_data=f"auction_bid_{auction_id}_{auction['min_bid']}"),
+                    InlineKeyboardButton("✏️ Своя ставка", callback_data=f"auction_custom_{auction_id}")
+                )
+        else:
+            text += "✅ Аукцион завершён"
+        keyboard.add(InlineKeyboardButton("🔄 Обновить", callback_data=f"auction_view_{auction_id}"))
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="auctions"))
+        
+        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
+
+    # ========== СТАВКИ ==========
+
+    async def quick_bid(self, callback_query: types.CallbackQuery):
+        """Ставка с кнопки: сумма зашита в кнопку, устаревшая кнопка не пройдёт проверку минимальной ставки"""
+        _, _, auction_id, amount = callback_query.data.split('_')
+        result = await self.house.bid(int(auction_id), callback_query.from_user.id, int(amount))
+        
+        if not result['success']:
+            await callback_query.answer(result['message'], show_alert=True)
+            return
+        
+        await callback_query.answer(f"✅ Ставка {int(amount):,}{CURR} принята!")
+        await self.view_auction(callback_query, int(auction_id))
+
+    async def custom_bid_start(self, callback_query: types.CallbackQuery, state: FSMContext):
+        auction_id = int(callback_query.data.replace('auction_custom_', ''))
+        
+        await state.update_data(auction_id=auction_id)
+        await AuctionStates.waiting_for_bid_amount.set()
+        await callback_query.message.edit_text("💰 Введите сумму ставки:")
+
+    async def process_bid_amount(self, message: types.Message, state: FSMContext):
+        try:
+            amount = int(message.text)
+        except ValueError:
+            await message.reply("❌ Введите корректную сумму!")
+            return
+        
+        if not 1 <= amount <= AUCTION_MAX_PRICE:
+            await message.reply(f"❌ Ставка должна быть от 1 до {AUCTION_MAX_PRICE:,}{CURR}!")
+            return
+        
+        data = await state.get_data()
+        await state.finish()
+        
+        result = await self.house.bid(data['auction_id'], message.from_user.id, amount)
+        if not result['success']:
+            await message.reply(result['message'])
+            return
+        
+        text = f"✅ Ставка {amount:,}{CURR} на *{result['auction']['item_name']}* принята!\n💳 Баланс: {result['balance']:,}{CURR}"
+        if result['extended']:
+            text += f"\n⏳ Аукцион продлён на {AUCTION_EXTEND_SECONDS // 60} мин"
+        await message.reply(text, parse_mode="Markdown")
+
+    # ========== ВЫСТАВЛЕНИЕ ==========
+
+    async def sell_start(self, callback_query: types.CallbackQuery):
+        keyboard = InlineKeyboardMarkup(row_width=2)
+        keyboard.add(*[
+            InlineKeyboardButton(title, callback_data=f"auction_sell_type_{item_type}")
+            for item_type, title in self.item_titles.items()
+        ])
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="auctions"))
+        
+        await callback_query.message.edit_text(
+            "💰 *Выставить на аукцион*\n\n"
+            "Пока идут торги, предмет недоступен для обмена и продажи.\n"
+            "Выберите категорию:",
+            parse_mode="Markdown",
+            reply_markup=keyboard
+        )
+
+    async def show_sell_items(self, callback_query: types.CallbackQuery):
+        item_type, _, cursor = callback_query.data.replace('auction_sell_type_', '').partition('_')
+        page = await self.paginator.fetch(callback_query.from_user.id, item_type, cursor)
+        
+        if not page:
+            await callback_query.answer("❌ В этой категории у вас ничего нет!", show_alert=True)
+            return
+        
+        keyboard = InlineKeyboardMarkup(row_width=1)
+        for item in page.items:
+            keyboard.add(InlineKeyboardButton(
+                f"{item[ITEM_NAME_COLUMNS[item_type]]} ({item['price']:,}{CURR})",
+                callback_data=f"auction_new_{item_type}_{item['id']}"
+            ))
+        page.add_nav(keyboard, f"auction_sell_type_{item_type}_")
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="auction_sell"))
+        
+        await callback_query.message.edit_text(
+            f"{self.item_titles[item_type]}\n\nВыберите предмет для аукциона:",
+            reply_markup=keyboard
+        )
+
+    async def choose_duration(self, callback_query: types.CallbackQuery):
+        """auction_new_{type}_{id}: товары со склада (type=catalog) выставляет только администрация"""
+        _, _, item_type, item_id = callback_query.data.split('_')
+        user_id = callback_query.from_user.id
+        
+        if not self.can_auction(user_id, item_type):
+            await callback_query.answer("❌ Нет прав!", show_alert=True)
+            return
+        
+        keyboard = InlineKeyboardMarkup(row_width=3)
+        keyboard.add(*[
+            InlineKeyboardButton(title, callback_data=f"auction_dur_{item_type}_{item_id}_{hours}")
+            for hours, title in AUCTION_DURATIONS.items()
+        ])
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="auctions"))
+        
+        await callback_query.message.edit_text("⏳ Выберите длительность аукциона:", reply_markup=keyboard)
+
+    async def duration_chosen(self, callback_query: types.CallbackQuery, state: FSMContext):
+        _, _, item_type, item_id, hours = callback_query.data.split('_')
+        if not self.can_auction(callback_query.from_user.id, item_type):
+            await callback_query.answer("❌ Нет прав!", show_alert=True)
+            return
+        if int(hours) not in AUCTION_DURATIONS:
+            await callback_query.answer("❌ Недопустимая длительность!", show_alert=True)
+            return
+        
+        await state.update_data(auction_item_type=item_type, auction_item_id=int(item_id), auction_hours=int(hours))
+        await AuctionStates.waiting_for_start_price.set()
+        await callback_query.message.edit_text(f"💰 Введите стартовую цену (до {AUCTION_MAX_PRICE:,}{CURR}):")
+
+    async def process_start_price(self, message: types.Message, state: FSMContext):
+        try:
+            price = int(message.text)
+        except ValueError:
+            await message.reply("❌ Введите корректную цену!")
+            return
+        
+        if not 1 <= price <= AUCTION_MAX_PRICE:
+            await message.reply(f"❌ Цена должна быть от 1 до {AUCTION_MAX_PRICE:,}{CURR}!")
+            return
+        
+        data = await state.get_data()
+        await state.finish()
+        
+        # Права и длительность проверяем ещё раз при создании: callback можно подделать
+        if not self.can_auction(message.from_user.id, data['auction_item_type']):
+            await message.reply("❌ Нет прав!")
+            return
+        if data['auction_hours'] not in AUCTION_DURATIONS:
+            await message.reply("❌ Недопустимая длительность!")
+            return
+        
+        auction = await self.house.create(
+            message.from_user.id, data['auction_item_type'], data['auction_item_id'], price, data['auction_hours']
+        )
+        if not auction:
+            await message.reply("❌ Предмет не найден или закончился на складе!")
+            return
+        
+        await message.reply(
+            f"🔨 Аукцион *{auction['item_name']}* открыт!\n"
+            f"💰 Стартовая цена: {price:,}{CURR}\n"
+            f"⏳ Длительность: {AUCTION_DURATIONS[data['auction_hours']]}",
+            parse_mode="Markdown"
+        )
@@ -25,7 +25,7 @@ def close_old_sessions():
 close_old_sessions()
 
 from config import *
-from database import Database
+from database import Database, ITEM_NAME_COLUMNS
 from payments import PaymentSystem
 from confirmations import ConfirmationSystem
 from government import Government
@@ -34,13 +34,25 @@ from admin import AdminPanel, AdminStates
 from cars import CarShop, CarStates
 from phones import PhoneShop, PhoneStates
 from crypto import CryptoMarket, CryptoStates
+from market import CryptoMarketEngine
+from orders import OrderBook
+from alerts import PriceAlerts
+from notifier import ThrottledSender
+from dca import DCAScheduler
 from trading import Trading, TradingStates
+from marketplace import Marketplace, MarketStates
+from auction_house import AuctionHouse
+from auctions import Auctions, AuctionStates
 from weekly_top import WeeklyTop
 from houses import HouseShop, HouseStates
 from casino import Casino, CasinoStates
 from accessories import AccessoryShop, AccessoryStates
 from club import AFKClub, ClubStates
 from settings import UserSettings, SettingsStates
+from idempotency import CallbackIdempotencyMiddleware
+from custom_catalog import CustomCatalog
+from paginator import ItemPaginator
+from leaderboard import LeaderboardService
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -51,26 +63,50 @@ bot = Bot(token=BOT_TOKEN)
 storage = MemoryStorage()
 dp = Dispatcher(bot, storage=storage)
 dp.middleware.setup(LoggingMiddleware())
+dp.middleware.setup(CallbackIdempotencyMiddleware())
 
 # База данных
 db = Database(DATABASE_URL)
 
 # Системы
 payments = PaymentSystem(bot, db)
-confirmations = ConfirmationSystem(bot)
+confirmations = ConfirmationSystem(bot, db)
+user_settings = UserSettings(bot, db)
 government = Government(bot, db, payments, confirmations)
 clans = Clans(bot, db, confirmations)
-admin_panel = AdminPanel(bot, db, payments)
+admin_panel = AdminPanel(bot, db, payments, confirmations)
 car_shop = CarShop(bot, db, confirmations)
 phone_shop = PhoneShop(bot, db, confirmations)
-crypto = CryptoMarket(bot, db, payments, confirmations)
-trading = Trading(bot, db, payments, confirmations)
-weekly_top = WeeklyTop(bot, db)
+sender = ThrottledSender(bot)
+market = CryptoMarketEngine(db)
+orders = OrderBook(bot, db, sender)
+alerts = PriceAlerts(db, market, sender)
+market.add_listener(orders.on_tick)
+market.add_listener(alerts.on_tick)
+dca = DCAScheduler(db, market, sender)
+crypto = CryptoMarket(bot, db, payments, confirmations, market, orders, alerts, dca)
+trading = Trading(bot, db, payments, confirmations, user_settings)
+marketplace = Marketplace(bot, db, confirmations, sender)
+auction_house = AuctionHouse(db, sender)
+auctions = Auctions(bot, db, auction_house)
+weekly_top = WeeklyTop(bot, db, user_settings, sender)
 house_shop = HouseShop(bot, db, payments, confirmations)
-casino = Casino(bot, db, payments, confirmations)
+leaderboards = LeaderboardService(db)
+casino = Casino(bot, db, payments, confirmations, user_settings, leaderboards)
 accessory_shop = AccessoryShop(bot, db, payments, confirmations)
 club = AFKClub(bot, db)  # НОВЫЙ МОДУЛЬ
-user_settings = UserSettings(bot, db)  # НОВЫЙ МОДУЛЬ
+item_paginator = ItemPaginator(db)
+inventory_titles = {
+    'car': '🚗 Машины',
+    'phone': '📱 Телефоны',
+    'house': '🏠 Дома',
+    'accessory': '👕 Аксессуары'
+}
+custom_catalog = CustomCatalog(db)
+custom_catalog.add_listener('car', car_shop.set_custom_items)
+custom_catalog.add_listener('phone', phone_shop.set_custom_items)
+custom_catalog.add_listener('house', house_shop.set_custom_items)
+custom_catalog.add_listener('accessory', accessory_shop.set_custom_items)
 
 # Команда /start
 @dp.message_handler(commands=['start'])
@@ -138,6 +174,8 @@ async def show_main_menu(message: types.Message):
     keyboard.add(
         InlineKeyboardButton("💱 Перевод денег", callback_data="transfer_money"),
         InlineKeyboardButton("🤝 Обмен предметами", callback_data="trade_items"),
+        InlineKeyboardButton("🛒 Рынок", callback_data="market"),
+        InlineKeyboardButton("🔨 Аукцион", callback_data="auctions"),
         InlineKeyboardButton("📦 Инвентарь", callback_data="inventory"),
         InlineKeyboardButton("🏠 Мои дома", callback_data="my_houses"),
         InlineKeyboardButton("👕 Мои аксессуары", callback_data="my_accessories")
@@ -245,6 +283,12 @@ async def process_callback(callback_query: types.CallbackQuery, state: FSMContex
     # ========== ГОСУДАРСТВО ==========
     elif data == "gov_menu":
         await government.show_government_menu(callback_query.message)
+    elif data.startswith("gov_sell_all_"):
+        await government.confirm_sell_all(callback_query, state)
+    elif data.startswith("gov_cars_page_"):
+        await government.show_sell_cars(callback_query, data.replace('gov_cars_page_', ''))
+    elif data.startswith("gov_phones_page_"):
+        await government.show_sell_phones(callback_query, data.replace('gov_phones_page_', ''))
     elif data == "gov_sell_car":
         await government.show_sell_cars(callback_query)
     elif data.startswith("gov_sell_car_"):
@@ -262,20 +306,29 @@ async def process_callback(callback_query: types.CallbackQuery, state: FSMContex
     elif data == "clan_create":
         await clans.create_clan_start(callback_query, state)
     elif data.startswith("clan_list_"):
-        page = int(data.replace('clan_list_', ''))
-        await clans.clan_list(callback_query, page)
+        await clans.clan_list(callback_query)
+    elif data == "clan_top":
+        await clans.show_clan_top(callback_query)
     elif data.startswith("clan_view_"):
         await clans.view_clan(callback_query)
     elif data.startswith("clan_apply_"):
         await clans.apply_to_clan(callback_query, state)
     elif data.startswith("clan_join_"):
         await clans.join_open_clan(callback_query)
+    elif data == "clan_leave":
+        await clans.leave_clan(callback_query)
+    elif data == "clan_treasury":
+        await clans.show_treasury(callback_query)
+    elif data in ("clan_deposit", "clan_withdraw"):
+        await clans.treasury_amount_start(callback_query, state)
     
     # ========== МАШИНЫ ==========
     elif data == "car_shop":
         await car_shop.show_car_shop(callback_query.message)
     elif data.startswith("car_buy_"):
         await car_shop.select_car_brand(callback_query, state)
+    elif data.startswith("cars_page_"):
+        await car_shop.show_car_page(callback_query, int(data.rsplit('_', 1)[1]))
     elif data == "my_cars":
         await car_shop.show_my_cars(callback_query)
     
@@ -284,6 +337,8 @@ async def process_callback(callback_query: types.CallbackQuery, state: FSMContex
         await phone_shop.show_phone_shop(callback_query.message)
     elif data.startswith("phone_buy_"):
         await phone_shop.select_phone_brand(callback_query, state)
+    elif data.startswith("phones_page_"):
+        await phone_shop.show_phone_page(callback_query, int(data.rsplit('_', 1)[1]))
     elif data == "my_phones":
         await phone_shop.show_my_phones(callback_query)
     
@@ -292,6 +347,9 @@ async def process_callback(callback_query: types.CallbackQuery, state: FSMContex
         await accessory_shop.show_accessories_menu(callback_query.message)
     elif data == "acc_all":
         await accessory_shop.show_all(callback_query)
+    elif data.startswith("acc_page_"):
+        category, page = data.replace('acc_page_', '').rsplit('_', 1)
+        await accessory_shop.show_by_category(callback_query, category, int(page))
     elif data.startswith("acc_category_"):
         category = data.replace('acc_category_', '')
         await accessory_shop.show_by_category(callback_query, category)
@@ -301,6 +359,8 @@ async def process_callback(callback_query: types.CallbackQuery, state: FSMContex
         await accessory_shop.confirm_buy(callback_query, state)
     elif data == "my_accessories":
         await accessory_shop.show_my_accessories(callback_query)
+    elif data.startswith("my_acc_page_"):
+        await accessory_shop.show_my_accessories(callback_query, data.replace('my_acc_page_', ''))
     
     # ========== ДОМА ==========
     elif data == "houses_menu":
@@ -313,6 +373,9 @@ async def process_callback(callback_query: types.CallbackQuery, state: FSMContex
         await house_shop.show_houses_by_category(callback_query, 'business')
     elif data == "houses_elite":
         await house_shop.show_houses_by_category(callback_query, 'elite')
+    elif data.startswith("houses_page_"):
+        category, page = data.replace('houses_page_', '').rsplit('_', 1)
+        await house_shop.show_houses_by_category(callback_query, category, int(page))
     elif data.startswith("house_view_"):
         await house_shop.view_house(callback_query, state)
     elif data.startswith("house_buy_"):
@@ -321,6 +384,8 @@ async def process_callback(callback_query: types.CallbackQuery, state: FSMContex
         await house_shop.show_my_houses(callback_query)
     elif data == "sell_house_menu":
         await house_shop.sell_house_menu(callback_query)
+    elif data.startswith("houses_sell_page_"):
+        await house_shop.sell_house_menu(callback_query, data.replace('houses_sell_page_', ''))
     elif data.startswith("sell_house_"):
         await house_shop.confirm_sell_house(callback_query, state)
     
@@ -335,18 +400,87 @@ async def process_callback(callback_query: types.CallbackQuery, state: FSMContex
         await crypto.buy_crypto_start(callback_query, state)
     elif data == "crypto_sell":
         await crypto.sell_crypto_start(callback_query, state)
+    elif data.startswith("crypto_limit_"):
+        await crypto.limit_order_start(callback_query, state)
+    elif data == "crypto_orders":
+        await crypto.show_orders(callback_query)
+    elif data.startswith("crypto_order_cancel_"):
+        await crypto.cancel_order(callback_query)
+    elif data == "crypto_alert":
+        await crypto.alert_start(callback_query, state)
+    elif data == "crypto_alerts":
+        await crypto.show_alerts(callback_query)
+    elif data.startswith("crypto_alert_del_"):
+        await crypto.delete_alert(callback_query)
+    elif data == "crypto_dca":
+        await crypto.dca_start(callback_query, state)
+    elif data == "crypto_dca_list":
+        await crypto.show_dca_plans(callback_query)
+    elif data.startswith("crypto_dca_interval_"):
+        await crypto.create_dca_plan(callback_query, state)
+    elif data.startswith("crypto_dca_del_"):
+        await crypto.delete_dca_plan(callback_query)
     
     # ========== ТОРГОВЛЯ ==========
     elif data == "transfer_money":
         await trading.transfer_money_start(callback_query, state, user_settings)
     elif data == "trade_items":
         await trading.trade_items_start(callback_query, state, user_settings)
-    elif data.startswith("trade_"):
-        await trading.process_trade_item(callback_query, state, user_settings)
+    elif data.startswith("trade_pick_"):
+        item_type, _, cursor = data.replace('trade_pick_', '').partition('_')
+        await trading.show_trade_picker(callback_query, item_type, cursor)
+    elif data.startswith("trade_toggle_"):
+        await trading.toggle_trade_item(callback_query, state)
+    elif data == "trade_send":
+        await trading.send_basket_start(callback_query, state)
+    elif data == "trade_clear":
+        await trading.clear_basket(callback_query, state)
+    
+    # ========== РЫНОК ==========
+    elif data == "market":
+        await marketplace.show_market_menu(callback_query)
+    elif data.startswith(("market_browse_", "market_next_", "market_prev_")):
+        await marketplace.browse(callback_query)
+    elif data == "market_filter":
+        await marketplace.filter_start(callback_query, state)
+    elif data.startswith("market_view_"):
+        await marketplace.view_listing(callback_query)
+    elif data.startswith("market_buy_"):
+        await marketplace.confirm_buy(callback_query, state)
+    elif data == "market_sell":
+        await marketplace.sell_start(callback_query)
+    elif data.startswith("market_sell_type_"):
+        await marketplace.show_sell_items(callback_query)
+    elif data.startswith("market_list_"):
+        await marketplace.list_item_start(callback_query, state)
+    elif data == "market_my":
+        await marketplace.show_my_listings(callback_query)
+    elif data.startswith("market_cancel_"):
+        await marketplace.cancel_listing(callback_query)
+    
+    # ========== АУКЦИОН ==========
+    elif data == "auctions":
+        await auctions.show_auctions(callback_query)
+    elif data.startswith("auction_view_"):
+        await auctions.view_auction(callback_query)
+    elif data.startswith("auction_bid_"):
+        await auctions.quick_bid(callback_query)
+    elif data.startswith("auction_custom_"):
+        await auctions.custom_bid_start(callback_query, state)
+    elif data == "auction_sell":
+        await auctions.sell_start(callback_query)
+    elif data.startswith("auction_sell_type_"):
+        await auctions.show_sell_items(callback_query)
+    elif data.startswith("auction_new_"):
+        await auctions.choose_duration(callback_query)
+    elif data.startswith("auction_dur_"):
+        await auctions.duration_chosen(callback_query, state)
     
     # ========== ИНВЕНТАРЬ ==========
     elif data == "inventory":
         await show_inventory(callback_query)
+    elif data.startswith("inventory_"):
+        await show_inventory_items(callback_query)
     
     # ========== СТАТИСТИКА ==========
     elif data == "stats":
@@ -379,6 +513,8 @@ async def process_callback(callback_query: types.CallbackQuery, state: FSMContex
         await admin_panel.create_accessory_start(callback_query, state)
     elif data == "admin_items_list":
         await admin_panel.view_items(callback_query)
+    elif data.startswith("admin_restock_"):
+        await admin_panel.restock_start(callback_query, state)
     elif data == "admin_give":
         await admin_panel.give_money_start(callback_query, state)
     elif data == "admin_banlist":
@@ -414,7 +550,7 @@ async def show_balance(callback_query: types.CallbackQuery):
     crypto_wallet = await db.get_user_crypto_wallet(user_id)
     crypto_value = 0
     for item in crypto_wallet:
-        crypto_value += float(item['amount']) * float(item['price'])
+        crypto_value += item['amount'] / CRYPTO_UNITS * item['price']
     
     # Получаем машины и телефоны
     cars = await db.get_user_cars(user_id)
@@ -492,15 +628,9 @@ async def show_referrals(callback_query: types.CallbackQuery):
 async def show_inventory(callback_query: types.CallbackQuery):
     user_id = callback_query.from_user.id
     user = await db.get_user(user_id)
-    settings = await user_settings.get_user_settings(user_id)
     
-    cars = await db.get_user_cars(user_id)
-    phones = await db.get_user_phones(user_id)
+    summary = await db.get_user_items_summary(user_id)
     crypto = await db.get_user_crypto_wallet(user_id)
-    accessories = await db.get_user_accessories(user_id)
-    
-    async with db.pool.acquire() as conn:
-        houses = await conn.fetch('SELECT * FROM houses WHERE user_id = $1', user_id)
     
     display_name = await user_settings.get_display_name(
         user_id,
@@ -511,45 +641,47 @@ async def show_inventory(callback_query: types.CallbackQuery):
     text = f"📦 *ТВОЙ ИНВЕНТАРЬ* 📦\n\n"
     text += f"👤 *{display_name}*\n\n"
     
-    if cars:
-        text += "*🚗 Машины:*\n"
-        for car in cars:
-            text += f"• {car['model']} - {car['price']:,}{CURR}\n"
-        text += "\n"
-    
-    if phones:
-        text += "*📱 Телефоны:*\n"
-        for phone in phones:
-            text += f"• {phone['model']} - {phone['price']:,}{CURR}\n"
-        text += "\n"
-    
-    if houses:
-        text += "*🏠 Дома:*\n"
-        for house in houses:
-            text += f"• {house['house_name']} - {house['price']:,}{CURR}\n"
-        text += "\n"
-    
-    if accessories:
-        text += "*👕 Аксессуары:*\n"
-        for acc in accessories:
-            text += f"• {acc['accessory_name']} - {acc['price']:,}{CURR}\n"
-        text += "\n"
+    keyboard = InlineKeyboardMarkup(row_width=2)
+    buttons = []
+    for item_type, title in inventory_titles.items():
+        if summary[item_type]['count']:
+            text += f"*{title}:* {summary[item_type]['count']} шт - {summary[item_type]['total']:,}{CURR}\n"
+            buttons.append(InlineKeyboardButton(title, callback_data=f"inventory_{item_type}"))
+    keyboard.add(*buttons)
     
     if crypto:
-        text += "*💎 Криптовалюта:*\n"
+        text += "\n*💎 Криптовалюта:*\n"
         for item in crypto:
-            value = float(item['amount']) * float(item['price'])
-            text += f"• {item['symbol']}: {float(item['amount']):.8f} ({value:,.2f}{CURR})\n"
-        text += "\n"
+            value = item['amount'] / CRYPTO_UNITS * item['price']
+            text += f"• {item['symbol']}: {item['amount'] / CRYPTO_UNITS:.8f} ({value:,.2f}{CURR})\n"
     
-    if not cars and not phones and not houses and not crypto and not accessories:
+    if not buttons and not crypto:
         text += "У тебя пока нет предметов!"
     
-    keyboard = InlineKeyboardMarkup()
     keyboard.add(InlineKeyboardButton("🏠 Главное меню", callback_data="menu"))
     
     await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
+# Предметы одной категории инвентаря - постранично
+async def show_inventory_items(callback_query: types.CallbackQuery):
+    item_type, _, cursor = callback_query.data.replace('inventory_', '', 1).partition('_')
+    page = await item_paginator.fetch(callback_query.from_user.id, item_type, cursor)
+    
+    if not page:
+        await callback_query.answer("❌ В этой категории ничего нет!", show_alert=True)
+        return
+    
+    name_column = ITEM_NAME_COLUMNS[item_type]
+    text = f"📦 *{inventory_titles[item_type]}*\n\n"
+    for item in page.items:
+        text += f"• {item[name_column]} - {item['price']:,}{CURR}\n"
+    
+    keyboard = InlineKeyboardMarkup()
+    page.add_nav(keyboard, f"inventory_{item_type}_")
+    keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="inventory"))
+    
+    await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
+
 # Функция показа статистики
 async def show_stats(callback_query: types.CallbackQuery):
     user_id = callback_query.from_user.id
@@ -598,30 +730,19 @@ async def show_stats(callback_query: types.CallbackQuery):
 
 # Функция показа топа игроков
 async def show_top(callback_query: types.CallbackQuery):
-    async with db.pool.acquire() as conn:
-        top = await conn.fetch('''
-            SELECT user_id, username, first_name, balance 
-            FROM users 
-            WHERE is_banned = FALSE 
-            ORDER BY balance DESC 
-            LIMIT 10
-        ''')
+    # Топ держится в памяти и обновляется по уведомлениям из БД
+    top = leaderboards.top('balance')
     
     text = "🏆 *ТОП ИГРОКОВ* 🏆\n\n"
     
+    # Настройки приватности и ники для всей страницы разом
+    settings_map = await user_settings.get_settings_many([player['user_id'] for player in top])
+    
     for i, player in enumerate(top, 1):
-        # Проверяем настройки приватности
-        settings = await user_settings.get_user_settings(player['user_id'])
-        
-        if settings['private_mode']:
-            display_name = "🔒 Приватный пользователь"
-        elif settings['show_nickname'] and settings['nickname']:
-            display_name = settings['nickname']
-        elif player['username']:
-            display_name = f"@{player['username']}"
-        else:
-            display_name = player['first_name'] or f"ID{player['user_id']}"
-        
+        settings = settings_map[player['user_id']]
+        display_name = user_settings.format_display_name(
+            settings, player['user_id'], player['username'], player['first_name']
+        )
         balance_display = "🔒 СКРЫТО" if settings['hide_balance'] else f"{player['balance']:,}{CURR}"
         
         medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
@@ -719,6 +840,10 @@ async def admin_item_style(message: types.Message, state: FSMContext):
 async def admin_item_quantity(message: types.Message, state: FSMContext):
     await admin_panel.process_item_quantity(message, state)
 
+@dp.message_handler(state=AdminStates.waiting_for_restock_amount)
+async def admin_restock_amount(message: types.Message, state: FSMContext):
+    await admin_panel.process_restock_amount(message, state)
+
 @dp.message_handler(state=ClanStates.waiting_for_clan_name)
 async def clan_name(message: types.Message, state: FSMContext):
     await clans.process_clan_name(message, state)
@@ -735,6 +860,10 @@ async def clan_description(message: types.Message, state: FSMContext):
 async def clan_application(message: types.Message, state: FSMContext):
     await clans.process_application(message, state)
 
+@dp.message_handler(state=ClanStates.waiting_for_treasury_amount)
+async def clan_treasury_amount(message: types.Message, state: FSMContext):
+    await clans.process_treasury_amount(message, state)
+
 @dp.message_handler(state=CarStates.waiting_for_car_brand)
 async def car_brand(message: types.Message, state: FSMContext):
     await car_shop.process_car_brand(message, state)
@@ -751,6 +880,22 @@ async def crypto_buy_amount(message: types.Message, state: FSMContext):
 async def crypto_sell_amount(message: types.Message, state: FSMContext):
     await crypto.process_sell_amount(message, state)
 
+@dp.message_handler(state=CryptoStates.waiting_for_limit_price)
+async def crypto_limit_price(message: types.Message, state: FSMContext):
+    await crypto.process_limit_price(message, state)
+
+@dp.message_handler(state=CryptoStates.waiting_for_limit_amount)
+async def crypto_limit_amount(message: types.Message, state: FSMContext):
+    await crypto.process_limit_amount(message, state)
+
+@dp.message_handler(state=CryptoStates.waiting_for_alert_price)
+async def crypto_alert_price(message: types.Message, state: FSMContext):
+    await crypto.process_alert_price(message, state)
+
+@dp.message_handler(state=CryptoStates.waiting_for_dca_amount)
+async def crypto_dca_amount(message: types.Message, state: FSMContext):
+    await crypto.process_dca_amount(message, state)
+
 @dp.message_handler(state=TradingStates.waiting_for_username)
 async def trading_username(message: types.Message, state: FSMContext):
     await trading.process_username(message, state)
@@ -759,6 +904,26 @@ async def trading_username(message: types.Message, state: FSMContext):
 async def trading_amount(message: types.Message, state: FSMContext):
     await trading.process_amount(message, state)
 
+@dp.message_handler(state=TradingStates.waiting_for_item_quantity)
+async def trading_crypto_amount(message: types.Message, state: FSMContext):
+    await trading.process_crypto_amount(message, state)
+
+@dp.message_handler(state=MarketStates.waiting_for_listing_price)
+async def market_listing_price(message: types.Message, state: FSMContext):
+    await marketplace.process_listing_price(message, state)
+
+@dp.message_handler(state=MarketStates.waiting_for_price_filter)
+async def market_price_filter(message: types.Message, state: FSMContext):
+    await marketplace.process_price_filter(message, state)
+
+@dp.message_handler(state=AuctionStates.waiting_for_start_price)
+async def auction_start_price(message: types.Message, state: FSMContext):
+    await auctions.process_start_price(message, state)
+
+@dp.message_handler(state=AuctionStates.waiting_for_bid_amount)
+async def auction_bid_amount(message: types.Message, state: FSMContext):
+    await auctions.process_bid_amount(message, state)
+
 @dp.message_handler(state=HouseStates.waiting_for_house_confirm)
 async def house_confirm(message: types.Message, state: FSMContext):
     await house_shop.process_house_confirm(message, state)
@@ -809,6 +974,10 @@ async def sell_car_confirm(callback_query: types.CallbackQuery, state: FSMContex
 async def sell_phone_confirm(callback_query: types.CallbackQuery, state: FSMContext):
     await government.execute_sell_phone(callback_query, state)
 
+@dp.callback_query_handler(lambda c: c.data == 'SELL_ALL_CONFIRM', state='*')
+async def sell_all_confirm(callback_query: types.CallbackQuery, state: FSMContext):
+    await government.execute_sell_all(callback_query, state)
+
 @dp.callback_query_handler(lambda c: c.data == 'BUY_CAR_CONFIRM', state='*')
 async def buy_car_confirm(callback_query: types.CallbackQuery, state: FSMContext):
     await car_shop.execute_buy_car(callback_query, state)
@@ -825,13 +994,21 @@ async def buy_crypto_confirm(callback_query: types.CallbackQuery, state: FSMCont
 async def sell_crypto_confirm(callback_query: types.CallbackQuery, state: FSMContext):
     await crypto.execute_sell_crypto(callback_query, state)
 
+@dp.callback_query_handler(lambda c: c.data == 'LIMIT_ORDER_CONFIRM', state='*')
+async def limit_order_confirm(callback_query: types.CallbackQuery, state: FSMContext):
+    await crypto.execute_limit_order(callback_query, state)
+
 @dp.callback_query_handler(lambda c: c.data == 'TRANSFER_CONFIRM', state='*')
 async def transfer_confirm(callback_query: types.CallbackQuery, state: FSMContext):
     await trading.execute_transfer(callback_query, state)
 
-@dp.callback_query_handler(lambda c: c.data == 'TRADE_ITEM_CONFIRM', state='*')
-async def trade_item_confirm(callback_query: types.CallbackQuery, state: FSMContext):
-    await trading.execute_trade(callback_query, state)
+@dp.callback_query_handler(lambda c: c.data == 'TRADE_BASKET_CONFIRM', state='*')
+async def trade_basket_confirm(callback_query: types.CallbackQuery, state: FSMContext):
+    await trading.execute_basket(callback_query, state)
+
+@dp.callback_query_handler(lambda c: c.data == 'MARKET_BUY_CONFIRM', state='*')
+async def market_buy_confirm(callback_query: types.CallbackQuery, state: FSMContext):
+    await marketplace.execute_buy(callback_query, state)
 
 @dp.callback_query_handler(lambda c: c.data == 'BUY_HOUSE_CONFIRM', state='*')
 async def buy_house_confirm(callback_query: types.CallbackQuery, state: FSMContext):
@@ -849,11 +1026,40 @@ async def buy_accessory_confirm(callback_query: types.CallbackQuery, state: FSMC
 async def on_startup(dp):
     await db.connect()
     await db.create_tables()
+    await confirmations.load()
+    confirmations.start()
+    user_settings.start()
+    await market.load()
+    await orders.load()
+    await alerts.load()
+    await custom_catalog.load()
+    await custom_catalog.start()
+    # Сначала подписка, потом загрузка: изменения во время загрузки не потеряются
+    await leaderboards.start()
+    await leaderboards.load()
+    await auction_house.load()
+    sender.start()
+    market.start()
+    dca.start()
+    auction_house.start()
+    weekly_top.start()
     
     me = await bot.me
     logger.info(f"✅ Бот {BOT_NAME} v{BOT_VERSION} запущен!")
     logger.info(f"👤 Username: @{me.username}")
     logger.info(f"👑 Админ: @{MAIN_ADMIN_USERNAME}")
 
+async def on_shutdown(dp):
+    # Сбрасываем в БД настройки, которые ещё не успели записаться
+    await user_settings.stop()
+    confirmations.stop()
+    market.stop()
+    dca.stop()
+    auction_house.stop()
+    weekly_top.stop()
+    sender.stop()
+    await custom_catalog.stop()
+    await leaderboards.stop()
+
 if __name__ == '__main__':
-    executor.start_polling(dp, skip_updates=True, on_startup=on_startup)
+    executor.start_polling(dp, skip_updates=True, on_startup=on_startup, on_shutdown=on_shutdown)
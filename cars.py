@@ -4,6 +4,7 @@ from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from database import Database
 from confirmations import ConfirmationSystem
+from catalog import Catalog
 from config import *
 import random
 
@@ -26,30 +27,67 @@ class CarShop:
             'Mercedes': {'min_price': 4000000, 'max_price': 10000000, 'speed': 340},
             'Ferrari': {'min_price': 10000000, 'max_price': 30000000, 'speed': 370}
         }
-
-    async def show_car_shop(self, message: types.Message):
-        keyboard = InlineKeyboardMarkup(row_width=2)
         
-        for brand in list(self.car_brands.keys())[:8]:
-            price_range = self.car_brands[brand]
-            btn_text = f"{brand} ({price_range['min_price']//1000}к - {price_range['max_price']//1000}к)"
-            keyboard.add(InlineKeyboardButton(btn_text, callback_data=f"car_buy_{brand}"))
+        # Модели от администрации (приходят из кэша товаров)
+        self.custom_cars = []
         
-        keyboard.add(
-            InlineKeyboardButton("📋 Мои машины", callback_data="my_cars"),
-            InlineKeyboardButton("◀️ Назад", callback_data="menu")
-        )
+        self.rebuild_catalog()
+
+    def rebuild_catalog(self):
+        """Пересобрать каталог после изменения списка моделей"""
+        brands = [{'id': brand, 'name': brand, 'price': info['min_price'], **info} for brand, info in self.car_brands.items()]
         
+        self.catalog = Catalog(
+            brands + self.custom_cars,
+            item_text=lambda car: '',
+            item_button=lambda car: (
+                f"{car['name']} ({car['min_price']//1000}к - {car['max_price']//1000}к)"
+                if car['min_price'] != car['max_price'] else f"{car['name']} ({car['price']//1000}к)"
+            ),
+            view_prefix='car_buy_',
+            page_prefix='cars_page_',
+            footer=[
+                InlineKeyboardButton("📋 Мои машины", callback_data="my_cars"),
+                InlineKeyboardButton("◀️ Назад", callback_data="menu")
+            ]
+        )
+
+    def set_custom_items(self, items: list):
+        """Заменить модели от администрации и пересобрать каталог"""
+        self.custom_cars = [
+            {
+                'id': f"custom_{item['id']}",
+                'catalog_id': item['id'],
+                'name': item['name'],
+                'price': item['price'],
+                'min_price': item['price'],
+                'max_price': item['price'],
+                'speed': item['attributes']['speed']
+            }
+            for item in items
+        ]
+        self.rebuild_catalog()
+
+    async def show_car_shop(self, message: types.Message):
         await message.reply(
             "🏎️ *АВТОСАЛОН* 🏎️\n\n"
             "Выберите марку автомобиля:",
             parse_mode="Markdown",
-            reply_markup=keyboard
+            reply_markup=self.catalog.page('all').keyboard
         )
 
+    async def show_car_page(self, callback_query: types.CallbackQuery, page: int):
+        catalog_page = self.catalog.page('all', page)
+        if catalog_page:
+            await callback_query.message.edit_reply_markup(reply_markup=catalog_page.keyboard)
+
     async def select_car_brand(self, callback_query: types.CallbackQuery, state: FSMContext):
         brand = callback_query.data.replace('car_buy_', '')
-        price_range = self.car_brands[brand]
+        price_range = self.catalog.get(brand)
+        
+        if not price_range:
+            await callback_query.answer("❌ Марка не найдена!", show_alert=True)
+            return
         
         price = random.randint(price_range['min_price'], price_range['max_price'])
         
@@ -59,13 +97,14 @@ class CarShop:
             callback_query.message,
             'buy_car',
             {
-                'text': f"Покупка: *{brand}*\n"
+                'text': f"Покупка: *{price_range['name']}*\n"
                         f"💰 Цена: {price}{CURR}\n"
                         f"⚡ Скорость: {price_range['speed']} км/ч\n\n"
                         f"Подтверждаете покупку?",
                 'car_brand': brand,
                 'car_price': price,
-                'car_speed': price_range['speed']
+                'car_speed': price_range['speed'],
+                'catalog_id': price_range.get('catalog_id')
             },
             'BUY_CAR_CONFIRM',
             'CANCEL'
@@ -75,13 +114,31 @@ class CarShop:
         data = await state.get_data()
         confirmed = data.get('confirmed_data', {})
         
-        result = await self.db.buy_car(
-            callback_query.from_user.id,
-            confirmed['car_brand'],
-            confirmed['car_price']
-        )
+        # Модель от администрации - покупка со склада
+        if confirmed.get('catalog_id'):
+            result = await self.db.buy_catalog_item(callback_query.from_user.id, confirmed['catalog_id'])
+            await callback_query.message.edit_text(result['message'])
+            await state.finish()
+            return
         
-        await callback_query.message.edit_text(result['message'], parse_mode="Markdown")
+        result = await self.db.purchase(callback_query.from_user.id, confirmed['car_price'], 'cars', {
+            'user_id': callback_query.from_user.id,
+            'brand': confirmed['car_brand'],
+            'model': confirmed['car_brand'],
+            'price': confirmed['car_price'],
+            'speed': confirmed['car_speed']
+        })
+        
+        if not result['success']:
+            await callback_query.message.edit_text(result['message'])
+            await state.finish()
+            return
+        
+        await callback_query.message.edit_text(
+            f"✅ Машина *{confirmed['car_brand']}* куплена за {confirmed['car_price']:,}{CURR}!\n"
+            f"💳 Баланс: {result['balance']:,}{CURR}",
+            parse_mode="Markdown"
+        )
         await state.finish()
 
     async def show_my_cars(self, callback_query: types.CallbackQuery):
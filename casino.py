@@ -5,6 +5,7 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from database import Database
 from payments import PaymentSystem
 from confirmations import ConfirmationSystem
+from leaderboard import LeaderboardService
 from config import *
 import random
 import asyncio
@@ -19,11 +20,18 @@ class CasinoStates(StatesGroup):
     waiting_for_duel_accept = State()
 
 class Casino:
-    def __init__(self, bot, db: Database, payments: PaymentSystem, confirmations: ConfirmationSystem):
+    def __init__(self, bot, db: Database, payments: PaymentSystem, confirmations: ConfirmationSystem, user_settings=None,
+                 leaderboards: LeaderboardService = None):
         self.bot = bot
         self.db = db
         self.payments = payments
         self.confirmations = confirmations
+        
+        if user_settings is None:
+            from settings import UserSettings
+            user_settings = UserSettings(bot, db)
+        self.user_settings = user_settings
+        self.leaderboards = leaderboards
         self.active_duels = {}  # Словарь для активных дуэлей
         self.jackpot = 1000000  # Начальный джекпот
 
@@ -408,8 +416,7 @@ class Casino:
     
     async def duel_start(self, callback_query: types.CallbackQuery, state: FSMContext):
         """Начало дуэли с другим игроком"""
-        from settings import UserSettings
-        user_settings = UserSettings(self.bot, self.db)
+        user_settings = self.user_settings
         
         # Проверяем настройки пользователя
         settings_check = await user_settings.check_permission(
@@ -456,8 +463,7 @@ class Casino:
                 return
             
             # Проверяем настройки соперника
-            from settings import UserSettings
-            user_settings = UserSettings(self.bot, self.db)
+            user_settings = self.user_settings
             opponent_settings = await user_settings.check_permission(opponent['user_id'], 'duel')
             
             if not opponent_settings:
@@ -767,23 +773,18 @@ class Casino:
         await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
     async def show_casino_top(self, callback_query: types.CallbackQuery):
-        """Показать топ игроков в казино"""
-        async with self.db.pool.acquire() as conn:
-            top = await conn.fetch('''
-                SELECT username, first_name, total_wins, total_games 
-                FROM users 
-                WHERE is_banned = FALSE AND total_games > 0
-                ORDER BY total_wins DESC, total_games DESC
-                LIMIT 10
-            ''')
+        """Показать топ игроков в казино (из памяти лидерборда)"""
+        top = self.leaderboards.top('casino')
+        
+        names = await self.user_settings.get_display_names_many(top)
         
         text = "🏆 *ТОП КАЗИНО* 🏆\n\n"
         
         for i, player in enumerate(top, 1):
-            name = player['username'] or player['first_name'] or f"Игрок {i}"
+            name = names[player['user_id']]
             win_rate = (player['total_wins'] / player['total_games']) * 100 if player['total_games'] > 0 else 0
             medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
-            text += f"{medal} @{name}\n"
+            text += f"{medal} {name}\n"
             text += f"   🎲 Побед: {player['total_wins']} | 📊 {win_rate:.1f}%\n\n"
         
         keyboard = InlineKeyboardMarkup()
@@ -0,0 +1,87 @@
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from config import *
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+class CatalogPage:
+    """Готовая страница каталога: товары, текст списка и клавиатура"""
+    __slots__ = ('items', 'text', 'keyboard')
+
+    def __init__(self, items: tuple, text: str, keyboard: InlineKeyboardMarkup):
+        self.items = items
+        self.text = text
+        self.keyboard = keyboard
+
+class Catalog:
+    """Неизменяемый каталог товаров: индексы и страницы строятся один раз, для изменений создаётся новый каталог"""
+    def __init__(
+        self,
+        items: List[Dict],
+        item_text: Callable[[Mapping], str],
+        item_button: Callable[[Mapping], str],
+        view_prefix: str,
+        page_prefix: str,
+        footer: List[InlineKeyboardButton],
+        category_of: Optional[Callable[[Mapping], str]] = None,
+        price_tiers: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+        page_size: int = CATALOG_PAGE_SIZE
+    ):
+        self.items = tuple(MappingProxyType(dict(item)) for item in items)
+        self.by_id = {item['id']: item for item in self.items}
+        
+        # Группы: 'all', категории и ценовые классы (low < price <= high)
+        groups = {'all': list(self.items)}
+        if category_of:
+            for item in self.items:
+                groups.setdefault(category_of(item), []).append(item)
+        for tier, (low, high) in (price_tiers or {}).items():
+            groups[tier] = [
+                item for item in self.items
+                if (low is None or item['price'] > low) and (high is None or item['price'] <= high)
+            ]
+        
+        self.pages = {}  # группа -> кортеж страниц
+        for group, group_items in groups.items():
+            chunks = [tuple(group_items[i:i + page_size]) for i in range(0, len(group_items), page_size)]
+            self.pages[group] = tuple(
+                CatalogPage(
+                    chunk,
+                    ''.join(item_text(item) for item in chunk) + (f"📄 Страница {number}/{len(chunks)}" if len(chunks) > 1 else ''),
+                    self._build_keyboard(chunk, group, number, len(chunks), item_button, view_prefix, page_prefix, footer)
+                )
+                for number, chunk in enumerate(chunks, 1)
+            )
+
+    @staticmethod
+    def _build_keyboard(chunk, group, number, total, item_button, view_prefix, page_prefix, footer) -> InlineKeyboardMarkup:
+        keyboard = InlineKeyboardMarkup(row_width=3)
+        for item in chunk:
+            keyboard.add(InlineKeyboardButton(item_button(item), callback_data=f"{view_prefix}{item['id']}"))
+        
+        if total > 1:
+            nav_buttons = []
+            if number > 1:
+                nav_buttons.append(InlineKeyboardButton("◀️", callback_data=f"{page_prefix}{group}_{number - 1}"))
+            if number < total:
+                nav_buttons.append(InlineKeyboardButton("▶️", callback_data=f"{page_prefix}{group}_{number + 1}"))
+            keyboard.row(*nav_buttons)
+        
+        keyboard.row(*footer)
+        return keyboard
+
+    def get(self, item_id) -> Optional[Mapping]:
+        """Товар по id за O(1)"""
+        return self.by_id.get(item_id)
+
+    def page(self, group: str, number: int = 1) -> Optional[CatalogPage]:
+        """Готовая страница группы (None - если группа пуста или страницы нет)"""
+        pages = self.pages.get(group)
+        if not pages or not 1 <= number <= len(pages):
+            return None
+        return pages[number - 1]
+
+    def page_count(self, group: str) -> int:
+        return len(self.pages.get(group, ()))
+
+    def __len__(self):
+        return len(self.items)
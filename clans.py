@@ -6,6 +6,7 @@ from database import Database
 from confirmations import ConfirmationSystem
 from config import *
 from typing import Dict, Optional
+import time
 
 class ClanStates(StatesGroup):
     waiting_for_clan_name = State()
@@ -13,6 +14,7 @@ class ClanStates(StatesGroup):
     waiting_for_clan_description = State()
     waiting_for_clan_type = State()
     waiting_for_application_text = State()
+    waiting_for_treasury_amount = State()
 
 class Clans:
     def __init__(self, bot, db: Database, confirmations: ConfirmationSystem):
@@ -25,6 +27,14 @@ class Clans:
             'closed': '🔒 Закрытый (по заявкам)',
             'invite': '📨 По приглашениям'
         }
+        self.list_orders = {
+            'top': '👥 По участникам',
+            'name': '🔤 По названию'
+        }
+        
+        # Первые страницы каталога кэшируются ненадолго и сбрасываются при создании клана, вступлении и выходе
+        self.first_pages = {}  # order -> (expires_at, кланы)
+        self.total_clans = None  # Считается один раз, дальше меняется вместе с созданием кланов
 
     async def show_clans_menu(self, message: types.Message):
         """Главное меню кланов"""
@@ -38,12 +48,13 @@ class Clans:
                 InlineKeyboardButton("🏰 Мой клан", callback_data="my_clan"),
                 InlineKeyboardButton("👥 Участники", callback_data="clan_members"),
                 InlineKeyboardButton("💰 Казна", callback_data="clan_treasury"),
-                InlineKeyboardButton("⚙️ Управление", callback_data="clan_manage")
+                InlineKeyboardButton("⚙️ Управление", callback_data="clan_manage"),
+                InlineKeyboardButton("🚪 Покинуть клан", callback_data="clan_leave")
             )
         else:
             keyboard.add(
                 InlineKeyboardButton("💰 Создать клан", callback_data="clan_create"),
-                InlineKeyboardButton("🔍 Найти клан", callback_data="clan_list_1"),
+                InlineKeyboardButton("🔍 Найти клан", callback_data="clan_list_top"),
                 InlineKeyboardButton("📋 Мои заявки", callback_data="my_applications"),
                 InlineKeyboardButton("🏆 Топ кланов", callback_data="clan_top")
             )
@@ -58,6 +69,7 @@ class Clans:
             text += f"Тип: {clan_type_emoji}\n"
             text += f"Участников: *{user_clan['members_count']}/{user_clan['max_members']}*\n"
             text += f"Казна: *{user_clan['balance']:,}{CURR}*\n"
+            text += f"Богатство участников: *{user_clan['members_wealth']:,}{CURR}*\n"
             if user_clan['description']:
                 text += f"\n📝 *Описание:* {user_clan['description']}\n"
         else:
@@ -67,44 +79,100 @@ class Clans:
         
         await message.reply(text, parse_mode="Markdown", reply_markup=keyboard)
 
-    async def clan_list(self, callback_query: types.CallbackQuery, page: int = 1):
-        """Показать список кланов"""
-        clans = await self.db.get_all_clans(page)
-        total_clans = await self.db.get_total_clans()
-        total_pages = (total_clans + 4) // 5
+    def invalidate_clan_list(self):
+        self.first_pages.clear()
+
+    async def get_clans_page(self, order: str, direction: str, cursor: Optional[int]) -> list:
+        """Страница каталога (+1 клан для проверки следующей). Первая страница берётся из кэша"""
+        if cursor:
+            return await self.db.get_clans_page(
+                order,
+                CLAN_PAGE_SIZE + 1,
+                after=cursor if direction == 'n' else None,
+                before=cursor if direction == 'p' else None
+            )
+        
+        cached = self.first_pages.get(order)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        clans = await self.db.get_clans_page(order, CLAN_PAGE_SIZE + 1)
+        self.first_pages[order] = (time.monotonic() + CLAN_LIST_CACHE_TTL, clans)
+        return clans
+
+    async def clan_list(self, callback_query: types.CallbackQuery):
+        """Каталог кланов: clan_list_{order} и clan_list_{order}_{n|p}_{id крайнего клана}"""
+        parts = callback_query.data.split('_')
+        order = parts[2]
+        direction, cursor = (parts[3], int(parts[4])) if len(parts) > 3 else ('', None)
+        
+        clans = await self.get_clans_page(order, direction, cursor)
+        
+        # Лишний клан показывает, есть ли страница дальше по направлению движения
+        has_more = len(clans) > CLAN_PAGE_SIZE
+        if direction == 'p':
+            clans = clans[-CLAN_PAGE_SIZE:]
+            has_prev, has_next = has_more, True
+        else:
+            clans = clans[:CLAN_PAGE_SIZE]
+            has_prev, has_next = cursor is not None, has_more
+        
+        if self.total_clans is None:
+            self.total_clans = await self.db.get_total_clans()
+        
+        text = f"📋 *СПИСОК КЛАНОВ* 📋\n\nВсего кланов: {self.total_clans}\n\n"
+        keyboard = InlineKeyboardMarkup(row_width=2)
         
-        text = f"📋 *СПИСОК КЛАНОВ (стр. {page}/{total_pages})* 📋\n\n"
+        if not clans:
+            text += "Кланов пока нет"
         
-        for i, clan in enumerate(clans, (page-1)*5 + 1):
+        for clan in clans:
             clan_type_emoji = "🔓" if clan['type'] == 'open' else "🔒" if clan['type'] == 'closed' else "📨"
-            text += f"{i}. {clan_type_emoji} *{clan['name']}* [{clan['tag']}]\n"
+            text += f"{clan_type_emoji} *{clan['name']}* [{clan['tag']}]\n"
             text += f"   👑 Владелец: @{clan['owner_name'] or 'Неизвестно'}\n"
             text += f"   👥 Участников: {clan['members_count']}/{clan['max_members']}\n"
             text += f"   💰 Казна: {clan['balance']:,}{CURR}\n\n"
-            
-            keyboard = InlineKeyboardMarkup(row_width=1)
-            keyboard.add(InlineKeyboardButton(
+            keyboard.row(InlineKeyboardButton(
                 f"🔍 Просмотреть {clan['name']}",
                 callback_data=f"clan_view_{clan['id']}"
             ))
-            
-            await callback_query.message.answer(text, parse_mode="Markdown", reply_markup=keyboard)
-            text = ""
         
-        nav_keyboard = InlineKeyboardMarkup(row_width=3)
         nav_buttons = []
+        if has_prev and clans:
+            nav_buttons.append(InlineKeyboardButton("◀️", callback_data=f"clan_list_{order}_p_{clans[0]['id']}"))
+        if has_next and clans:
+            nav_buttons.append(InlineKeyboardButton("▶️", callback_data=f"clan_list_{order}_n_{clans[-1]['id']}"))
+        if nav_buttons:
+            keyboard.row(*nav_buttons)
+        
+        keyboard.add(*[
+            InlineKeyboardButton(title, callback_data=f"clan_list_{key}")
+            for key, title in self.list_orders.items() if key != order
+        ])
+        keyboard.add(InlineKeyboardButton("🏠 Главное меню", callback_data="menu"))
         
-        if page > 1:
-            nav_buttons.append(InlineKeyboardButton("◀️", callback_data=f"clan_list_{page-1}"))
-        nav_buttons.append(InlineKeyboardButton(f"{page}/{total_pages}", callback_data="clan_list_current"))
-        if page < total_pages:
-            nav_buttons.append(InlineKeyboardButton("▶️", callback_data=f"clan_list_{page+1}"))
+        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
+
+    async def show_clan_top(self, callback_query: types.CallbackQuery):
+        """Топ кланов по богатству участников (готовый агрегат members_wealth)"""
+        clans = await self.db.get_clans_by_wealth(CLAN_TOP_SIZE)
+        
+        text = "🏆 *ТОП КЛАНОВ* 🏆\n\n"
+        keyboard = InlineKeyboardMarkup(row_width=1)
+        
+        if not clans:
+            text += "Кланов пока нет"
         
-        nav_keyboard.row(*nav_buttons)
-        nav_keyboard.add(InlineKeyboardButton("🏠 Главное меню", callback_data="menu"))
+        for i, clan in enumerate(clans, 1):
+            medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
+            text += f"{medal} *{clan['name']}* [{clan['tag']}]\n"
+            text += f"   💎 Богатство участников: {clan['members_wealth']:,}{CURR}\n"
+            text += f"   👥 Участников: {clan['members_count']}/{clan['max_members']}\n\n"
+            keyboard.add(InlineKeyboardButton(f"🔍 {clan['name']}", callback_data=f"clan_view_{clan['id']}"))
         
-        await callback_query.message.answer("Навигация:", reply_markup=nav_keyboard)
-        await callback_query.message.delete()
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="clans_menu"))
+        
+        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
     async def view_clan(self, callback_query: types.CallbackQuery):
         """Просмотр информации о клане"""
@@ -139,7 +207,7 @@ class Clans:
             elif clan['type'] == 'closed':
                 keyboard.add(InlineKeyboardButton("📝 Подать заявку", callback_data=f"clan_apply_{clan_id}"))
         
-        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="clan_list_1"))
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="clan_list_top"))
         
         await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
@@ -238,6 +306,11 @@ class Clans:
             confirmed['clan_type']
         )
         
+        if result['success']:
+            self.invalidate_clan_list()
+            if self.total_clans is not None:
+                self.total_clans += 1
+        
         await callback_query.message.edit_text(result['message'], parse_mode="Markdown")
         await state.finish()
 
@@ -272,4 +345,86 @@ class Clans:
         
         await callback_query.answer(result['message'], show_alert=True)
         if result['success']:
+            self.invalidate_clan_list()
+            await callback_query.message.delete()
+
+    async def leave_clan(self, callback_query: types.CallbackQuery):
+        """Выход из клана (владелец выйти не может)"""
+        result = await self.db.leave_clan(callback_query.from_user.id)
+        
+        await callback_query.answer(result['message'], show_alert=True)
+        if result['success']:
+            self.invalidate_clan_list()
             await callback_query.message.delete()
+
+    # ========== КАЗНА ==========
+
+    async def show_treasury(self, callback_query: types.CallbackQuery):
+        """Казна клана и последние записи журнала"""
+        user_clan = await self.db.get_user_clan(callback_query.from_user.id)
+        if not user_clan:
+            await callback_query.answer("❌ Вы не состоите в клане!", show_alert=True)
+            return
+        
+        history = await self.db.get_clan_treasury_history(user_clan['id'], CLAN_TREASURY_HISTORY)
+        
+        text = f"💰 *КАЗНА КЛАНА {user_clan['name']}* 💰\n\n"
+        text += f"Баланс казны: *{user_clan['balance']:,}{CURR}*\n\n"
+        
+        if history:
+            text += "📜 *Последние операции:*\n"
+            for entry in history:
+                sign = "➕" if entry['amount'] > 0 else "➖"
+                text += f"{sign} {abs(entry['amount']):,}{CURR} — @{entry['username'] or entry['user_id']} ({entry['created_at'].strftime('%d.%m %H:%M')})\n"
+        else:
+            text += "Операций пока не было"
+        
+        keyboard = InlineKeyboardMarkup(row_width=2)
+        buttons = [InlineKeyboardButton("➕ Пополнить", callback_data="clan_deposit")]
+        if user_clan['rank'] >= CLAN_TREASURY_WITHDRAW_RANK:
+            buttons.append(InlineKeyboardButton("➖ Вывести", callback_data="clan_withdraw"))
+        keyboard.add(*buttons)
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="clans_menu"))
+        
+        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
+
+    async def treasury_amount_start(self, callback_query: types.CallbackQuery, state: FSMContext):
+        """clan_deposit / clan_withdraw: запрос суммы"""
+        operation = callback_query.data.replace('clan_', '')
+        
+        await state.update_data(treasury_operation=operation)
+        await ClanStates.waiting_for_treasury_amount.set()
+        await callback_query.message.edit_text(
+            "Введите сумму взноса в казну:" if operation == 'deposit' else "Введите сумму вывода из казны:"
+        )
+
+    async def process_treasury_amount(self, message: types.Message, state: FSMContext):
+        try:
+            amount = int(message.text)
+        except ValueError:
+            await message.reply("❌ Введите корректную сумму!")
+            return
+        
+        if amount <= 0:
+            await message.reply("❌ Сумма должна быть больше 0!")
+            return
+        
+        data = await state.get_data()
+        await state.finish()
+        
+        if data['treasury_operation'] == 'deposit':
+            result = await self.db.clan_treasury_deposit(message.from_user.id, amount)
+            done = f"✅ Вы внесли {amount:,}{CURR} в казну клана"
+        else:
+            result = await self.db.clan_treasury_withdraw(message.from_user.id, amount)
+            done = f"✅ Вы вывели {amount:,}{CURR} из казны клана"
+        
+        if not result['success']:
+            await message.reply(result['message'])
+            return
+        
+        await message.reply(
+            f"{done}\n"
+            f"🏰 Казна: {result['clan_balance']:,}{CURR}\n"
+            f"💳 Ваш баланс: {result['balance']:,}{CURR}"
+        )
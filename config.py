@@ -37,7 +37,89 @@ JACKPOT_CHANCE = 0.001    # 0.1% шанс выиграть джекпот
 # Кланы
 CLAN_CREATE_PRICE = 10000
 CLAN_MAX_MEMBERS = 100
+CLAN_PAGE_SIZE = 10             # Кланов на одной странице каталога
+CLAN_LIST_CACHE_TTL = 30        # Сколько живут закэшированные первые страницы каталога (сек)
+CLAN_TREASURY_WITHDRAW_RANK = 5 # С какого ранга можно выводить из казны (5 - владелец)
+CLAN_TREASURY_HISTORY = 10      # Записей журнала казны на экране
+CLAN_TOP_SIZE = 10              # Кланов в топе по богатству участников
+
+# Еженедельные топы
+WEEKLY_TOP_SIZE = 10                            # Мест в каждом топе
+WEEKLY_TOP_PRIZES = [100000, 50000, 25000]      # Призы за 1-3 место по балансу
+WEEKLY_REFERRAL_PRIZES = [50000, 25000, 10000]  # Призы за 1-3 место по рефералам
+WEEKLY_CLAN_PRIZES = [500000, 250000, 100000]   # Призы в казну клана за 1-3 место
+
+# Лидерборды
+LEADERBOARD_SIZE = 10           # Мест на экране топа
+LEADERBOARD_RESERVE = 40        # Запас мест в памяти сверх экрана (меньше перестроений из БД)
+LEADERBOARD_NOTIFY_CHANNEL = 'leaderboard'  # Канал LISTEN/NOTIFY изменений балансов и статистики
 
 # Государство
 GOVERNMENT_BUY_PERCENT = 80  # Покупает за 80% от цены
 GOVERNMENT_FEE_PERCENT = 20  # 20% комиссия
+
+# Настройки пользователей
+SETTINGS_CACHE_SIZE = 10000     # Сколько пользователей держим в LRU-кэше
+SETTINGS_FLUSH_INTERVAL = 5     # Интервал записи изменённых настроек в БД (сек)
+
+# Подтверждения
+CONFIRMATION_TTL = 600              # Время жизни подтверждения (сек)
+CONFIRMATION_SWEEP_INTERVAL = 60    # Как часто чистим истёкшие (сек)
+CONFIRMATION_SWEEP_BATCH = 1000     # Сколько истёкших удаляем за один проход
+
+# Защита от повторных нажатий
+IDEMPOTENCY_TTL = 30            # Сколько помним обработанное нажатие (сек)
+IDEMPOTENCY_MAX_KEYS = 20000    # Максимум ключей в памяти
+
+# Крипторынок
+CRYPTO_TICK_INTERVAL = 60                   # Шаг изменения цен (сек)
+CRYPTO_MIN_PRICE = 0.00000001               # Нижняя граница цены монеты
+CRYPTO_UNITS = 100000000                    # Минимальных единиц в одной монете (количества хранятся в BIGINT)
+CRYPTO_CANDLES_CACHE_HOURS = 24             # Сколько часовых свечей держим в памяти для графика
+CRYPTO_TICKS_RETENTION_DAYS = 7             # Сколько храним сырые тики
+CRYPTO_MINUTE_CANDLES_RETENTION_DAYS = 3    # Сколько храним минутные свечи
+CRYPTO_PRUNE_INTERVAL = 3600                # Как часто чистим историю (сек)
+CRYPTO_ORDERS_FILL_BATCH = 500              # Сколько ордеров исполняем одной транзакцией
+CRYPTO_ALERTS_PER_USER = 10                 # Максимум ценовых алертов у игрока
+
+# Уведомления
+NOTIFY_RATE = 25                # Сообщений в секунду (лимит Telegram - 30)
+NOTIFY_QUEUE_SIZE = 100000      # Максимум сообщений в очереди
+
+# Автопокупки крипты
+DCA_CHECK_INTERVAL = 300        # Как часто исполняем наступившие планы (сек)
+DCA_PLANS_PER_USER = 5          # Максимум планов у игрока
+DCA_MIN_AMOUNT = 100            # Минимальная сумма одной автопокупки
+DCA_INTERVALS = {               # Интервал в часах -> подпись
+    24: 'каждый день',
+    168: 'каждую неделю'
+}
+
+# Каталоги магазинов
+CATALOG_PAGE_SIZE = 10          # Товаров на одной странице каталога
+CATALOG_NOTIFY_CHANNEL = 'catalog_items'  # Канал LISTEN/NOTIFY изменений товаров
+CUSTOM_ITEM_ID_OFFSET = 1000    # Смещение id товаров от администрации в каталогах домов и аксессуаров
+
+# Обмен предметами
+TRADE_BASKET_MAX_ITEMS = 50     # Предметов в одной корзине обмена
+
+# Рынок
+MARKET_FEE = 0.05               # 5% комиссия с продажи на рынке
+MARKET_PAGE_SIZE = 10           # Лотов на одной странице
+MARKET_MAX_PRICE = 2000000000   # Верхняя граница цены лота (влезает в transactions.amount)
+
+# Списки предметов игрока
+ITEMS_PAGE_SIZE = 10            # Предметов на одной странице инвентаря, обмена и продажи
+
+# Аукционы
+AUCTION_FEE = 0.05              # 5% комиссия с проданного лота
+AUCTION_MIN_STEP_PERCENT = 5    # Минимальный шаг ставки (% от текущей)
+AUCTION_EXTEND_SECONDS = 120    # Ставка в последние 2 минуты продлевает аукцион до 2 минут
+AUCTION_RETRY_DELAY = 30        # Повтор закрытия после ошибки (сек)
+AUCTION_LIST_SIZE = 20          # Аукционов в списке
+AUCTION_MAX_PRICE = 2000000000  # Верхняя граница стартовой цены и ставки
+AUCTION_DURATIONS = {           # Длительность в часах -> подпись
+    1: '1 час',
+    6: '6 часов',
+    24: '1 день'
+}
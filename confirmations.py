@@ -1,15 +1,45 @@
 from aiogram import types
 from aiogram.dispatcher import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from config import *
+import asyncio
+import heapq
+import logging
+import secrets
+import time
+
+logger = logging.getLogger(__name__)
 
 class ConfirmationSystem:
-    def __init__(self, bot):
+    def __init__(self, bot, db=None):
         self.bot = bot
+        # Если передана БД - подтверждения переживают перезапуск бота
+        self.db = db
         self.active_confirmations = {}
+        # Индекс истечения: куча (expires_at, confirm_id)
+        self.expiry_heap = []
+        self.sweep_task = None
+        self.stats = {
+            'created': 0,
+            'confirmed': 0,
+            'cancelled': 0,
+            'expired': 0
+        }
+
+    def new_confirm_id(self) -> str:
+        """Короткий уникальный токен (16 hex-символов, без '_')"""
+        while True:
+            confirm_id = secrets.token_hex(8)
+            if confirm_id not in self.active_confirmations:
+                return confirm_id
+
+    def _add(self, confirm_id: str, conf: dict):
+        self.active_confirmations[confirm_id] = conf
+        heapq.heappush(self.expiry_heap, (conf['expires_at'], confirm_id))
 
     async def ask_confirmation(self, message: types.Message, action: str, data: dict, confirm_callback: str, cancel_callback: str):
         """Запрос подтверждения действия"""
-        confirm_id = f"{message.from_user.id}_{len(self.active_confirmations)}"
+        confirm_id = self.new_confirm_id()
         
         keyboard = InlineKeyboardMarkup(row_width=2)
         keyboard.add(
@@ -17,14 +47,20 @@ class ConfirmationSystem:
             InlineKeyboardButton("❌ Отмена", callback_data=f"cancel_{confirm_id}")
         )
         
-        self.active_confirmations[confirm_id] = {
+        conf = {
             'user_id': message.from_user.id,
             'action': action,
             'data': data,
             'confirm_callback': confirm_callback,
             'cancel_callback': cancel_callback,
-            'message_id': message.message_id
+            'message_id': message.message_id,
+            'expires_at': time.time() + CONFIRMATION_TTL
         }
+        self._add(confirm_id, conf)
+        self.stats['created'] += 1
+        
+        if self.db:
+            await self.db.save_confirmation(confirm_id, conf)
         
         await message.reply(
             f"⚠️ *Подтвердите действие*\n\n{data.get('text', '')}",
@@ -36,25 +72,82 @@ class ConfirmationSystem:
 
     async def process_confirmation(self, callback_query: types.CallbackQuery, state: FSMContext):
         """Обработка подтверждения"""
-        data = callback_query.data.split('_')
-        action = data[0]
-        confirm_id = data[1]
+        action, confirm_id = callback_query.data.split('_', 1)
         
-        if confirm_id not in self.active_confirmations:
+        conf = self.active_confirmations.get(confirm_id)
+        
+        if not conf or conf['expires_at'] <= time.time():
             await callback_query.answer("❌ Подтверждение устарело", show_alert=True)
             return
         
-        conf = self.active_confirmations[confirm_id]
-        
         if conf['user_id'] != callback_query.from_user.id:
             await callback_query.answer("❌ Это не ваше подтверждение", show_alert=True)
             return
         
+        del self.active_confirmations[confirm_id]
+        if self.db:
+            await self.db.delete_confirmation(confirm_id)
+        
         if action == 'confirm':
+            self.stats['confirmed'] += 1
             await state.update_data(confirmed_data=conf['data'])
             await state.set_state(conf['confirm_callback'])
             await callback_query.message.edit_text("✅ Подтверждено! Продолжайте...")
         else:
+            self.stats['cancelled'] += 1
             await callback_query.message.edit_text("❌ Действие отменено")
+
+    async def sweep_expired(self) -> int:
+        """Удалить истёкшие подтверждения (не больше CONFIRMATION_SWEEP_BATCH за проход)"""
+        now = time.time()
+        removed = 0
+        
+        while self.expiry_heap and self.expiry_heap[0][0] <= now and removed < CONFIRMATION_SWEEP_BATCH:
+            expires_at, confirm_id = heapq.heappop(self.expiry_heap)
+            conf = self.active_confirmations.get(confirm_id)
+            # Запись в куче могла остаться от уже обработанного подтверждения
+            if conf and conf['expires_at'] == expires_at:
+                del self.active_confirmations[confirm_id]
+                removed += 1
         
-        del self.active_confirmations[confirm_id]
\ No newline at end of file
+        self.stats['expired'] += removed
+        
+        if self.db:
+            await self.db.delete_expired_confirmations(now)
+        
+        if removed:
+            logger.info(f"🧹 Удалено {removed} истёкших подтверждений, активных: {len(self.active_confirmations)}")
+        return removed
+
+    def get_stats(self) -> dict:
+        """Метрики хранилища подтверждений"""
+        return {'active': len(self.active_confirmations), **self.stats}
+
+    async def load(self):
+        """Загрузить неистёкшие подтверждения из БД после перезапуска"""
+        if not self.db:
+            return
+        
+        for confirm_id, conf in (await self.db.get_pending_confirmations(time.time())).items():
+            self._add(confirm_id, conf)
+        
+        logger.info(f"✅ Загружено {len(self.active_confirmations)} подтверждений")
+
+    async def run_sweeper(self):
+        """Фоновая очистка истёкших подтверждений"""
+        while True:
+            await asyncio.sleep(CONFIRMATION_SWEEP_INTERVAL)
+            try:
+                await self.sweep_expired()
+            except Exception as e:
+                logger.error(f"❌ Ошибка очистки подтверждений: {e}")
+
+    def start(self):
+        """Запуск фоновой очистки"""
+        if self.sweep_task is None:
+            self.sweep_task = asyncio.create_task(self.run_sweeper())
+
+    def stop(self):
+        if self.sweep_task:
+            self.sweep_task.cancel()
+            self.sweep_task = None
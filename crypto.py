@@ -5,31 +5,48 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from database import Database
 from payments import PaymentSystem
 from confirmations import ConfirmationSystem
+from market import CryptoMarketEngine
+from orders import OrderBook
+from alerts import PriceAlerts
+from dca import DCAScheduler
 from config import *
 
 class CryptoStates(StatesGroup):
     waiting_for_crypto_select = State()
     waiting_for_buy_amount = State()
     waiting_for_sell_amount = State()
+    waiting_for_limit_price = State()
+    waiting_for_limit_amount = State()
+    waiting_for_alert_price = State()
+    waiting_for_dca_amount = State()
 
 class CryptoMarket:
-    def __init__(self, bot, db: Database, payments: PaymentSystem, confirmations: ConfirmationSystem):
+    def __init__(self, bot, db: Database, payments: PaymentSystem, confirmations: ConfirmationSystem, market: CryptoMarketEngine, orders: OrderBook, alerts: PriceAlerts, dca: DCAScheduler):
         self.bot = bot
         self.db = db
         self.payments = payments
         self.confirmations = confirmations
+        self.market = market
+        self.orders = orders
+        self.alerts = alerts
+        self.dca = dca
+        
+        self.sparkline_chars = '▁▂▃▄▅▆▇█'
 
     async def show_crypto_market(self, message: types.Message):
-        cryptos = await self.db.get_crypto_list()
+        cryptos = self.market.get_snapshot()
         
         keyboard = InlineKeyboardMarkup(row_width=2)
         
         for crypto in cryptos[:6]:
-            btn_text = f"{crypto['symbol']} - {float(crypto['price']):.2f}{CURR}"
+            btn_text = f"{crypto['symbol']} - {crypto['price']:.2f}{CURR}"
             keyboard.add(InlineKeyboardButton(btn_text, callback_data=f"crypto_select_{crypto['id']}"))
         
         keyboard.add(
             InlineKeyboardButton("📊 Мой портфель", callback_data="crypto_wallet"),
+            InlineKeyboardButton("📋 Мои ордера", callback_data="crypto_orders"),
+            InlineKeyboardButton("🔔 Мои алерты", callback_data="crypto_alerts"),
+            InlineKeyboardButton("🔁 Автопокупки", callback_data="crypto_dca_list"),
             InlineKeyboardButton("◀️ Назад", callback_data="menu")
         )
         
@@ -40,22 +57,57 @@ class CryptoMarket:
             reply_markup=keyboard
         )
 
+    def format_sparkline(self, values: list) -> str:
+        """Текстовый мини-график из ряда цен"""
+        if not values:
+            return ''
+        
+        low, high = min(values), max(values)
+        if high == low:
+            return self.sparkline_chars[3] * len(values)
+        
+        steps = len(self.sparkline_chars) - 1
+        return ''.join(self.sparkline_chars[round((v - low) / (high - low) * steps)] for v in values)
+
+    def format_price_history(self, crypto_id: int, price: float) -> str:
+        """Изменение цены и график за последние часы по кэшу свечей"""
+        candles = self.market.get_candles(crypto_id)
+        if not candles:
+            return ''
+        
+        first_price = candles[0]['open']
+        change = (price - first_price) / first_price * 100 if first_price else 0
+        change_emoji = "📈" if change >= 0 else "📉"
+        
+        text = f"{change_emoji} За {len(candles)} ч: *{change:+.2f}%*\n"
+        text += f"`{self.format_sparkline([c['close'] for c in candles])}`\n\n"
+        return text
+
     async def select_crypto(self, callback_query: types.CallbackQuery, state: FSMContext):
         crypto_id = int(callback_query.data.replace('crypto_select_', ''))
-        crypto = await self.db.get_crypto_by_id(crypto_id)
+        crypto = self.market.get_coin(crypto_id) or await self.db.get_crypto_by_id(crypto_id)
+        
+        if not crypto:
+            await callback_query.answer("❌ Криптовалюта не найдена!", show_alert=True)
+            return
         
-        await state.update_data(crypto_id=crypto_id, crypto_symbol=crypto['symbol'], crypto_price=float(crypto['price']))
+        await state.update_data(crypto_id=crypto_id, crypto_symbol=crypto['symbol'], crypto_price=crypto['price'])
         
         keyboard = InlineKeyboardMarkup(row_width=2)
         keyboard.add(
             InlineKeyboardButton("💰 Купить", callback_data="crypto_buy"),
             InlineKeyboardButton("💸 Продать", callback_data="crypto_sell"),
+            InlineKeyboardButton("📝 Лимит: купить", callback_data="crypto_limit_buy"),
+            InlineKeyboardButton("📝 Лимит: продать", callback_data="crypto_limit_sell"),
+            InlineKeyboardButton("🔔 Алерт", callback_data="crypto_alert"),
+            InlineKeyboardButton("🔁 Автопокупка", callback_data="crypto_dca"),
             InlineKeyboardButton("◀️ Назад", callback_data="crypto_menu")
         )
         
         await callback_query.message.edit_text(
             f"💎 *{crypto['name']} ({crypto['symbol']})*\n\n"
-            f"💰 Текущая цена: *{float(crypto['price']):.2f}{CURR}*\n\n"
+            f"💰 Текущая цена: *{crypto['price']:.2f}{CURR}*\n\n"
+            f"{self.format_price_history(crypto_id, crypto['price'])}"
             f"Выберите действие:",
             parse_mode="Markdown",
             reply_markup=keyboard
@@ -67,11 +119,15 @@ class CryptoMarket:
 
     async def process_buy_amount(self, message: types.Message, state: FSMContext):
         try:
-            amount = float(message.text)
+            amount = int(float(message.text))
         except ValueError:
             await message.reply("❌ Введите корректную сумму!")
             return
         
+        if amount <= 0:
+            await message.reply("❌ Сумма должна быть больше нуля!")
+            return
+        
         data = await state.get_data()
         user = await self.db.get_user(message.from_user.id)
         
@@ -125,15 +181,15 @@ class CryptoMarket:
                 user_crypto = w
                 break
         
-        if not user_crypto or float(user_crypto['amount']) <= 0:
+        if not user_crypto or user_crypto['amount'] <= 0:
             await callback_query.answer(f"❌ У вас нет {data['crypto_symbol']}!", show_alert=True)
             return
         
-        await state.update_data(crypto_amount=float(user_crypto['amount']), avg_price=float(user_crypto['average_buy_price']))
+        await state.update_data(crypto_units=user_crypto['amount'])
         
         await callback_query.message.edit_text(
             f"Введите количество {data['crypto_symbol']} для продажи:\n"
-            f"Доступно: {float(user_crypto['amount']):.8f}"
+            f"Доступно: {user_crypto['amount'] / CRYPTO_UNITS:.8f}"
         )
         await CryptoStates.waiting_for_sell_amount.set()
 
@@ -145,9 +201,14 @@ class CryptoMarket:
             return
         
         data = await state.get_data()
+        units = round(amount * CRYPTO_UNITS)
+        
+        if units <= 0:
+            await message.reply("❌ Количество должно быть больше нуля!")
+            return
         
-        if amount > data['crypto_amount']:
-            await message.reply(f"❌ У вас только {data['crypto_amount']:.8f} {data['crypto_symbol']}!")
+        if units > data['crypto_units']:
+            await message.reply(f"❌ У вас только {data['crypto_units'] / CRYPTO_UNITS:.8f} {data['crypto_symbol']}!")
             return
         
         await self.confirmations.ask_confirmation(
@@ -162,10 +223,9 @@ class CryptoMarket:
                         f"Подтверждаете продажу?",
                 'user_id': message.from_user.id,
                 'crypto_id': data['crypto_id'],
-                'crypto_amount': amount,
+                'crypto_units': units,
                 'crypto_symbol': data['crypto_symbol'],
-                'crypto_price': data['crypto_price'],
-                'avg_price': data['avg_price']
+                'crypto_price': data['crypto_price']
             },
             'SELL_CRYPTO_CONFIRM',
             'CANCEL'
@@ -178,15 +238,287 @@ class CryptoMarket:
         result = await self.payments.process_crypto_sell(
             confirmed['user_id'],
             confirmed['crypto_id'],
-            confirmed['crypto_amount'],
+            confirmed['crypto_units'],
             confirmed['crypto_symbol'],
-            confirmed['crypto_price'],
-            confirmed['avg_price']
+            confirmed['crypto_price']
         )
         
         await callback_query.message.edit_text(result['message'], parse_mode="Markdown")
         await state.finish()
 
+    async def limit_order_start(self, callback_query: types.CallbackQuery, state: FSMContext):
+        """Начало выставления лимитного ордера"""
+        side = callback_query.data.replace('crypto_limit_', '')
+        data = await state.get_data()
+        
+        await state.update_data(limit_side=side)
+        
+        condition = "опустится до" if side == 'buy' else "поднимется до"
+        await callback_query.message.edit_text(
+            f"Текущая цена {data['crypto_symbol']}: {data['crypto_price']:.2f}{CURR}\n"
+            f"Введите цену: ордер исполнится, когда цена {condition} неё:"
+        )
+        await CryptoStates.waiting_for_limit_price.set()
+
+    async def process_limit_price(self, message: types.Message, state: FSMContext):
+        try:
+            limit_price = float(message.text)
+        except ValueError:
+            await message.reply("❌ Введите корректную цену!")
+            return
+        
+        if limit_price <= 0:
+            await message.reply("❌ Цена должна быть больше нуля!")
+            return
+        
+        data = await state.get_data()
+        await state.update_data(limit_price=limit_price)
+        
+        if data['limit_side'] == 'buy':
+            await message.reply("Введите сумму в USD для покупки:")
+        else:
+            await message.reply(f"Введите количество {data['crypto_symbol']} для продажи:")
+        await CryptoStates.waiting_for_limit_amount.set()
+
+    async def process_limit_amount(self, message: types.Message, state: FSMContext):
+        try:
+            amount = float(message.text)
+        except ValueError:
+            await message.reply("❌ Введите корректное количество!")
+            return
+        
+        data = await state.get_data()
+        
+        # Покупка - сумма в валюте, продажа - минимальные единицы монеты
+        amount = int(amount) if data['limit_side'] == 'buy' else round(amount * CRYPTO_UNITS)
+        
+        if amount <= 0:
+            await message.reply("❌ Количество должно быть больше нуля!")
+            return
+        
+        if data['limit_side'] == 'buy':
+            text = (f"Лимитная покупка: {data['crypto_symbol']}\n"
+                    f"Сумма: {amount}{CURR}\n"
+                    f"Цена срабатывания: {data['limit_price']:.2f}{CURR}\n"
+                    f"Комиссия: {amount * CRYPTO_FEE:.2f}{CURR}\n\n"
+                    f"Сумма будет заморожена до исполнения или отмены ордера.")
+        else:
+            text = (f"Лимитная продажа: {data['crypto_symbol']}\n"
+                    f"Количество: {amount / CRYPTO_UNITS:.8f}\n"
+                    f"Цена срабатывания: {data['limit_price']:.2f}{CURR}\n"
+                    f"Комиссия: {amount / CRYPTO_UNITS * data['limit_price'] * CRYPTO_FEE:.2f}{CURR}\n\n"
+                    f"Монеты будут заморожены до исполнения или отмены ордера.")
+        
+        await self.confirmations.ask_confirmation(
+            message,
+            'limit_order',
+            {
+                'text': text,
+                'user_id': message.from_user.id,
+                'crypto_id': data['crypto_id'],
+                'side': data['limit_side'],
+                'limit_price': data['limit_price'],
+                'amount': amount
+            },
+            'LIMIT_ORDER_CONFIRM',
+            'CANCEL'
+        )
+
+    async def execute_limit_order(self, callback_query: types.CallbackQuery, state: FSMContext):
+        data = await state.get_data()
+        confirmed = data.get('confirmed_data', {})
+        
+        result = await self.orders.place_order(
+            confirmed['user_id'],
+            confirmed['crypto_id'],
+            confirmed['side'],
+            confirmed['limit_price'],
+            confirmed['amount']
+        )
+        
+        await callback_query.message.edit_text(result['message'])
+        await state.finish()
+
+    async def show_orders(self, callback_query: types.CallbackQuery):
+        """Открытые лимитные ордера пользователя"""
+        orders = await self.db.get_user_crypto_orders(callback_query.from_user.id)
+        
+        if not orders:
+            await callback_query.answer("📭 У вас нет открытых ордеров", show_alert=True)
+            return
+        
+        text = "📋 *МОИ ОРДЕРА* 📋\n\n"
+        keyboard = InlineKeyboardMarkup(row_width=1)
+        
+        for order in orders:
+            if order['side'] == 'buy':
+                text += f"#{order['id']} 🟢 Покупка *{order['symbol']}* на {order['amount_usd']}{CURR}\n"
+            else:
+                text += f"#{order['id']} 🔴 Продажа {order['crypto_amount'] / CRYPTO_UNITS:.8f} *{order['symbol']}*\n"
+            text += f"   Цена срабатывания: {order['limit_price']:.2f}{CURR}\n\n"
+            keyboard.add(InlineKeyboardButton(f"❌ Отменить #{order['id']}", callback_data=f"crypto_order_cancel_{order['id']}"))
+        
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="crypto_menu"))
+        
+        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
+
+    async def cancel_order(self, callback_query: types.CallbackQuery):
+        order_id = int(callback_query.data.replace('crypto_order_cancel_', ''))
+        
+        result = await self.orders.cancel_order(order_id, callback_query.from_user.id)
+        
+        if not result['success']:
+            await callback_query.answer(result['message'], show_alert=True)
+            return
+        
+        keyboard = InlineKeyboardMarkup()
+        keyboard.add(InlineKeyboardButton("📋 Мои ордера", callback_data="crypto_orders"))
+        
+        await callback_query.message.edit_text(result['message'], reply_markup=keyboard)
+
+    async def alert_start(self, callback_query: types.CallbackQuery, state: FSMContext):
+        """Начало установки ценового алерта"""
+        data = await state.get_data()
+        
+        await callback_query.message.edit_text(
+            f"Текущая цена {data['crypto_symbol']}: {data['crypto_price']:.2f}{CURR}\n"
+            f"Введите цену - пришлём уведомление, когда курс её пересечёт:"
+        )
+        await CryptoStates.waiting_for_alert_price.set()
+
+    async def process_alert_price(self, message: types.Message, state: FSMContext):
+        try:
+            threshold = float(message.text)
+        except ValueError:
+            await message.reply("❌ Введите корректную цену!")
+            return
+        
+        if threshold <= 0:
+            await message.reply("❌ Цена должна быть больше нуля!")
+            return
+        
+        data = await state.get_data()
+        
+        result = await self.alerts.add_alert(message.from_user.id, data['crypto_id'], threshold)
+        
+        await message.reply(result['message'])
+        await state.finish()
+
+    async def show_alerts(self, callback_query: types.CallbackQuery):
+        """Ценовые алерты пользователя"""
+        alerts = await self.db.get_user_crypto_alerts(callback_query.from_user.id)
+        
+        if not alerts:
+            await callback_query.answer("📭 У вас нет алертов", show_alert=True)
+            return
+        
+        text = "🔔 *МОИ АЛЕРТЫ* 🔔\n\n"
+        keyboard = InlineKeyboardMarkup(row_width=1)
+        
+        for alert in alerts:
+            text += f"*{alert['symbol']}* пересечёт {alert['threshold']:.2f}{CURR}\n"
+            keyboard.add(InlineKeyboardButton(
+                f"❌ {alert['symbol']} {alert['threshold']:.2f}",
+                callback_data=f"crypto_alert_del_{alert['id']}"
+            ))
+        
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="crypto_menu"))
+        
+        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
+
+    async def delete_alert(self, callback_query: types.CallbackQuery):
+        alert_id = int(callback_query.data.replace('crypto_alert_del_', ''))
+        
+        result = await self.alerts.delete_alert(alert_id, callback_query.from_user.id)
+        
+        if not result['success']:
+            await callback_query.answer(result['message'], show_alert=True)
+            return
+        
+        keyboard = InlineKeyboardMarkup()
+        keyboard.add(InlineKeyboardButton("🔔 Мои алерты", callback_data="crypto_alerts"))
+        
+        await callback_query.message.edit_text(result['message'], reply_markup=keyboard)
+
+    async def dca_start(self, callback_query: types.CallbackQuery, state: FSMContext):
+        """Начало создания плана автопокупки"""
+        data = await state.get_data()
+        
+        await callback_query.message.edit_text(
+            f"🔁 Автопокупка {data['crypto_symbol']}\n\n"
+            f"Введите сумму одной покупки (от {DCA_MIN_AMOUNT}{CURR}):"
+        )
+        await CryptoStates.waiting_for_dca_amount.set()
+
+    async def process_dca_amount(self, message: types.Message, state: FSMContext):
+        try:
+            amount = int(message.text)
+        except ValueError:
+            await message.reply("❌ Введите целое число!")
+            return
+        
+        if amount < DCA_MIN_AMOUNT:
+            await message.reply(f"❌ Минимальная сумма: {DCA_MIN_AMOUNT}{CURR}")
+            return
+        
+        await state.update_data(dca_amount=amount)
+        # Выбор интервала - кнопкой, её обрабатывает общий обработчик callback без состояния
+        await state.reset_state(with_data=False)
+        
+        keyboard = InlineKeyboardMarkup(row_width=2)
+        for hours, label in DCA_INTERVALS.items():
+            keyboard.insert(InlineKeyboardButton(label.capitalize(), callback_data=f"crypto_dca_interval_{hours}"))
+        
+        await message.reply("Как часто покупать?", reply_markup=keyboard)
+
+    async def create_dca_plan(self, callback_query: types.CallbackQuery, state: FSMContext):
+        interval_hours = int(callback_query.data.replace('crypto_dca_interval_', ''))
+        data = await state.get_data()
+        
+        if interval_hours not in DCA_INTERVALS or 'dca_amount' not in data:
+            await callback_query.answer("❌ Начните заново", show_alert=True)
+            return
+        
+        result = await self.dca.create_plan(callback_query.from_user.id, data['crypto_id'], data['dca_amount'], interval_hours)
+        
+        await callback_query.message.edit_text(result['message'])
+        await state.finish()
+
+    async def show_dca_plans(self, callback_query: types.CallbackQuery):
+        """Планы автопокупки пользователя"""
+        plans = await self.db.get_user_dca_plans(callback_query.from_user.id)
+        
+        if not plans:
+            await callback_query.answer("📭 У вас нет автопокупок", show_alert=True)
+            return
+        
+        text = "🔁 *МОИ АВТОПОКУПКИ* 🔁\n\n"
+        keyboard = InlineKeyboardMarkup(row_width=1)
+        
+        for plan in plans:
+            text += f"*{plan['symbol']}* на {plan['amount_usd']}{CURR} {DCA_INTERVALS.get(plan['interval_hours'], '')}\n"
+            text += f"   Следующая: {plan['next_run'].strftime('%d.%m %H:%M')}\n\n"
+            keyboard.add(InlineKeyboardButton(
+                f"❌ {plan['symbol']} {plan['amount_usd']}{CURR}",
+                callback_data=f"crypto_dca_del_{plan['id']}"
+            ))
+        
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="crypto_menu"))
+        
+        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
+
+    async def delete_dca_plan(self, callback_query: types.CallbackQuery):
+        plan_id = int(callback_query.data.replace('crypto_dca_del_', ''))
+        
+        if not await self.db.delete_dca_plan(plan_id, callback_query.from_user.id):
+            await callback_query.answer("❌ План не найден", show_alert=True)
+            return
+        
+        keyboard = InlineKeyboardMarkup()
+        keyboard.add(InlineKeyboardButton("🔁 Автопокупки", callback_data="crypto_dca_list"))
+        
+        await callback_query.message.edit_text("✅ Автопокупка отменена", reply_markup=keyboard)
+
     async def show_wallet(self, callback_query: types.CallbackQuery):
         user_id = callback_query.from_user.id
         wallets = await self.db.get_user_crypto_wallet(user_id)
@@ -199,13 +531,14 @@ class CryptoMarket:
         total_value = 0
         
         for w in wallets:
-            value = float(w['amount']) * float(w['price'])
-            profit = (float(w['price']) - float(w['average_buy_price'])) * float(w['amount'])
+            coins = w['amount'] / CRYPTO_UNITS
+            value = coins * w['price']
+            profit = (w['price'] - (w['average_buy_price'] or 0)) * coins
             profit_emoji = "🟢" if profit >= 0 else "🔴"
             
             text += f"*{w['symbol']}*\n"
-            text += f"   Количество: {float(w['amount']):.8f}\n"
-            text += f"   Цена: {float(w['price']):.2f}{CURR}\n"
+            text += f"   Количество: {coins:.8f}\n"
+            text += f"   Цена: {w['price']:.2f}{CURR}\n"
             text += f"   Стоимость: {value:.2f}{CURR}\n"
             text += f"   {profit_emoji} P/L: {profit:+.2f}{CURR}\n\n"
             total_value += value
@@ -0,0 +1,66 @@
+from database import Database
+from config import *
+from typing import Callable, Dict, List
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CustomCatalog:
+    """Кэш товаров от администрации: загружается при старте, через LISTEN/NOTIFY обновляется по одному товару"""
+    def __init__(self, db: Database):
+        self.db = db
+        self.items = {}  # catalog_id -> товар
+        self.listeners = {}  # item_type -> список callback(items)
+        self.conn = None
+
+    def add_listener(self, item_type: str, callback: Callable[[List[Dict]], None]):
+        """Подписать магазин на изменения товаров своего типа"""
+        self.listeners.setdefault(item_type, []).append(callback)
+
+    def get_items(self, item_type: str) -> List[Dict]:
+        return sorted((item for item in self.items.values() if item['item_type'] == item_type), key=lambda item: item['price'])
+
+    def publish(self, item_type: str):
+        items = self.get_items(item_type)
+        for callback in self.listeners.get(item_type, []):
+            callback(items)
+
+    async def load(self):
+        """Загрузить все активные товары и раздать магазинам"""
+        self.items = {item['id']: item for item in await self.db.get_catalog_items()}
+        
+        for item_type in self.listeners:
+            self.publish(item_type)
+        
+        logger.info(f"✅ Загружено {len(self.items)} товаров от администрации")
+
+    async def refresh(self, item_id: int):
+        """Перечитать один изменившийся товар"""
+        try:
+            item = await self.db.get_catalog_item(item_id)
+        except Exception as e:
+            logger.error(f"❌ Ошибка обновления товара {item_id}: {e}")
+            return
+        
+        old = self.items.pop(item_id, None)
+        if item and item['is_active']:
+            self.items[item_id] = item
+        
+        for item_type in {entry['item_type'] for entry in (old, item) if entry}:
+            self.publish(item_type)
+
+    def on_notify(self, conn, pid, channel, payload):
+        asyncio.create_task(self.refresh(int(payload)))
+
+    async def start(self):
+        """Отдельное соединение пула слушает канал изменений"""
+        if self.conn is None:
+            self.conn = await self.db.pool.acquire()
+            await self.conn.add_listener(CATALOG_NOTIFY_CHANNEL, self.on_notify)
+
+    async def stop(self):
+        if self.conn:
+            await self.conn.remove_listener(CATALOG_NOTIFY_CHANNEL, self.on_notify)
+            await self.db.pool.release(self.conn)
+            self.conn = None
@@ -1,12 +1,31 @@
 import asyncpg
 import datetime
+import json
 import random
 import logging
+import time
 from typing import Optional, List, Dict
 from config import *
 
 logger = logging.getLogger(__name__)
 
+# Таблицы для массовой вставки предметов
+ITEM_TABLES = {
+    'car': 'cars',
+    'phone': 'phones',
+    'house': 'houses',
+    'accessory': 'accessories',
+    'catalog': 'catalog_items'
+}
+
+# Колонка с названием предмета в таблицах предметов
+ITEM_NAME_COLUMNS = {
+    'car': 'model',
+    'phone': 'model',
+    'house': 'house_name',
+    'accessory': 'accessory_name'
+}
+
 class Database:
     def __init__(self, dsn):
         self.dsn = dsn
@@ -122,6 +141,10 @@ class Database:
                 )
             ''')
 
+            # Постраничный вывод предметов игрока идёт по (user_id, price DESC, id DESC)
+            for table in ('cars', 'phones', 'houses', 'accessories'):
+                await conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_owner_price ON {table} (user_id, price DESC, id DESC)')
+
             # ========== ТАБЛИЦА КАСТОМНЫХ ПРЕДМЕТОВ (ДЛЯ АДМИНА) ==========
             await conn.execute('''
                 CREATE TABLE IF NOT EXISTS custom_items (
@@ -134,29 +157,214 @@ class Database:
                 )
             ''')
 
+            # ========== ТАБЛИЦА ТОВАРОВ МАГАЗИНА СО СКЛАДОМ ==========
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS catalog_items (
+                    id SERIAL PRIMARY KEY,
+                    item_type TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    description TEXT,
+                    price INTEGER NOT NULL,
+                    attributes JSONB NOT NULL DEFAULT '{}',
+                    stock INTEGER NOT NULL DEFAULT 0 CHECK (stock >= 0),
+                    created_by BIGINT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    is_active BOOLEAN DEFAULT TRUE
+                )
+            ''')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_catalog_items_type ON catalog_items (item_type) WHERE is_active')
+
+            # Оповещение процессов бота об изменении товара (остаток не рассылается - он читается при покупке)
+            await conn.execute(f'''
+                CREATE OR REPLACE FUNCTION notify_catalog_item() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP = 'DELETE' THEN
+                        PERFORM pg_notify('{CATALOG_NOTIFY_CHANNEL}', OLD.id::text);
+                    ELSE
+                        PERFORM pg_notify('{CATALOG_NOTIFY_CHANNEL}', NEW.id::text);
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql
+            ''')
+            await conn.execute('DROP TRIGGER IF EXISTS catalog_items_notify ON catalog_items')
+            await conn.execute('''
+                CREATE TRIGGER catalog_items_notify
+                AFTER INSERT OR DELETE OR UPDATE OF name, description, price, attributes, is_active ON catalog_items
+                FOR EACH ROW EXECUTE FUNCTION notify_catalog_item()
+            ''')
+
+            # ========== ТАБЛИЦА ЛОТОВ РЫНКА ==========
+            # Здесь только активные лоты: проданные и снятые удаляются, предмет на время продажи лежит без владельца
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS market_listings (
+                    id BIGSERIAL PRIMARY KEY,
+                    seller_id BIGINT NOT NULL,
+                    item_type TEXT NOT NULL,
+                    item_id INTEGER NOT NULL,
+                    item_name TEXT NOT NULL,
+                    price BIGINT NOT NULL CHECK (price > 0),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (item_type, item_id)
+                )
+            ''')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_market_listings_type_price ON market_listings (item_type, price, id)')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_market_listings_price ON market_listings (price, id)')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_market_listings_seller ON market_listings (seller_id)')
+
+            # ========== ТАБЛИЦА АУКЦИОНОВ ==========
+            # Предмет (или единица товара со склада) и ставка лидера удерживаются до закрытия аукциона
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS auctions (
+                    id BIGSERIAL PRIMARY KEY,
+                    seller_id BIGINT NOT NULL,
+                    item_type TEXT NOT NULL,
+                    item_id INTEGER NOT NULL,
+                    item_name TEXT NOT NULL,
+                    start_price BIGINT NOT NULL CHECK (start_price > 0),
+                    min_bid BIGINT NOT NULL,
+                    current_bid BIGINT,
+                    bidder_id BIGINT,
+                    bids_count INTEGER DEFAULT 0,
+                    ends_at TIMESTAMP NOT NULL,
+                    status TEXT DEFAULT 'active',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_auctions_active ON auctions (ends_at, id) WHERE status = 'active'")
+
             # ========== ТАБЛИЦА КРИПТОВАЛЮТ ==========
             await conn.execute('''
                 CREATE TABLE IF NOT EXISTS cryptocurrencies (
                     id SERIAL PRIMARY KEY,
                     name TEXT UNIQUE NOT NULL,
                     symbol TEXT UNIQUE NOT NULL,
-                    price DECIMAL(20, 8) NOT NULL,
+                    price DOUBLE PRECISION NOT NULL,
+                    volatility DOUBLE PRECISION NOT NULL DEFAULT 0.05,
+                    drift DOUBLE PRECISION NOT NULL DEFAULT 0,
                     last_update TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
+            await conn.execute('ALTER TABLE cryptocurrencies ADD COLUMN IF NOT EXISTS volatility DOUBLE PRECISION NOT NULL DEFAULT 0.05')
+            await conn.execute('ALTER TABLE cryptocurrencies ADD COLUMN IF NOT EXISTS drift DOUBLE PRECISION NOT NULL DEFAULT 0')
+            # Цена монеты - float, как в тиках и свечах: asyncpg отдаёт её без Decimal
+            await conn.execute('''
+                DO $$
+                BEGIN
+                    IF EXISTS (
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'cryptocurrencies' AND column_name = 'price' AND data_type = 'numeric'
+                    ) THEN
+                        ALTER TABLE cryptocurrencies ALTER COLUMN price TYPE DOUBLE PRECISION;
+                    END IF;
+                END $$;
+            ''')
+
+            # ========== ТАБЛИЦЫ ИСТОРИИ ЦЕН ==========
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS crypto_ticks (
+                    id BIGSERIAL PRIMARY KEY,
+                    crypto_id INTEGER REFERENCES cryptocurrencies(id) ON DELETE CASCADE,
+                    price DOUBLE PRECISION NOT NULL,
+                    created_at TIMESTAMP NOT NULL
+                )
+            ''')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_crypto_ticks_created ON crypto_ticks (created_at)')
+
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS crypto_candles (
+                    crypto_id INTEGER REFERENCES cryptocurrencies(id) ON DELETE CASCADE,
+                    resolution TEXT NOT NULL,
+                    bucket TIMESTAMP NOT NULL,
+                    open DOUBLE PRECISION NOT NULL,
+                    high DOUBLE PRECISION NOT NULL,
+                    low DOUBLE PRECISION NOT NULL,
+                    close DOUBLE PRECISION NOT NULL,
+                    PRIMARY KEY (crypto_id, resolution, bucket)
+                )
+            ''')
 
             # ========== ТАБЛИЦА КРИПТО-КОШЕЛЬКОВ ==========
+            # amount - в минимальных единицах (CRYPTO_UNITS на одну монету)
             await conn.execute('''
                 CREATE TABLE IF NOT EXISTS crypto_wallets (
                     id SERIAL PRIMARY KEY,
                     user_id BIGINT REFERENCES users(user_id) ON DELETE CASCADE,
                     crypto_id INTEGER REFERENCES cryptocurrencies(id),
-                    amount DECIMAL(20, 8) DEFAULT 0,
-                    average_buy_price DECIMAL(20, 8),
+                    amount BIGINT DEFAULT 0,
+                    average_buy_price DOUBLE PRECISION,
                     UNIQUE(user_id, crypto_id)
                 )
             ''')
 
+            # ========== ТАБЛИЦА ЛИМИТНЫХ ОРДЕРОВ ==========
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS crypto_orders (
+                    id SERIAL PRIMARY KEY,
+                    user_id BIGINT REFERENCES users(user_id) ON DELETE CASCADE,
+                    crypto_id INTEGER REFERENCES cryptocurrencies(id),
+                    side TEXT NOT NULL,
+                    limit_price DOUBLE PRECISION NOT NULL,
+                    amount_usd BIGINT,
+                    crypto_amount BIGINT,
+                    status TEXT DEFAULT 'open',
+                    fill_price DOUBLE PRECISION,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    filled_at TIMESTAMP
+                )
+            ''')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_crypto_orders_user ON crypto_orders (user_id, status)')
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_crypto_orders_open ON crypto_orders (id) WHERE status = 'open'")
+
+            # Перенос количеств монет из DECIMAL в минимальные единицы
+            await conn.execute(f'''
+                DO $$
+                BEGIN
+                    IF EXISTS (
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'crypto_wallets' AND column_name = 'amount' AND data_type = 'numeric'
+                    ) THEN
+                        ALTER TABLE crypto_wallets
+                            ALTER COLUMN amount TYPE BIGINT USING round(amount * {CRYPTO_UNITS}),
+                            ALTER COLUMN average_buy_price TYPE DOUBLE PRECISION;
+                    END IF;
+                    IF EXISTS (
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'crypto_orders' AND column_name = 'crypto_amount' AND data_type = 'numeric'
+                    ) THEN
+                        ALTER TABLE crypto_orders
+                            ALTER COLUMN crypto_amount TYPE BIGINT USING round(crypto_amount * {CRYPTO_UNITS});
+                    END IF;
+                END $$;
+            ''')
+
+            # ========== ТАБЛИЦА ЦЕНОВЫХ АЛЕРТОВ ==========
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS crypto_alerts (
+                    id SERIAL PRIMARY KEY,
+                    user_id BIGINT REFERENCES users(user_id) ON DELETE CASCADE,
+                    crypto_id INTEGER REFERENCES cryptocurrencies(id),
+                    threshold DOUBLE PRECISION NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_crypto_alerts_user ON crypto_alerts (user_id)')
+
+            # ========== ТАБЛИЦА АВТОПОКУПОК ==========
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS crypto_dca_plans (
+                    id SERIAL PRIMARY KEY,
+                    user_id BIGINT REFERENCES users(user_id) ON DELETE CASCADE,
+                    crypto_id INTEGER REFERENCES cryptocurrencies(id),
+                    amount_usd BIGINT NOT NULL,
+                    interval_hours INTEGER NOT NULL,
+                    next_run TIMESTAMP NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_crypto_dca_plans_next_run ON crypto_dca_plans (next_run)')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_crypto_dca_plans_user ON crypto_dca_plans (user_id)')
+
             # ========== ТАБЛИЦА КЛАНОВ ==========
             await conn.execute('''
                 CREATE TABLE IF NOT EXISTS clans (
@@ -169,10 +377,15 @@ class Database:
                     balance BIGINT DEFAULT 0,
                     members_count INTEGER DEFAULT 1,
                     max_members INTEGER DEFAULT 100,
+                    members_wealth BIGINT DEFAULT 0,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
 
+            # Каталог кланов листается по (members_count, id) и по (name, id)
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_clans_members ON clans (members_count DESC, id DESC)')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_clans_name ON clans (name, id)')
+
             # ========== ТАБЛИЦА УЧАСТНИКОВ КЛАНА ==========
             await conn.execute('''
                 CREATE TABLE IF NOT EXISTS clan_members (
@@ -184,6 +397,116 @@ class Database:
                     PRIMARY KEY (clan_id, user_id)
                 )
             ''')
+            # Игрок состоит не больше чем в одном клане; индекс нужен и триггеру богатства на каждом изменении баланса
+            await conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_clan_members_user ON clan_members (user_id)')
+
+            # ========== БОГАТСТВО УЧАСТНИКОВ КЛАНА ==========
+            # clans.members_wealth - сумма балансов участников: меняется на разницу при каждом изменении баланса,
+            # вступлении и выходе, поэтому топу кланов не нужен join по users
+            await conn.execute('''
+                CREATE OR REPLACE FUNCTION clan_wealth_on_balance() RETURNS trigger AS $$
+                BEGIN
+                    UPDATE clans SET members_wealth = members_wealth + (NEW.balance - OLD.balance)
+                    WHERE id = (SELECT clan_id FROM clan_members WHERE user_id = NEW.user_id);
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql
+            ''')
+            await conn.execute('DROP TRIGGER IF EXISTS users_clan_wealth ON users')
+            await conn.execute('''
+                CREATE TRIGGER users_clan_wealth
+                AFTER UPDATE OF balance ON users
+                FOR EACH ROW WHEN (OLD.balance IS DISTINCT FROM NEW.balance)
+                EXECUTE FUNCTION clan_wealth_on_balance()
+            ''')
+            await conn.execute('''
+                CREATE OR REPLACE FUNCTION clan_wealth_on_member() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP = 'INSERT' THEN
+                        UPDATE clans SET members_wealth = members_wealth
+                            + COALESCE((SELECT balance FROM users WHERE user_id = NEW.user_id), 0)
+                        WHERE id = NEW.clan_id;
+                    ELSE
+                        UPDATE clans SET members_wealth = members_wealth
+                            - COALESCE((SELECT balance FROM users WHERE user_id = OLD.user_id), 0)
+                        WHERE id = OLD.clan_id;
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql
+            ''')
+            await conn.execute('DROP TRIGGER IF EXISTS clan_members_wealth ON clan_members')
+            await conn.execute('''
+                CREATE TRIGGER clan_members_wealth
+                AFTER INSERT OR DELETE ON clan_members
+                FOR EACH ROW EXECUTE FUNCTION clan_wealth_on_member()
+            ''')
+            # При удалении пользователя его участие удаляется каскадом, когда баланса уже не прочитать - вычитаем заранее
+            await conn.execute('''
+                CREATE OR REPLACE FUNCTION clan_wealth_on_user_delete() RETURNS trigger AS $$
+                BEGIN
+                    UPDATE clans SET members_wealth = members_wealth - OLD.balance
+                    WHERE id = (SELECT clan_id FROM clan_members WHERE user_id = OLD.user_id);
+                    RETURN OLD;
+                END;
+                $$ LANGUAGE plpgsql
+            ''')
+            await conn.execute('DROP TRIGGER IF EXISTS users_clan_wealth_delete ON users')
+            await conn.execute('''
+                CREATE TRIGGER users_clan_wealth_delete
+                BEFORE DELETE ON users
+                FOR EACH ROW EXECUTE FUNCTION clan_wealth_on_user_delete()
+            ''')
+            
+            # Колонка появилась в уже работающей базе - один раз считаем сумму по участникам
+            await conn.execute('''
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'clans' AND column_name = 'members_wealth'
+                    ) THEN
+                        ALTER TABLE clans ADD COLUMN members_wealth BIGINT DEFAULT 0;
+                        UPDATE clans c SET members_wealth = w.total
+                        FROM (
+                            SELECT cm.clan_id, SUM(u.balance) AS total
+                            FROM clan_members cm
+                            JOIN users u ON u.user_id = cm.user_id
+                            GROUP BY cm.clan_id
+                        ) w
+                        WHERE c.id = w.clan_id;
+                    END IF;
+                END $$;
+            ''')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_clans_wealth ON clans (members_wealth DESC, id)')
+
+            # ========== ЖУРНАЛ КАЗНЫ КЛАНА ==========
+            # Только добавление: изменение и удаление записей запрещены триггером
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS clan_treasury_ledger (
+                    id BIGSERIAL PRIMARY KEY,
+                    clan_id INTEGER NOT NULL,
+                    user_id BIGINT NOT NULL,
+                    amount BIGINT NOT NULL,
+                    balance_after BIGINT NOT NULL,
+                    kind TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_clan_treasury_ledger_clan ON clan_treasury_ledger (clan_id, id DESC)')
+            await conn.execute('''
+                CREATE OR REPLACE FUNCTION forbid_ledger_change() RETURNS trigger AS $$
+                BEGIN
+                    RAISE EXCEPTION 'clan_treasury_ledger is append-only';
+                END;
+                $$ LANGUAGE plpgsql
+            ''')
+            await conn.execute('DROP TRIGGER IF EXISTS clan_treasury_ledger_append_only ON clan_treasury_ledger')
+            await conn.execute('''
+                CREATE TRIGGER clan_treasury_ledger_append_only
+                BEFORE UPDATE OR DELETE ON clan_treasury_ledger
+                FOR EACH ROW EXECUTE FUNCTION forbid_ledger_change()
+            ''')
 
             # ========== ТАБЛИЦА ЗАЯВОК В КЛАН ==========
             await conn.execute('''
@@ -251,6 +574,68 @@ class Database:
                     claimed BOOLEAN DEFAULT FALSE
                 )
             ''')
+            
+            # Снимки читаются по неделе и месту
+            for table in ('weekly_top_balance', 'weekly_top_referrals', 'weekly_top_clans'):
+                await conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_week ON {table} (week_start, rank)')
+            
+            # Сколько рефералов было у игрока на начало недели - недельный топ считает прирост.
+            # При добавлении колонки база - текущее число рефералов, иначе первая неделя засчитала бы всех за всё время
+            await conn.execute('''
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'users' AND column_name = 'referral_count_week_start'
+                    ) THEN
+                        ALTER TABLE users ADD COLUMN referral_count_week_start INTEGER DEFAULT 0;
+                        UPDATE users SET referral_count_week_start = referral_count;
+                    END IF;
+                END $$;
+            ''')
+
+            # ========== ЛИДЕРБОРДЫ ==========
+            # Топы держатся в памяти бота: при старте читаются по индексам, дальше живут на уведомлениях об изменениях
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_users_top_balance ON users (balance DESC) WHERE NOT is_banned')
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_users_top_casino ON users (total_wins DESC, total_games DESC)
+                WHERE NOT is_banned AND total_games > 0
+            ''')
+            await conn.execute(f'''
+                CREATE OR REPLACE FUNCTION notify_leaderboard() RETURNS trigger AS $$
+                BEGIN
+                    PERFORM pg_notify('{LEADERBOARD_NOTIFY_CHANNEL}', json_build_object(
+                        'user_id', NEW.user_id,
+                        'username', NEW.username,
+                        'first_name', NEW.first_name,
+                        'balance', NEW.balance,
+                        'total_wins', NEW.total_wins,
+                        'total_games', NEW.total_games,
+                        'is_banned', NEW.is_banned
+                    )::text);
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql
+            ''')
+            await conn.execute('DROP TRIGGER IF EXISTS users_leaderboard_insert ON users')
+            await conn.execute('''
+                CREATE TRIGGER users_leaderboard_insert
+                AFTER INSERT ON users
+                FOR EACH ROW EXECUTE FUNCTION notify_leaderboard()
+            ''')
+            await conn.execute('DROP TRIGGER IF EXISTS users_leaderboard_update ON users')
+            await conn.execute('''
+                CREATE TRIGGER users_leaderboard_update
+                AFTER UPDATE OF balance, total_wins, total_games, is_banned, username, first_name ON users
+                FOR EACH ROW
+                WHEN (OLD.balance IS DISTINCT FROM NEW.balance
+                      OR OLD.total_wins IS DISTINCT FROM NEW.total_wins
+                      OR OLD.total_games IS DISTINCT FROM NEW.total_games
+                      OR OLD.is_banned IS DISTINCT FROM NEW.is_banned
+                      OR OLD.username IS DISTINCT FROM NEW.username
+                      OR OLD.first_name IS DISTINCT FROM NEW.first_name)
+                EXECUTE FUNCTION notify_leaderboard()
+            ''')
 
             # ========== ТАБЛИЦА ДОСТИЖЕНИЙ ==========
             await conn.execute('''
@@ -274,6 +659,33 @@ class Database:
                 )
             ''')
 
+            # ========== ТАБЛИЦА НАСТРОЕК ПОЛЬЗОВАТЕЛЕЙ ==========
+            # Строка есть только у тех, кто менял настройки по умолчанию.
+            # Флаги упакованы в битовую маску (см. settings.SETTING_FLAGS)
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS user_settings (
+                    user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+                    flags SMALLINT NOT NULL,
+                    nickname TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # ========== ТАБЛИЦА ОЖИДАЮЩИХ ПОДТВЕРЖДЕНИЙ ==========
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS pending_confirmations (
+                    id TEXT PRIMARY KEY,
+                    user_id BIGINT NOT NULL,
+                    action TEXT NOT NULL,
+                    data JSONB NOT NULL,
+                    confirm_callback TEXT NOT NULL,
+                    cancel_callback TEXT NOT NULL,
+                    message_id BIGINT,
+                    expires_at TIMESTAMP NOT NULL
+                )
+            ''')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_pending_confirmations_expires ON pending_confirmations (expires_at)')
+
             logger.info("✅ Все таблицы созданы")
             
             # Инициализация криптовалют
@@ -283,21 +695,22 @@ class Database:
             await self.init_achievements(conn)
 
     async def init_cryptocurrencies(self, conn):
-        """Инициализация криптовалют"""
+        """Инициализация криптовалют (волатильность и дрейф - в долях за сутки)"""
         cryptos = [
-            ('Bitcoin', 'BTC', 50000.00),
-            ('Ethereum', 'ETH', 3000.00),
-            ('Binance Coin', 'BNB', 500.00),
-            ('Solana', 'SOL', 150.00),
-            ('Dogecoin', 'DOGE', 0.15)
+            ('Bitcoin', 'BTC', 50000.00, 0.03, 0.0005),
+            ('Ethereum', 'ETH', 3000.00, 0.04, 0.0005),
+            ('Binance Coin', 'BNB', 500.00, 0.04, 0.0003),
+            ('Solana', 'SOL', 150.00, 0.06, 0.0008),
+            ('Dogecoin', 'DOGE', 0.15, 0.08, 0.0)
         ]
         
-        for name, symbol, price in cryptos:
+        for name, symbol, price, volatility, drift in cryptos:
+            # Цена задаётся только при первом запуске - дальше её двигает рынок
             await conn.execute('''
-                INSERT INTO cryptocurrencies (name, symbol, price)
-                VALUES ($1, $2, $3)
-                ON CONFLICT (symbol) DO UPDATE SET price = EXCLUDED.price
-            ''', name, symbol, price)
+                INSERT INTO cryptocurrencies (name, symbol, price, volatility, drift)
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT (symbol) DO UPDATE SET volatility = EXCLUDED.volatility, drift = EXCLUDED.drift
+            ''', name, symbol, price, volatility, drift)
         
         logger.info(f"✅ {len(cryptos)} криптовалют инициализировано")
 
@@ -370,6 +783,447 @@ class Database:
             balance = await conn.fetchval('SELECT balance FROM users WHERE user_id = $1', user_id)
             return balance or 0
 
+    # ========== ПОКУПКИ И ПРОДАЖА ГОСУДАРСТВУ ==========
+
+    async def purchase(self, user_id: int, price: int, item_table: str, item_row: Dict) -> Dict:
+        """Покупка одним запросом: списание с проверкой баланса и вставка предмета в одном CTE"""
+        columns = ', '.join(item_row)
+        values = ', '.join(f'item_row.{column}' for column in item_row)
+        
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(f'''
+                WITH debit AS (
+                    UPDATE users SET balance = balance - $2
+                    WHERE user_id = $1 AND balance >= $2
+                    RETURNING balance
+                ), item AS (
+                    INSERT INTO {item_table} ({columns})
+                    SELECT {values}
+                    FROM json_populate_record(NULL::{item_table}, $3::json) AS item_row, debit
+                    RETURNING id
+                )
+                SELECT debit.balance, item.id AS item_id FROM debit, item
+            ''', user_id, price, json.dumps(item_row))
+        
+        if not row:
+            return {'success': False, 'balance': None, 'message': '❌ Недостаточно средств!'}
+        
+        return {'success': True, 'balance': row['balance'], 'item_id': row['item_id']}
+
+    async def sell_items_to_government(self, user_id: int, item_type: str, item_ids: Optional[List[int]] = None,
+                                       expected: Optional[Dict] = None) -> Dict:
+        """Продажа предметов государству одним запросом: удаление, выплата и комиссия считаются в SQL"""
+        table = ITEM_TABLES[item_type]
+        # expected - {'count', 'total'} из подтверждения: если предметы с тех пор изменились, ничего не продаётся
+        expected = expected or {}
+        
+        async with self.pool.acquire() as conn:
+            # Все части запроса видят один снимок: удаляются ровно те предметы, что прошли сверку с подтверждением
+            row = await conn.fetchrow(f'''
+                WITH owned AS (
+                    SELECT COUNT(*) AS items, COALESCE(SUM(price), 0)::BIGINT AS total
+                    FROM {table}
+                    WHERE user_id = $1 AND ($2::INTEGER[] IS NULL OR id = ANY($2::INTEGER[]))
+                ), matches AS (
+                    SELECT $5::BIGINT IS NULL OR (items = $5 AND total = $6::BIGINT) AS ok FROM owned
+                ), sold AS (
+                    DELETE FROM {table}
+                    WHERE user_id = $1 AND ($2::INTEGER[] IS NULL OR id = ANY($2::INTEGER[]))
+                      AND (SELECT ok FROM matches)
+                    RETURNING price
+                ), totals AS (
+                    SELECT COUNT(*) AS items,
+                           (COALESCE(SUM(price), 0)::BIGINT * $3 / 100)::BIGINT AS payout,
+                           COALESCE(SUM(price), 0)::BIGINT AS total
+                    FROM sold
+                ), credit AS (
+                    UPDATE users SET balance = balance
+                        + CASE WHEN users.user_id = $1 THEN totals.payout ELSE 0 END
+                        + CASE WHEN users.user_id = $4 THEN totals.total - totals.payout ELSE 0 END
+                    FROM totals
+                    WHERE users.user_id IN ($1, $4) AND totals.items > 0
+                    RETURNING users.user_id, users.balance
+                )
+                SELECT totals.items, totals.payout, totals.total - totals.payout AS fee,
+                       (SELECT balance FROM credit WHERE user_id = $1) AS balance,
+                       (SELECT ok FROM matches) AS matches
+                FROM totals
+            ''', user_id, item_ids, GOVERNMENT_BUY_PERCENT, MAIN_ADMIN_ID, expected.get('count'), expected.get('total'))
+        
+        if not row['matches']:
+            return {'success': False, 'message': '❌ Предметы изменились с момента подтверждения, повторите продажу'}
+        if not row['items']:
+            return {'success': False, 'message': '❌ Нечего продавать!'}
+        
+        return {
+            'success': True,
+            'items': row['items'],
+            'payout': row['payout'],
+            'fee': row['fee'],
+            'balance': row['balance']
+        }
+
+    # ========== ПЕРЕДАЧА ПРЕДМЕТОВ ==========
+
+    async def transfer_items(self, from_id: int, to_id: int, items: Dict[str, List[int]], crypto: Dict[int, int]) -> Dict:
+        """Передача корзины предметов в одной транзакции: один UPDATE на таблицу, каждый id проверяется на владельца"""
+        async with self.pool.acquire() as conn:
+            transaction = conn.transaction()
+            await transaction.start()
+            try:
+                for item_type, item_ids in items.items():
+                    if not item_ids:
+                        continue
+                    moved = await conn.fetch(f'''
+                        UPDATE {ITEM_TABLES[item_type]} SET user_id = $1
+                        WHERE user_id = $2 AND id = ANY($3::INTEGER[])
+                        RETURNING id
+                    ''', to_id, from_id, item_ids)
+                    
+                    if len(moved) != len(set(item_ids)):
+                        await transaction.rollback()
+                        return {'success': False, 'message': '❌ Часть предметов вам уже не принадлежит!'}
+                
+                if crypto:
+                    # Списание всех монет одним UPDATE и зачисление одним upsert, средняя цена переходит получателю
+                    moved = await conn.fetch('''
+                        WITH wanted AS (
+                            SELECT * FROM unnest($3::INTEGER[], $4::BIGINT[]) AS w(crypto_id, amount)
+                        ), debit AS (
+                            UPDATE crypto_wallets cw SET amount = cw.amount - w.amount
+                            FROM wanted w
+                            WHERE cw.user_id = $2 AND cw.crypto_id = w.crypto_id AND cw.amount >= w.amount
+                            RETURNING cw.crypto_id, w.amount, cw.average_buy_price
+                        )
+                        INSERT INTO crypto_wallets (user_id, crypto_id, amount, average_buy_price)
+                        SELECT $1, crypto_id, amount, average_buy_price FROM debit
+                        ON CONFLICT (user_id, crypto_id) DO UPDATE SET
+                            amount = crypto_wallets.amount + EXCLUDED.amount,
+                            average_buy_price = (crypto_wallets.amount * COALESCE(crypto_wallets.average_buy_price, 0)
+                                                 + EXCLUDED.amount * COALESCE(EXCLUDED.average_buy_price, 0))
+                                                / (crypto_wallets.amount + EXCLUDED.amount)
+                        RETURNING crypto_id
+                    ''', to_id, from_id, list(crypto), list(crypto.values()))
+                    
+                    if len(moved) != len(crypto):
+                        await transaction.rollback()
+                        return {'success': False, 'message': '❌ Недостаточно монет для передачи!'}
+            except Exception:
+                await transaction.rollback()
+                raise
+            
+            await transaction.commit()
+        
+        return {'success': True, 'count': sum(len(ids) for ids in items.values()) + len(crypto)}
+
+    # ========== МЕТОДЫ ДЛЯ РЫНКА ==========
+
+    async def create_market_listing(self, seller_id: int, item_type: str, item_id: int, price: int) -> Optional[Dict]:
+        """Выставить предмет: он уходит из инвентаря продавца в эскроу и появляется лот - один запрос"""
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(f'''
+                WITH escrow AS (
+                    UPDATE {ITEM_TABLES[item_type]} SET user_id = NULL
+                    WHERE id = $2 AND user_id = $1
+                    RETURNING id, {ITEM_NAME_COLUMNS[item_type]} AS name
+                )
+                INSERT INTO market_listings (seller_id, item_type, item_id, item_name, price)
+                SELECT $1, $3, id, name, $4 FROM escrow
+                RETURNING *
+            ''', seller_id, item_id, item_type, price)
+            return dict(row) if row else None
+
+    async def cancel_market_listing(self, listing_id: int, seller_id: int) -> Optional[Dict]:
+        """Снять лот и вернуть предмет продавцу"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                listing = await conn.fetchrow(
+                    'DELETE FROM market_listings WHERE id = $1 AND seller_id = $2 RETURNING *', listing_id, seller_id
+                )
+                if not listing:
+                    return None
+                
+                await conn.execute(
+                    f'UPDATE {ITEM_TABLES[listing["item_type"]]} SET user_id = $1 WHERE id = $2',
+                    seller_id, listing['item_id']
+                )
+                return dict(listing)
+
+    async def get_market_listing(self, listing_id: int) -> Optional[Dict]:
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow('SELECT * FROM market_listings WHERE id = $1', listing_id)
+            return dict(row) if row else None
+
+    async def get_market_listings(self, item_type: Optional[str], min_price: int, max_price: int, limit: int,
+                                  after: Optional[tuple] = None, before: Optional[tuple] = None) -> List[Dict]:
+        """Страница лотов по (price, id): keyset вместо OFFSET, поэтому любая страница читается по индексу"""
+        conditions = ['price BETWEEN $1 AND $2']
+        args = [min_price, max_price]
+        
+        if item_type:
+            args.append(item_type)
+            conditions.append(f'item_type = ${len(args)}')
+        
+        order = 'price, id'
+        if after:
+            args.extend(after)
+            conditions.append(f'(price, id) > (${len(args) - 1}, ${len(args)})')
+        elif before:
+            args.extend(before)
+            conditions.append(f'(price, id) < (${len(args) - 1}, ${len(args)})')
+            order = 'price DESC, id DESC'
+        
+        args.append(limit)
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(f'''
+                SELECT * FROM market_listings
+                WHERE {' AND '.join(conditions)}
+                ORDER BY {order}
+                LIMIT ${len(args)}
+            ''', *args)
+        
+        listings = [dict(row) for row in rows]
+        return listings[::-1] if before else listings
+
+    async def get_user_market_listings(self, seller_id: int, limit: int) -> List[Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                'SELECT * FROM market_listings WHERE seller_id = $1 ORDER BY id DESC LIMIT $2', seller_id, limit
+            )
+            return [dict(row) for row in rows]
+
+    async def buy_market_listing(self, listing_id: int, buyer_id: int) -> Dict:
+        """Покупка лота: деньги покупателя, выплата продавцу, комиссия и предмет меняются в одной транзакции"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                listing = await conn.fetchrow(
+                    'SELECT * FROM market_listings WHERE id = $1 FOR UPDATE', listing_id
+                )
+                if not listing:
+                    return {'success': False, 'message': '❌ Лот уже продан или снят!'}
+                
+                if listing['seller_id'] == buyer_id:
+                    return {'success': False, 'message': '❌ Нельзя купить свой лот!'}
+                
+                balance = await conn.fetchval('''
+                    UPDATE users SET balance = balance - $2
+                    WHERE user_id = $1 AND balance >= $2
+                    RETURNING balance
+                ''', buyer_id, listing['price'])
+                if balance is None:
+                    return {'success': False, 'message': '❌ Недостаточно средств!'}
+                
+                fee = int(listing['price'] * MARKET_FEE)
+                await conn.execute('''
+                    UPDATE users SET balance = balance
+                        + CASE WHEN user_id = $1 THEN $3::BIGINT ELSE 0 END
+                        + CASE WHEN user_id = $2 THEN $4::BIGINT ELSE 0 END
+                    WHERE user_id IN ($1, $2)
+                ''', listing['seller_id'], MAIN_ADMIN_ID, listing['price'] - fee, fee)
+                
+                await conn.execute(
+                    f'UPDATE {ITEM_TABLES[listing["item_type"]]} SET user_id = $1 WHERE id = $2',
+                    buyer_id, listing['item_id']
+                )
+                await conn.execute('DELETE FROM market_listings WHERE id = $1', listing_id)
+                await conn.execute('''
+                    INSERT INTO transactions (from_id, to_id, amount, fee, type, description)
+                    VALUES ($1, $2, $3, $4, 'market', $5)
+                ''', buyer_id, listing['seller_id'], listing['price'], fee, listing['item_name'])
+                
+                return {
+                    'success': True,
+                    'listing': dict(listing),
+                    'fee': fee,
+                    'balance': balance
+                }
+
+    # ========== МЕТОДЫ ДЛЯ АУКЦИОНОВ ==========
+
+    async def create_auction(self, seller_id: int, item_type: str, item_id: int, start_price: int,
+                             ends_at: datetime.datetime) -> Optional[Dict]:
+        """Открыть аукцион: предмет игрока или единица товара со склада уходит в эскроу вместе с созданием лота"""
+        if item_type == 'catalog':
+            escrow = '''
+                UPDATE catalog_items SET stock = stock - 1
+                WHERE id = $2 AND is_active AND stock > 0
+                RETURNING id, name
+            '''
+        else:
+            escrow = f'''
+                UPDATE {ITEM_TABLES[item_type]} SET user_id = NULL
+                WHERE id = $2 AND user_id = $1
+                RETURNING id, {ITEM_NAME_COLUMNS[item_type]} AS name
+            '''
+        
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(f'''
+                WITH escrow AS ({escrow})
+                INSERT INTO auctions (seller_id, item_type, item_id, item_name, start_price, min_bid, ends_at)
+                SELECT $1, $3, id, name, $4, $4, $5 FROM escrow
+                RETURNING *
+            ''', seller_id, item_id, item_type, start_price, ends_at)
+            return dict(row) if row else None
+
+    async def get_auction(self, auction_id: int) -> Optional[Dict]:
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow('SELECT * FROM auctions WHERE id = $1', auction_id)
+            return dict(row) if row else None
+
+    async def get_active_auctions(self, limit: int) -> List[Dict]:
+        """Ближайшие к закрытию активные аукционы"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT * FROM auctions WHERE status = 'active' ORDER BY ends_at, id LIMIT $1", limit
+            )
+            return [dict(row) for row in rows]
+
+    async def get_active_auction_ends(self) -> List[Dict]:
+        """Время окончания всех активных аукционов - для восстановления очереди после перезапуска"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT id, ends_at FROM auctions WHERE status = 'active'")
+            return [dict(row) for row in rows]
+
+    async def place_auction_bid(self, auction_id: int, bidder_id: int, amount: int, now: datetime.datetime) -> Dict:
+        """Ставка: деньги нового лидера удерживаются, прошлому лидеру возвращаются, поздняя ставка продлевает аукцион"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                auction = await conn.fetchrow('SELECT * FROM auctions WHERE id = $1 FOR UPDATE', auction_id)
+                
+                if not auction or auction['status'] != 'active' or auction['ends_at'] <= now:
+                    return {'success': False, 'message': '❌ Аукцион уже завершён!'}
+                if auction['seller_id'] == bidder_id:
+                    return {'success': False, 'message': '❌ Нельзя делать ставки на свой лот!'}
+                if auction['bidder_id'] == bidder_id:
+                    return {'success': False, 'message': '❌ Ваша ставка уже лидирует!'}
+                if amount < auction['min_bid']:
+                    return {'success': False, 'message': f"❌ Минимальная ставка: {auction['min_bid']:,}{CURR}"}
+                # Ставка попадает в transactions.amount при закрытии - больше границы закрыть аукцион не выйдет
+                if amount > AUCTION_MAX_PRICE:
+                    return {'success': False, 'message': f"❌ Максимальная ставка: {AUCTION_MAX_PRICE:,}{CURR}"}
+                
+                balance = await conn.fetchval('''
+                    UPDATE users SET balance = balance - $2
+                    WHERE user_id = $1 AND balance >= $2
+                    RETURNING balance
+                ''', bidder_id, amount)
+                if balance is None:
+                    return {'success': False, 'message': '❌ Недостаточно средств!'}
+                
+                if auction['bidder_id']:
+                    await conn.execute(
+                        'UPDATE users SET balance = balance + $2 WHERE user_id = $1',
+                        auction['bidder_id'], auction['current_bid']
+                    )
+                
+                ends_at = max(auction['ends_at'], now + datetime.timedelta(seconds=AUCTION_EXTEND_SECONDS))
+                updated = await conn.fetchrow('''
+                    UPDATE auctions
+                    SET current_bid = $2, bidder_id = $3, bids_count = bids_count + 1, ends_at = $4,
+                        min_bid = $2 + GREATEST(1, $2 * $5 / 100)
+                    WHERE id = $1
+                    RETURNING *
+                ''', auction_id, amount, bidder_id, ends_at, AUCTION_MIN_STEP_PERCENT)
+                
+                return {
+                    'success': True,
+                    'auction': dict(updated),
+                    'balance': balance,
+                    'outbid_id': auction['bidder_id'],
+                    'outbid_amount': auction['current_bid'],
+                    'extended': ends_at != auction['ends_at']
+                }
+
+    async def settle_auction(self, auction_id: int, now: datetime.datetime) -> Optional[Dict]:
+        """Закрыть аукцион: предмет победителю и деньги продавцу, без ставок - возврат предмета. None - если уже закрыт"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                auction = await conn.fetchrow(
+                    "SELECT * FROM auctions WHERE id = $1 AND status = 'active' FOR UPDATE", auction_id
+                )
+                if not auction:
+                    return None
+                if auction['ends_at'] > now:
+                    return dict(auction)
+                
+                owner_id = auction['bidder_id'] or auction['seller_id']
+                if auction['item_type'] != 'catalog':
+                    await conn.execute(
+                        f'UPDATE {ITEM_TABLES[auction["item_type"]]} SET user_id = $1 WHERE id = $2',
+                        owner_id, auction['item_id']
+                    )
+                elif auction['bidder_id']:
+                    row = await conn.fetchrow('SELECT * FROM catalog_items WHERE id = $1', auction['item_id'])
+                    table, owned = self.owned_item_row(owner_id, self.catalog_item_from_row(row))
+                    columns = ', '.join(owned)
+                    placeholders = ', '.join(f'${i}' for i in range(1, len(owned) + 1))
+                    await conn.execute(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', *owned.values())
+                else:
+                    await conn.execute('UPDATE catalog_items SET stock = stock + 1 WHERE id = $1', auction['item_id'])
+                
+                fee = 0
+                if auction['bidder_id']:
+                    fee = int(auction['current_bid'] * AUCTION_FEE)
+                    await conn.execute('''
+                        UPDATE users SET balance = balance
+                            + CASE WHEN user_id = $1 THEN $3::BIGINT ELSE 0 END
+                            + CASE WHEN user_id = $2 THEN $4::BIGINT ELSE 0 END
+                        WHERE user_id IN ($1, $2)
+                    ''', auction['seller_id'], MAIN_ADMIN_ID, auction['current_bid'] - fee, fee)
+                    await conn.execute('''
+                        INSERT INTO transactions (from_id, to_id, amount, fee, type, description)
+                        VALUES ($1, $2, $3, $4, 'auction', $5)
+                    ''', auction['bidder_id'], auction['seller_id'], auction['current_bid'], fee, auction['item_name'])
+                
+                status = 'settled' if auction['bidder_id'] else 'expired'
+                await conn.execute('UPDATE auctions SET status = $2 WHERE id = $1', auction_id, status)
+                
+                settled = dict(auction)
+                settled.update(status=status, fee=fee)
+                return settled
+
+    # ========== ПОСТРАНИЧНЫЙ ВЫВОД ПРЕДМЕТОВ ==========
+
+    async def get_user_items_page(self, item_type: str, user_id: int, limit: int,
+                                  after: Optional[tuple] = None, before: Optional[tuple] = None) -> List[Dict]:
+        """Страница предметов игрока от дорогих к дешёвым по курсору (price, id) - читает только limit строк индекса"""
+        table = ITEM_TABLES[item_type]
+        async with self.pool.acquire() as conn:
+            if after:
+                rows = await conn.fetch(f'''
+                    SELECT * FROM {table}
+                    WHERE user_id = $1 AND (price, id) < ($2, $3)
+                    ORDER BY price DESC, id DESC LIMIT $4
+                ''', user_id, after[0], after[1], limit)
+            elif before:
+                rows = await conn.fetch(f'''
+                    SELECT * FROM {table}
+                    WHERE user_id = $1 AND (price, id) > ($2, $3)
+                    ORDER BY price, id LIMIT $4
+                ''', user_id, before[0], before[1], limit)
+                rows = rows[::-1]
+            else:
+                rows = await conn.fetch(f'''
+                    SELECT * FROM {table}
+                    WHERE user_id = $1
+                    ORDER BY price DESC, id DESC LIMIT $2
+                ''', user_id, limit)
+            return [dict(row) for row in rows]
+
+    async def get_user_items_summary(self, user_id: int) -> Dict[str, Dict]:
+        """Количество и стоимость предметов игрока по категориям одним запросом"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT 'car' AS item_type, COUNT(*) AS count, COALESCE(SUM(price), 0)::BIGINT AS total FROM cars WHERE user_id = $1
+                UNION ALL
+                SELECT 'phone', COUNT(*), COALESCE(SUM(price), 0)::BIGINT FROM phones WHERE user_id = $1
+                UNION ALL
+                SELECT 'house', COUNT(*), COALESCE(SUM(price), 0)::BIGINT FROM houses WHERE user_id = $1
+                UNION ALL
+                SELECT 'accessory', COUNT(*), COALESCE(SUM(price), 0)::BIGINT FROM accessories WHERE user_id = $1
+            ''', user_id)
+            return {row['item_type']: {'count': row['count'], 'total': row['total']} for row in rows}
+
     # ========== МЕТОДЫ ДЛЯ МАШИН ==========
 
     async def add_car(self, user_id: int, brand: str, model: str, price: int, speed: int, description: str = "", is_custom: bool = False, created_by: int = None) -> Dict:
@@ -500,6 +1354,112 @@ class Database:
                 rows = await conn.fetch('SELECT * FROM custom_items WHERE is_active = TRUE')
             return [dict(row) for row in rows]
 
+    # ========== МЕТОДЫ ДЛЯ ТОВАРОВ СО СКЛАДОМ ==========
+
+    def catalog_item_from_row(self, row) -> Dict:
+        item = dict(row)
+        item['attributes'] = json.loads(item['attributes'])
+        return item
+
+    def owned_item_row(self, user_id: int, item: Dict) -> tuple:
+        """Таблица и строка предмета во владении пользователя для товара каталога"""
+        attributes = item['attributes']
+        row = {'user_id': user_id, 'description': item.get('description') or '', 'price': item['price'],
+               'is_custom': True, 'created_by': item.get('created_by')}
+        
+        if item['item_type'] == 'car':
+            row.update(brand=item['name'].split()[0], model=item['name'], speed=attributes['speed'])
+            return 'cars', row
+        if item['item_type'] == 'phone':
+            row.update(brand=item['name'].split()[0], model=item['name'], camera=attributes['camera'])
+            return 'phones', row
+        if item['item_type'] == 'house':
+            row.update(house_id=item['id'], house_name=item['name'], rooms=attributes['rooms'],
+                       area=attributes['area'], comfort=attributes['comfort'])
+            return 'houses', row
+        if item['item_type'] == 'accessory':
+            row.update(accessory_id=item['id'], accessory_name=item['name'],
+                       category=attributes['category'], style=attributes['style'])
+            return 'accessories', row
+        raise ValueError(f"Неизвестный тип товара: {item['item_type']}")
+
+    async def add_items_bulk(self, item_type: str, rows: List[Dict]) -> Dict:
+        """Массовая вставка предметов через COPY: все строки одной передачей"""
+        if not rows:
+            return {'rows': 0, 'seconds': 0.0, 'rows_per_second': 0.0}
+        
+        table = ITEM_TABLES[item_type]
+        columns = list(rows[0])
+        records = [tuple(row[column] for column in columns) for row in rows]
+        
+        started = time.perf_counter()
+        async with self.pool.acquire() as conn:
+            await conn.copy_records_to_table(table, records=records, columns=columns)
+        seconds = time.perf_counter() - started
+        
+        rows_per_second = len(records) / seconds if seconds > 0 else float(len(records))
+        logger.info(f"📦 {table}: вставлено {len(records)} строк за {seconds:.3f} сек ({rows_per_second:,.0f} строк/сек)")
+        
+        return {'rows': len(records), 'seconds': seconds, 'rows_per_second': rows_per_second}
+
+    async def restock_catalog_item(self, item_id: int, amount: int) -> Optional[int]:
+        """Пополнить склад одним UPDATE. Возвращает новый остаток"""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval('''
+                UPDATE catalog_items SET stock = stock + $2
+                WHERE id = $1 AND stock + $2 >= 0
+                RETURNING stock
+            ''', item_id, amount)
+
+    async def get_catalog_item(self, item_id: int) -> Optional[Dict]:
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow('SELECT * FROM catalog_items WHERE id = $1', item_id)
+            return self.catalog_item_from_row(row) if row else None
+
+    async def get_catalog_items(self, item_type: str = None) -> List[Dict]:
+        async with self.pool.acquire() as conn:
+            if item_type:
+                rows = await conn.fetch('SELECT * FROM catalog_items WHERE item_type = $1 AND is_active ORDER BY price', item_type)
+            else:
+                rows = await conn.fetch('SELECT * FROM catalog_items WHERE is_active ORDER BY item_type, price')
+            return [self.catalog_item_from_row(row) for row in rows]
+
+    async def buy_catalog_item(self, user_id: int, item_id: int) -> Dict:
+        """Покупка со склада: строка товара блокируется, предмет создаётся только после списания остатка и денег"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow(
+                    'SELECT * FROM catalog_items WHERE id = $1 AND is_active FOR UPDATE', item_id
+                )
+                if not row or row['stock'] <= 0:
+                    return {'success': False, 'message': '❌ Товар закончился!'}
+                
+                item = self.catalog_item_from_row(row)
+                
+                balance = await conn.fetchval('''
+                    UPDATE users SET balance = balance - $2
+                    WHERE user_id = $1 AND balance >= $2
+                    RETURNING balance
+                ''', user_id, item['price'])
+                if balance is None:
+                    return {'success': False, 'message': '❌ Недостаточно средств!'}
+                
+                stock = await conn.fetchval(
+                    'UPDATE catalog_items SET stock = stock - 1 WHERE id = $1 RETURNING stock', item_id
+                )
+                
+                table, owned = self.owned_item_row(user_id, item)
+                columns = ', '.join(owned)
+                placeholders = ', '.join(f'${i}' for i in range(1, len(owned) + 1))
+                await conn.execute(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', *owned.values())
+                
+                return {
+                    'success': True,
+                    'balance': balance,
+                    'stock': stock,
+                    'message': f"✅ Вы купили {item['name']} за {item['price']:,}{CURR}!"
+                }
+
     # ========== МЕТОДЫ ДЛЯ КРИПТОВАЛЮТЫ ==========
 
     async def get_crypto_list(self) -> List[Dict]:
@@ -512,6 +1472,53 @@ class Database:
             row = await conn.fetchrow('SELECT * FROM cryptocurrencies WHERE id = $1', crypto_id)
             return dict(row) if row else None
 
+    async def update_crypto_prices(self, crypto_ids: List[int], prices: List[float], tick_time: datetime.datetime):
+        """Записать тик рынка: новые цены, сырые тики и свечи 1m/1h/1d - в одной транзакции"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute('''
+                    UPDATE cryptocurrencies c
+                    SET price = v.price, last_update = $3
+                    FROM unnest($1::INTEGER[], $2::DOUBLE PRECISION[]) AS v(id, price)
+                    WHERE c.id = v.id
+                ''', crypto_ids, prices, tick_time)
+                
+                await conn.execute('''
+                    INSERT INTO crypto_ticks (crypto_id, price, created_at)
+                    SELECT id, price, $3 FROM unnest($1::INTEGER[], $2::DOUBLE PRECISION[]) AS v(id, price)
+                ''', crypto_ids, prices, tick_time)
+                
+                # Свечи обновляются инкрементально: open ставится только при создании
+                await conn.execute('''
+                    INSERT INTO crypto_candles (crypto_id, resolution, bucket, open, high, low, close)
+                    SELECT v.id, r.resolution, date_trunc(r.unit, $3::TIMESTAMP), v.price, v.price, v.price, v.price
+                    FROM unnest($1::INTEGER[], $2::DOUBLE PRECISION[]) AS v(id, price)
+                    CROSS JOIN (VALUES ('1m', 'minute'), ('1h', 'hour'), ('1d', 'day')) AS r(resolution, unit)
+                    ON CONFLICT (crypto_id, resolution, bucket) DO UPDATE SET
+                        high = GREATEST(crypto_candles.high, EXCLUDED.high),
+                        low = LEAST(crypto_candles.low, EXCLUDED.low),
+                        close = EXCLUDED.close
+                ''', crypto_ids, prices, tick_time)
+
+    async def get_crypto_candles(self, resolution: str, since: datetime.datetime) -> List[Dict]:
+        """Свечи всех монет заданного разрешения начиная с момента since"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT * FROM crypto_candles
+                WHERE resolution = $1 AND bucket >= $2
+                ORDER BY crypto_id, bucket
+            ''', resolution, since)
+            return [dict(row) for row in rows]
+
+    async def prune_crypto_history(self, ticks_before: datetime.datetime, minute_candles_before: datetime.datetime) -> int:
+        """Удалить старые сырые тики и минутные свечи (часовые и дневные храним всегда)"""
+        async with self.pool.acquire() as conn:
+            result = await conn.execute('DELETE FROM crypto_ticks WHERE created_at < $1', ticks_before)
+            await conn.execute('''
+                DELETE FROM crypto_candles WHERE resolution = '1m' AND bucket < $1
+            ''', minute_candles_before)
+            return int(result.split()[-1])
+
     async def get_user_crypto_wallet(self, user_id: int) -> List[Dict]:
         async with self.pool.acquire() as conn:
             rows = await conn.fetch('''
@@ -522,6 +1529,276 @@ class Database:
             ''', user_id)
             return [dict(row) for row in rows]
 
+    # ========== МЕТОДЫ ДЛЯ ЛИМИТНЫХ ОРДЕРОВ ==========
+
+    async def create_crypto_order(self, user_id: int, crypto_id: int, side: str, limit_price: float, amount: int) -> Optional[Dict]:
+        """Создать ордер и заморозить средства: деньги для покупки или монеты для продажи"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if side == 'buy':
+                    reserved = await conn.fetchval('''
+                        UPDATE users SET balance = balance - $1
+                        WHERE user_id = $2 AND balance >= $1
+                        RETURNING balance
+                    ''', amount, user_id)
+                else:
+                    reserved = await conn.fetchval('''
+                        UPDATE crypto_wallets SET amount = amount - $1
+                        WHERE user_id = $2 AND crypto_id = $3 AND amount >= $1
+                        RETURNING amount
+                    ''', amount, user_id, crypto_id)
+                
+                if reserved is None:
+                    return None
+                
+                row = await conn.fetchrow('''
+                    INSERT INTO crypto_orders (user_id, crypto_id, side, limit_price, amount_usd, crypto_amount)
+                    VALUES ($1, $2, $3, $4, $5, $6)
+                    RETURNING *
+                ''', user_id, crypto_id, side, limit_price,
+                    amount if side == 'buy' else None,
+                    amount if side == 'sell' else None)
+                return dict(row)
+
+    async def cancel_crypto_order(self, order_id: int, user_id: int) -> Optional[Dict]:
+        """Отменить открытый ордер и вернуть замороженные средства"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow('''
+                    UPDATE crypto_orders SET status = 'cancelled'
+                    WHERE id = $1 AND user_id = $2 AND status = 'open'
+                    RETURNING *
+                ''', order_id, user_id)
+                
+                if not row:
+                    return None
+                
+                if row['side'] == 'buy':
+                    await conn.execute('UPDATE users SET balance = balance + $1 WHERE user_id = $2', row['amount_usd'], user_id)
+                else:
+                    await conn.execute('''
+                        UPDATE crypto_wallets SET amount = amount + $1
+                        WHERE user_id = $2 AND crypto_id = $3
+                    ''', row['crypto_amount'], user_id, row['crypto_id'])
+                return dict(row)
+
+    async def get_open_crypto_orders(self) -> List[Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT * FROM crypto_orders WHERE status = 'open' ORDER BY id")
+            return [dict(row) for row in rows]
+
+    async def get_user_crypto_orders(self, user_id: int) -> List[Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT o.*, c.symbol
+                FROM crypto_orders o
+                JOIN cryptocurrencies c ON o.crypto_id = c.id
+                WHERE o.user_id = $1 AND o.status = 'open'
+                ORDER BY o.id
+            ''', user_id)
+            return [dict(row) for row in rows]
+
+    async def fill_crypto_orders(self, order_ids: List[int], prices: List[float]) -> List[Dict]:
+        """Исполнить пачку сработавших ордеров одной транзакцией"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # Уже отменённые ордера сюда не попадут - статус проверяется в WHERE
+                rows = await conn.fetch('''
+                    UPDATE crypto_orders o
+                    SET status = 'filled', fill_price = v.price, filled_at = NOW(),
+                        crypto_amount = CASE WHEN o.side = 'buy'
+                            THEN floor(o.amount_usd * (1 - $3::DOUBLE PRECISION) / v.price * $4)::BIGINT
+                            ELSE o.crypto_amount END
+                    FROM unnest($1::INTEGER[], $2::DOUBLE PRECISION[]) AS v(id, price)
+                    WHERE o.id = v.id AND o.status = 'open'
+                    RETURNING o.*
+                ''', order_ids, prices, CRYPTO_FEE, CRYPTO_UNITS)
+                
+                wallets = {}  # (user_id, crypto_id) -> [куплено единиц, потрачено без комиссии]
+                credits = {}  # user_id -> выручка от продаж
+                total_fee = 0
+                fills = []
+                
+                for row in rows:
+                    fill = dict(row)
+                    if fill['side'] == 'buy':
+                        fill['fee'] = fill['amount_usd'] * CRYPTO_FEE
+                        wallet = wallets.setdefault((fill['user_id'], fill['crypto_id']), [0, 0.0])
+                        wallet[0] += fill['crypto_amount']
+                        wallet[1] += fill['amount_usd'] - fill['fee']
+                    else:
+                        usd_amount = fill['crypto_amount'] / CRYPTO_UNITS * fill['fill_price']
+                        fill['fee'] = usd_amount * CRYPTO_FEE
+                        fill['amount_usd'] = int(usd_amount - fill['fee'])
+                        credits[fill['user_id']] = credits.get(fill['user_id'], 0) + fill['amount_usd']
+                    total_fee += fill['fee']
+                    fills.append(fill)
+                
+                if wallets:
+                    keys = list(wallets)
+                    await conn.execute('''
+                        INSERT INTO crypto_wallets (user_id, crypto_id, amount, average_buy_price)
+                        SELECT user_id, crypto_id, amount, cost * $5 / amount
+                        FROM unnest($1::BIGINT[], $2::INTEGER[], $3::BIGINT[], $4::DOUBLE PRECISION[]) AS v(user_id, crypto_id, amount, cost)
+                        WHERE amount > 0
+                        ON CONFLICT (user_id, crypto_id) DO UPDATE SET
+                            amount = crypto_wallets.amount + EXCLUDED.amount,
+                            average_buy_price = (crypto_wallets.amount * COALESCE(crypto_wallets.average_buy_price, 0)
+                                                 + EXCLUDED.amount * EXCLUDED.average_buy_price)
+                                                / (crypto_wallets.amount + EXCLUDED.amount)
+                    ''', [k[0] for k in keys], [k[1] for k in keys],
+                        [wallets[k][0] for k in keys], [wallets[k][1] for k in keys], CRYPTO_UNITS)
+                
+                if credits:
+                    await conn.execute('''
+                        UPDATE users u SET balance = u.balance + v.amount
+                        FROM unnest($1::BIGINT[], $2::BIGINT[]) AS v(user_id, amount)
+                        WHERE u.user_id = v.user_id
+                    ''', list(credits), list(credits.values()))
+                
+                if total_fee:
+                    await conn.execute('UPDATE users SET balance = balance + $1 WHERE user_id = $2', int(total_fee), MAIN_ADMIN_ID)
+                
+                return fills
+
+    # ========== МЕТОДЫ ДЛЯ ЦЕНОВЫХ АЛЕРТОВ ==========
+
+    async def create_crypto_alert(self, user_id: int, crypto_id: int, threshold: float, max_per_user: int) -> Optional[Dict]:
+        """Создать алерт, если у пользователя их меньше max_per_user"""
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow('''
+                INSERT INTO crypto_alerts (user_id, crypto_id, threshold)
+                SELECT $1, $2, $3
+                WHERE (SELECT COUNT(*) FROM crypto_alerts WHERE user_id = $1) < $4
+                RETURNING *
+            ''', user_id, crypto_id, threshold, max_per_user)
+            return dict(row) if row else None
+
+    async def get_crypto_alerts(self) -> List[Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('SELECT * FROM crypto_alerts')
+            return [dict(row) for row in rows]
+
+    async def get_user_crypto_alerts(self, user_id: int) -> List[Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT a.*, c.symbol
+                FROM crypto_alerts a
+                JOIN cryptocurrencies c ON a.crypto_id = c.id
+                WHERE a.user_id = $1
+                ORDER BY a.id
+            ''', user_id)
+            return [dict(row) for row in rows]
+
+    async def delete_crypto_alert(self, alert_id: int, user_id: int) -> Optional[Dict]:
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow('DELETE FROM crypto_alerts WHERE id = $1 AND user_id = $2 RETURNING *', alert_id, user_id)
+            return dict(row) if row else None
+
+    async def delete_crypto_alerts(self, alert_ids: List[int]):
+        """Удалить сработавшие алерты одним запросом"""
+        async with self.pool.acquire() as conn:
+            await conn.execute('DELETE FROM crypto_alerts WHERE id = ANY($1::INTEGER[])', alert_ids)
+
+    # ========== МЕТОДЫ ДЛЯ АВТОПОКУПОК ==========
+
+    async def create_dca_plan(self, user_id: int, crypto_id: int, amount_usd: int, interval_hours: int, max_per_user: int) -> Optional[Dict]:
+        """Создать план автопокупки, если у пользователя их меньше max_per_user"""
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow('''
+                INSERT INTO crypto_dca_plans (user_id, crypto_id, amount_usd, interval_hours, next_run)
+                SELECT $1, $2, $3, $4, $6
+                WHERE (SELECT COUNT(*) FROM crypto_dca_plans WHERE user_id = $1) < $5
+                RETURNING *
+            ''', user_id, crypto_id, amount_usd, interval_hours, max_per_user, datetime.datetime.now())
+            return dict(row) if row else None
+
+    async def get_user_dca_plans(self, user_id: int) -> List[Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT p.*, c.symbol
+                FROM crypto_dca_plans p
+                JOIN cryptocurrencies c ON p.crypto_id = c.id
+                WHERE p.user_id = $1
+                ORDER BY p.id
+            ''', user_id)
+            return [dict(row) for row in rows]
+
+    async def delete_dca_plan(self, plan_id: int, user_id: int) -> bool:
+        async with self.pool.acquire() as conn:
+            result = await conn.execute('DELETE FROM crypto_dca_plans WHERE id = $1 AND user_id = $2', plan_id, user_id)
+            return result != 'DELETE 0'
+
+    async def execute_due_dca_plans(self, now: datetime.datetime, prices: Dict[int, float]) -> List[Dict]:
+        """Исполнить все наступившие планы: одно списание на всех и один upsert кошельков на монету"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # Списываем сумму всех планов пользователя целиком или не списываем ничего
+                rows = await conn.fetch('''
+                    WITH due AS (
+                        SELECT id, user_id, crypto_id, amount_usd
+                        FROM crypto_dca_plans
+                        WHERE next_run <= $1 AND crypto_id = ANY($2::INTEGER[])
+                        FOR UPDATE SKIP LOCKED
+                    ),
+                    totals AS (
+                        SELECT user_id, SUM(amount_usd) AS total FROM due GROUP BY user_id
+                    ),
+                    debited AS (
+                        UPDATE users u SET balance = u.balance - t.total
+                        FROM totals t
+                        WHERE u.user_id = t.user_id AND u.balance >= t.total
+                        RETURNING u.user_id
+                    )
+                    SELECT due.*, due.user_id IN (SELECT user_id FROM debited) AS paid
+                    FROM due
+                ''', now, list(prices))
+                
+                if not rows:
+                    return []
+                
+                bought = {}  # crypto_id -> {user_id: куплено единиц}
+                total_fee = 0
+                plans = []
+                
+                for row in rows:
+                    plan = dict(row)
+                    if plan['paid']:
+                        fee = plan['amount_usd'] * CRYPTO_FEE
+                        plan['price'] = prices[plan['crypto_id']]
+                        plan['crypto_units'] = int((plan['amount_usd'] - fee) / plan['price'] * CRYPTO_UNITS)
+                        users = bought.setdefault(plan['crypto_id'], {})
+                        users[plan['user_id']] = users.get(plan['user_id'], 0) + plan['crypto_units']
+                        total_fee += fee
+                    plans.append(plan)
+                
+                for crypto_id, users in bought.items():
+                    await conn.execute('''
+                        INSERT INTO crypto_wallets (user_id, crypto_id, amount, average_buy_price)
+                        SELECT user_id, $3, units, $4
+                        FROM unnest($1::BIGINT[], $2::BIGINT[]) AS v(user_id, units)
+                        ON CONFLICT (user_id, crypto_id) DO UPDATE SET
+                            amount = crypto_wallets.amount + EXCLUDED.amount,
+                            average_buy_price = (crypto_wallets.amount * COALESCE(crypto_wallets.average_buy_price, 0)
+                                                 + EXCLUDED.amount * EXCLUDED.average_buy_price)
+                                                / NULLIF(crypto_wallets.amount + EXCLUDED.amount, 0)
+                    ''', list(users), list(users.values()), crypto_id, prices[crypto_id])
+                
+                if total_fee:
+                    await conn.execute('UPDATE users SET balance = balance + $1 WHERE user_id = $2', int(total_fee), MAIN_ADMIN_ID)
+                
+                # Следующий запуск - через интервал; если бот долго стоял, отсчитываем от текущего момента
+                await conn.execute('''
+                    UPDATE crypto_dca_plans
+                    SET next_run = CASE
+                        WHEN next_run + make_interval(hours => interval_hours) > $2 THEN next_run + make_interval(hours => interval_hours)
+                        ELSE $2 + make_interval(hours => interval_hours)
+                    END
+                    WHERE id = ANY($1::INTEGER[])
+                ''', [plan['id'] for plan in plans], now)
+                
+                return plans
+
     # ========== МЕТОДЫ ДЛЯ КАЗИНО ==========
 
     async def update_game_stats(self, user_id: int, won: bool, bet: int, win_amount: int = 0):
@@ -598,6 +1875,284 @@ class Database:
             ''', user_id)
             return dict(row) if row else None
 
+    async def get_total_clans(self) -> int:
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval('SELECT COUNT(*) FROM clans')
+
+    async def get_clans_page(self, order: str, limit: int, after: Optional[int] = None, before: Optional[int] = None) -> List[Dict]:
+        """Страница каталога кланов: order='top' - по участникам, 'name' - по названию. Курсор - id крайнего клана"""
+        column, descending = {'top': ('members_count', True), 'name': ('name', False)}[order]
+        cursor = after or before
+        
+        # Назад листаем в обратном порядке и разворачиваем результат
+        reverse = descending if before is None else not descending
+        direction = 'DESC' if reverse else 'ASC'
+        
+        condition = 'TRUE'
+        args = [limit]
+        if cursor:
+            args.append(cursor)
+            condition = f"(c.{column}, c.id) {'<' if reverse else '>'} (SELECT {column}, id FROM clans WHERE id = $2)"
+        
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(f'''
+                SELECT c.*, u.username AS owner_name
+                FROM clans c
+                LEFT JOIN users u ON u.user_id = c.owner_id
+                WHERE {condition}
+                ORDER BY c.{column} {direction}, c.id {direction}
+                LIMIT $1
+            ''', *args)
+        
+        clans = [dict(row) for row in rows]
+        return clans[::-1] if before else clans
+
+    async def join_open_clan(self, clan_id: int, user_id: int) -> Dict:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                existing = await conn.fetchval('SELECT 1 FROM clan_members WHERE user_id = $1', user_id)
+                if existing:
+                    return {'success': False, 'message': '❌ Вы уже состоите в клане!'}
+                
+                name = await conn.fetchval('''
+                    UPDATE clans SET members_count = members_count + 1
+                    WHERE id = $1 AND type = 'open' AND members_count < max_members
+                    RETURNING name
+                ''', clan_id)
+                if not name:
+                    return {'success': False, 'message': '❌ В клан нельзя вступить: он закрыт или заполнен!'}
+                
+                await conn.execute('''
+                    INSERT INTO clan_members (clan_id, user_id) VALUES ($1, $2)
+                ''', clan_id, user_id)
+                
+                return {'success': True, 'message': f'✅ Вы вступили в клан {name}!', 'clan_id': clan_id}
+
+    async def leave_clan(self, user_id: int) -> Dict:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                member = await conn.fetchrow(
+                    "DELETE FROM clan_members WHERE user_id = $1 AND role != 'owner' RETURNING clan_id", user_id
+                )
+                if not member:
+                    return {'success': False, 'message': '❌ Вы не в клане или являетесь его владельцем!'}
+                
+                await conn.execute(
+                    'UPDATE clans SET members_count = members_count - 1 WHERE id = $1', member['clan_id']
+                )
+                return {'success': True, 'message': '✅ Вы покинули клан', 'clan_id': member['clan_id']}
+
+    # ========== МЕТОДЫ ДЛЯ КАЗНЫ КЛАНА ==========
+
+    async def clan_treasury_deposit(self, user_id: int, amount: int) -> Dict:
+        """Взнос в казну своего клана: списание, зачисление и запись журнала в одной транзакции"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                clan_id = await conn.fetchval('SELECT clan_id FROM clan_members WHERE user_id = $1', user_id)
+                if not clan_id:
+                    return {'success': False, 'message': '❌ Вы не состоите в клане!'}
+                
+                user_balance = await conn.fetchval('''
+                    UPDATE users SET balance = balance - $2
+                    WHERE user_id = $1 AND balance >= $2
+                    RETURNING balance
+                ''', user_id, amount)
+                if user_balance is None:
+                    return {'success': False, 'message': '❌ Недостаточно средств!'}
+                
+                clan_balance = await conn.fetchval(
+                    'UPDATE clans SET balance = balance + $2 WHERE id = $1 RETURNING balance', clan_id, amount
+                )
+                await conn.execute('''
+                    INSERT INTO clan_treasury_ledger (clan_id, user_id, amount, balance_after, kind)
+                    VALUES ($1, $2, $3, $4, 'deposit')
+                ''', clan_id, user_id, amount, clan_balance)
+                
+                return {'success': True, 'clan_balance': clan_balance, 'balance': user_balance}
+
+    async def clan_treasury_withdraw(self, user_id: int, amount: int) -> Dict:
+        """Вывод из казны: доступен участникам с рангом от CLAN_TREASURY_WITHDRAW_RANK"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                member = await conn.fetchrow('SELECT clan_id, rank FROM clan_members WHERE user_id = $1', user_id)
+                if not member:
+                    return {'success': False, 'message': '❌ Вы не состоите в клане!'}
+                if member['rank'] < CLAN_TREASURY_WITHDRAW_RANK:
+                    return {'success': False, 'message': '❌ Недостаточно прав для вывода из казны!'}
+                
+                clan_balance = await conn.fetchval('''
+                    UPDATE clans SET balance = balance - $2
+                    WHERE id = $1 AND balance >= $2
+                    RETURNING balance
+                ''', member['clan_id'], amount)
+                if clan_balance is None:
+                    return {'success': False, 'message': '❌ В казне недостаточно средств!'}
+                
+                user_balance = await conn.fetchval(
+                    'UPDATE users SET balance = balance + $2 WHERE user_id = $1 RETURNING balance', user_id, amount
+                )
+                await conn.execute('''
+                    INSERT INTO clan_treasury_ledger (clan_id, user_id, amount, balance_after, kind)
+                    VALUES ($1, $2, $3, $4, 'withdraw')
+                ''', member['clan_id'], user_id, -amount, clan_balance)
+                
+                return {'success': True, 'clan_balance': clan_balance, 'balance': user_balance}
+
+    async def get_clan_treasury_history(self, clan_id: int, limit: int) -> List[Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT l.*, u.username
+                FROM clan_treasury_ledger l
+                LEFT JOIN users u ON u.user_id = l.user_id
+                WHERE l.clan_id = $1
+                ORDER BY l.id DESC
+                LIMIT $2
+            ''', clan_id, limit)
+            return [dict(row) for row in rows]
+
+    async def get_clans_by_wealth(self, limit: int) -> List[Dict]:
+        """Кланы по суммарному балансу участников - читается готовый агрегат"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                'SELECT * FROM clans ORDER BY members_wealth DESC, id LIMIT $1', limit
+            )
+            return [dict(row) for row in rows]
+
+    # ========== ЛИДЕРБОРДЫ ==========
+
+    async def get_top_by_balance(self, limit: int) -> List[Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT user_id, username, first_name, balance, total_wins, total_games, is_banned
+                FROM users
+                WHERE NOT is_banned
+                ORDER BY balance DESC
+                LIMIT $1
+            ''', limit)
+            return [dict(row) for row in rows]
+
+    async def get_top_by_casino_wins(self, limit: int) -> List[Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT user_id, username, first_name, balance, total_wins, total_games, is_banned
+                FROM users
+                WHERE NOT is_banned AND total_games > 0
+                ORDER BY total_wins DESC, total_games DESC
+                LIMIT $1
+            ''', limit)
+            return [dict(row) for row in rows]
+
+    # ========== ЕЖЕНЕДЕЛЬНЫЕ ТОПЫ ==========
+
+    async def snapshot_weekly_tops(self, week_start: datetime.date, week_end: datetime.date, size: int) -> Optional[Dict]:
+        """Снимок трёх недельных топов и выплата призов в одной транзакции. None - если неделя уже подведена"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # Блокировка от параллельного запуска из нескольких процессов
+                await conn.execute("SELECT pg_advisory_xact_lock(hashtext('weekly_tops'))")
+                if await conn.fetchval('SELECT 1 FROM weekly_top_balance WHERE week_start = $1 LIMIT 1', week_start):
+                    return None
+                
+                await conn.execute('''
+                    INSERT INTO weekly_top_balance (user_id, username, balance, week_start, week_end, rank, claimed)
+                    SELECT user_id, username, balance, $1, $2, place, place <= $4
+                    FROM (
+                        SELECT user_id, username, balance, rank() OVER (ORDER BY balance DESC) AS place FROM users
+                        WHERE NOT is_banned AND NOT is_admin
+                        ORDER BY balance DESC LIMIT $3
+                    ) top
+                ''', week_start, week_end, size, len(WEEKLY_TOP_PRIZES))
+                
+                await conn.execute('''
+                    INSERT INTO weekly_top_referrals (user_id, username, referral_count, week_start, week_end, rank, claimed)
+                    SELECT user_id, username, gained, $1, $2, place, place <= $4
+                    FROM (
+                        SELECT user_id, username, gained, rank() OVER (ORDER BY gained DESC) AS place FROM (
+                            SELECT user_id, username, referral_count - referral_count_week_start AS gained FROM users
+                            WHERE NOT is_banned AND referral_count > referral_count_week_start
+                        ) weekly
+                        ORDER BY gained DESC LIMIT $3
+                    ) top
+                ''', week_start, week_end, size, len(WEEKLY_REFERRAL_PRIZES))
+                
+                await conn.execute('''
+                    INSERT INTO weekly_top_clans (clan_id, clan_name, clan_tag, total_balance, week_start, week_end, rank, claimed)
+                    SELECT id, name, tag, members_wealth, $1, $2, place, place <= $4
+                    FROM (
+                        SELECT id, name, tag, members_wealth, rank() OVER (ORDER BY members_wealth DESC) AS place FROM clans
+                        ORDER BY members_wealth DESC, id LIMIT $3
+                    ) top
+                ''', week_start, week_end, size, len(WEEKLY_CLAN_PRIZES))
+                
+                # Призы игрокам за оба топа - одним UPDATE (место i получает prizes[i], суммы за оба топа складываются)
+                winners = await conn.fetch('''
+                    WITH prizes AS (
+                        SELECT user_id, $2::BIGINT[] AS prizes, rank FROM weekly_top_balance WHERE week_start = $1
+                        UNION ALL
+                        SELECT user_id, $3::BIGINT[], rank FROM weekly_top_referrals WHERE week_start = $1
+                    ), paid AS (
+                        SELECT user_id, SUM(prizes[rank])::BIGINT AS prize FROM prizes
+                        WHERE rank <= cardinality(prizes)
+                        GROUP BY user_id
+                    )
+                    UPDATE users u SET balance = u.balance + paid.prize
+                    FROM paid WHERE u.user_id = paid.user_id
+                    RETURNING u.user_id, paid.prize
+                ''', week_start, WEEKLY_TOP_PRIZES, WEEKLY_REFERRAL_PRIZES)
+                
+                clan_winners = await conn.fetch('''
+                    WITH paid AS (
+                        UPDATE clans c SET balance = c.balance + ($2::BIGINT[])[w.rank]
+                        FROM weekly_top_clans w
+                        WHERE w.week_start = $1 AND w.clan_id = c.id AND w.claimed
+                        RETURNING c.id, c.owner_id, c.balance, ($2::BIGINT[])[w.rank] AS prize
+                    ), ledger AS (
+                        INSERT INTO clan_treasury_ledger (clan_id, user_id, amount, balance_after, kind)
+                        SELECT id, 0, prize, balance, 'weekly_prize' FROM paid
+                    )
+                    SELECT id, owner_id, prize FROM paid
+                ''', week_start, WEEKLY_CLAN_PRIZES)
+                
+                await conn.execute('''
+                    UPDATE users SET referral_count_week_start = referral_count
+                    WHERE referral_count != referral_count_week_start
+                ''')
+                
+                return {
+                    'winners': [dict(row) for row in winners],
+                    'clan_winners': [dict(row) for row in clan_winners]
+                }
+
+    async def get_weekly_top_balance(self) -> List[Dict]:
+        """Последний снимок топа по балансу"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT w.*, u.first_name FROM weekly_top_balance w
+                LEFT JOIN users u ON u.user_id = w.user_id
+                WHERE w.week_start = (SELECT MAX(week_start) FROM weekly_top_balance)
+                ORDER BY w.rank, w.id
+            ''')
+            return [dict(row) for row in rows]
+
+    async def get_weekly_top_referrals(self) -> List[Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT w.*, u.first_name FROM weekly_top_referrals w
+                LEFT JOIN users u ON u.user_id = w.user_id
+                WHERE w.week_start = (SELECT MAX(week_start) FROM weekly_top_referrals)
+                ORDER BY w.rank, w.id
+            ''')
+            return [dict(row) for row in rows]
+
+    async def get_weekly_top_clans(self) -> List[Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT * FROM weekly_top_clans
+                WHERE week_start = (SELECT MAX(week_start) FROM weekly_top_clans)
+                ORDER BY rank, id
+            ''')
+            return [dict(row) for row in rows]
+
     # ========== МЕТОДЫ ДЛЯ ТРАНЗАКЦИЙ ==========
 
     async def transfer_money(self, from_id: int, to_id: int, amount: int, fee: int) -> Dict:
@@ -614,6 +2169,81 @@ class Database:
                 
                 return {'success': True}
 
+    # ========== МЕТОДЫ ДЛЯ НАСТРОЕК ==========
+
+    async def get_user_settings(self, user_id: int) -> Optional[Dict]:
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow('SELECT * FROM user_settings WHERE user_id = $1', user_id)
+            return dict(row) if row else None
+
+    async def get_user_settings_many(self, user_ids: List[int]) -> Dict[int, Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('SELECT * FROM user_settings WHERE user_id = ANY($1::BIGINT[])', user_ids)
+            return {row['user_id']: dict(row) for row in rows}
+
+    async def save_user_settings_many(self, settings: Dict[int, tuple], reset_ids: List[int] = None):
+        """Пакетная запись настроек: upsert (flags, nickname), удаление сброшенных к умолчанию"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if settings:
+                    # JOIN с users отбрасывает уже удалённых пользователей - иначе внешний ключ валит весь пакет
+                    user_ids = list(settings)
+                    await conn.execute('''
+                        INSERT INTO user_settings (user_id, flags, nickname)
+                        SELECT v.user_id, v.flags, v.nickname
+                        FROM unnest($1::BIGINT[], $2::SMALLINT[], $3::TEXT[]) AS v(user_id, flags, nickname)
+                        JOIN users u ON u.user_id = v.user_id
+                        ON CONFLICT (user_id) DO UPDATE SET
+                            flags = EXCLUDED.flags,
+                            nickname = EXCLUDED.nickname,
+                            updated_at = CURRENT_TIMESTAMP
+                    ''', user_ids, [settings[user_id][0] for user_id in user_ids], [settings[user_id][1] for user_id in user_ids])
+                
+                if reset_ids:
+                    await conn.execute('DELETE FROM user_settings WHERE user_id = ANY($1::BIGINT[])', reset_ids)
+
+    # ========== МЕТОДЫ ДЛЯ ПОДТВЕРЖДЕНИЙ ==========
+
+    async def save_confirmation(self, confirm_id: str, conf: Dict):
+        async with self.pool.acquire() as conn:
+            await conn.execute('''
+                INSERT INTO pending_confirmations (id, user_id, action, data, confirm_callback, cancel_callback, message_id, expires_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            ''', confirm_id, conf['user_id'], conf['action'], json.dumps(conf['data']),
+                conf['confirm_callback'], conf['cancel_callback'], conf['message_id'],
+                datetime.datetime.fromtimestamp(conf['expires_at']))
+
+    async def delete_confirmation(self, confirm_id: str):
+        async with self.pool.acquire() as conn:
+            await conn.execute('DELETE FROM pending_confirmations WHERE id = $1', confirm_id)
+
+    async def delete_expired_confirmations(self, now: float) -> int:
+        async with self.pool.acquire() as conn:
+            result = await conn.execute(
+                'DELETE FROM pending_confirmations WHERE expires_at <= $1',
+                datetime.datetime.fromtimestamp(now)
+            )
+            return int(result.split()[-1])
+
+    async def get_pending_confirmations(self, now: float) -> Dict[str, Dict]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                'SELECT * FROM pending_confirmations WHERE expires_at > $1',
+                datetime.datetime.fromtimestamp(now)
+            )
+            return {
+                row['id']: {
+                    'user_id': row['user_id'],
+                    'action': row['action'],
+                    'data': json.loads(row['data']),
+                    'confirm_callback': row['confirm_callback'],
+                    'cancel_callback': row['cancel_callback'],
+                    'message_id': row['message_id'],
+                    'expires_at': row['expires_at'].timestamp()
+                }
+                for row in rows
+            }
+
     # ========== МЕТОДЫ ДЛЯ ПРОВЕРКИ АДМИНА ==========
 
     async def check_admin(self, user_id: int) -> bool:
@@ -0,0 +1,80 @@
+from database import Database
+from market import CryptoMarketEngine
+from notifier import ThrottledSender
+from config import *
+from typing import Dict, List
+import asyncio
+import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DCAScheduler:
+    """Регулярные автопокупки крипты: один проход исполняет все наступившие планы"""
+    def __init__(self, db: Database, market: CryptoMarketEngine, sender: ThrottledSender):
+        self.db = db
+        self.market = market
+        self.sender = sender
+        self.run_task = None
+
+    async def create_plan(self, user_id: int, crypto_id: int, amount_usd: int, interval_hours: int) -> Dict:
+        plan = await self.db.create_dca_plan(user_id, crypto_id, amount_usd, interval_hours, DCA_PLANS_PER_USER)
+        
+        if not plan:
+            return {'success': False, 'message': f'❌ Можно держать не больше {DCA_PLANS_PER_USER} автопокупок!'}
+        
+        coin = self.market.get_coin(crypto_id)
+        return {
+            'success': True,
+            'message': f"🔁 Автопокупка создана: {coin['symbol']} на {amount_usd}{CURR} {DCA_INTERVALS[interval_hours]}\n"
+                       f"Первая покупка - в ближайшие {DCA_CHECK_INTERVAL // 60} мин."
+        }
+
+    async def run_due(self) -> int:
+        """Исполнить все наступившие планы и разослать по одной сводке на пользователя"""
+        prices = {coin['id']: coin['price'] for coin in self.market.get_snapshot()}
+        if not prices:
+            return 0
+        
+        plans = await self.db.execute_due_dca_plans(datetime.datetime.now(), prices)
+        
+        digests = {}  # user_id -> планы пользователя в этом проходе
+        for plan in plans:
+            digests.setdefault(plan['user_id'], []).append(plan)
+        
+        for user_id, user_plans in digests.items():
+            self.sender.send(user_id, self.format_digest(user_plans), parse_mode="Markdown")
+        
+        if plans:
+            logger.info(f"🔁 Исполнено автопокупок: {sum(plan['paid'] for plan in plans)}/{len(plans)}")
+        return len(plans)
+
+    def format_digest(self, plans: List[Dict]) -> str:
+        text = "🔁 *АВТОПОКУПКИ* 🔁\n\n"
+        
+        for plan in plans:
+            symbol = self.market.get_coin(plan['crypto_id'])['symbol']
+            if plan['paid']:
+                text += f"✅ *{symbol}*: +{plan['crypto_units'] / CRYPTO_UNITS:.8f} по {plan['price']:.2f}{CURR} ({plan['amount_usd']}{CURR})\n"
+            else:
+                text += f"❌ *{symbol}*: не хватило средств ({plan['amount_usd']}{CURR})\n"
+        
+        return text
+
+    async def run(self):
+        """Фоновый цикл автопокупок"""
+        while True:
+            await asyncio.sleep(DCA_CHECK_INTERVAL)
+            try:
+                await self.run_due()
+            except Exception as e:
+                logger.error(f"❌ Ошибка автопокупок: {e}")
+
+    def start(self):
+        if self.run_task is None:
+            self.run_task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.run_task:
+            self.run_task.cancel()
+            self.run_task = None
@@ -4,6 +4,7 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from database import Database
 from payments import PaymentSystem
 from confirmations import ConfirmationSystem
+from paginator import ItemPaginator
 from config import *
 
 class Government:
@@ -12,6 +13,12 @@ class Government:
         self.db = db
         self.payments = payments
         self.confirmations = confirmations
+        self.paginator = ItemPaginator(db)
+        self.type_names = {
+            'car': 'машины',
+            'phone': 'телефоны',
+            'house': 'дома'
+        }
 
     async def show_government_menu(self, message: types.Message):
         """Показать меню государства"""
@@ -33,19 +40,19 @@ class Government:
             reply_markup=keyboard
         )
 
-    async def show_sell_cars(self, callback_query: types.CallbackQuery):
-        """Показать машины для продажи"""
+    async def show_sell_cars(self, callback_query: types.CallbackQuery, cursor: str = ''):
+        """Показать машины для продажи (постранично)"""
         user_id = callback_query.from_user.id
-        cars = await self.db.get_user_cars(user_id)
+        page = await self.paginator.fetch(user_id, 'car', cursor)
         
-        if not cars:
+        if not page:
             await callback_query.answer("❌ У вас нет машин!", show_alert=True)
             return
         
         text = "🚗 *ПРОДАЖА МАШИН ГОСУДАРСТВУ* 🚗\n\n"
         keyboard = InlineKeyboardMarkup(row_width=1)
         
-        for car in cars:
+        for car in page.items:
             buy_price = int(car['price'] * GOVERNMENT_BUY_PERCENT / 100)
             text += f"• *{car['model']}*\n  💰 Куплена за: {car['price']}{CURR}\n  🏛️ Выкупим за: {buy_price}{CURR}\n\n"
             keyboard.add(InlineKeyboardButton(
@@ -53,6 +60,8 @@ class Government:
                 callback_data=f"gov_sell_car_{car['id']}"
             ))
         
+        page.add_nav(keyboard, "gov_cars_page_")
+        keyboard.add(InlineKeyboardButton("💰 Продать все машины", callback_data="gov_sell_all_car"))
         keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="gov_menu"))
         
         await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
@@ -92,27 +101,24 @@ class Government:
         data = await state.get_data()
         confirmed = data.get('confirmed_data', {})
         
-        result = await self.db.sell_car_to_government(
-            callback_query.from_user.id,
-            confirmed['car_id']
-        )
+        result = await self.db.sell_items_to_government(callback_query.from_user.id, 'car', [confirmed['car_id']])
         
-        await callback_query.message.edit_text(result['message'], parse_mode="Markdown")
+        await callback_query.message.edit_text(self.format_sale(result))
         await state.finish()
 
-    async def show_sell_phones(self, callback_query: types.CallbackQuery):
-        """Показать телефоны для продажи"""
+    async def show_sell_phones(self, callback_query: types.CallbackQuery, cursor: str = ''):
+        """Показать телефоны для продажи (постранично)"""
         user_id = callback_query.from_user.id
-        phones = await self.db.get_user_phones(user_id)
+        page = await self.paginator.fetch(user_id, 'phone', cursor)
         
-        if not phones:
+        if not page:
             await callback_query.answer("❌ У вас нет телефонов!", show_alert=True)
             return
         
         text = "📱 *ПРОДАЖА ТЕЛЕФОНОВ ГОСУДАРСТВУ* 📱\n\n"
         keyboard = InlineKeyboardMarkup(row_width=1)
         
-        for phone in phones:
+        for phone in page.items:
             buy_price = int(phone['price'] * GOVERNMENT_BUY_PERCENT / 100)
             text += f"• *{phone['model']}*\n  💰 Куплен за: {phone['price']}{CURR}\n  🏛️ Выкупим за: {buy_price}{CURR}\n\n"
             keyboard.add(InlineKeyboardButton(
@@ -120,6 +126,8 @@ class Government:
                 callback_data=f"gov_sell_phone_{phone['id']}"
             ))
         
+        page.add_nav(keyboard, "gov_phones_page_")
+        keyboard.add(InlineKeyboardButton("💰 Продать все телефоны", callback_data="gov_sell_all_phone"))
         keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="gov_menu"))
         
         await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
@@ -159,14 +167,70 @@ class Government:
         data = await state.get_data()
         confirmed = data.get('confirmed_data', {})
         
-        result = await self.db.sell_phone_to_government(
+        result = await self.db.sell_items_to_government(callback_query.from_user.id, 'phone', [confirmed['phone_id']])
+        
+        await callback_query.message.edit_text(self.format_sale(result))
+        await state.finish()
+
+    async def confirm_sell_all(self, callback_query: types.CallbackQuery, state: FSMContext):
+        """Подтверждение продажи всех предметов категории"""
+        item_type = callback_query.data.replace('gov_sell_all_', '')
+        
+        if item_type not in ('car', 'phone', 'house'):
+            await callback_query.answer("❌ Неизвестная категория!", show_alert=True)
+            return
+        
+        summary = (await self.db.get_user_items_summary(callback_query.from_user.id))[item_type]
+        
+        if not summary['count']:
+            await callback_query.answer("❌ Нечего продавать!", show_alert=True)
+            return
+        
+        total = summary['total']
+        payout = total * GOVERNMENT_BUY_PERCENT // 100
+        
+        await self.confirmations.ask_confirmation(
+            callback_query.message,
+            'sell_all',
+            {
+                'text': f"Продажа всех предметов ({self.type_names[item_type]}): *{summary['count']} шт*\n"
+                        f"Цена покупки: {total:,}{CURR}\n"
+                        f"Государство даст: {payout:,}{CURR}\n"
+                        f"Комиссия: {total - payout:,}{CURR}",
+                'item_type': item_type,
+                'count': summary['count'],
+                'total': total
+            },
+            'SELL_ALL_CONFIRM',
+            'CANCEL'
+        )
+
+    async def execute_sell_all(self, callback_query: types.CallbackQuery, state: FSMContext):
+        """Продажа всех предметов категории одним запросом"""
+        data = await state.get_data()
+        confirmed = data.get('confirmed_data', {})
+        
+        # Продаём только то, что было показано в подтверждении
+        result = await self.db.sell_items_to_government(
             callback_query.from_user.id,
-            confirmed['phone_id']
+            confirmed['item_type'],
+            expected={'count': confirmed['count'], 'total': confirmed['total']}
         )
         
-        await callback_query.message.edit_text(result['message'], parse_mode="Markdown")
+        await callback_query.message.edit_text(self.format_sale(result))
         await state.finish()
 
+    def format_sale(self, result: dict) -> str:
+        if not result['success']:
+            return result['message']
+        
+        return (
+            f"✅ Продано государству: {result['items']} шт\n"
+            f"💰 Получено: {result['payout']:,}{CURR}\n"
+            f"📊 Комиссия: {result['fee']:,}{CURR} (идет @{MAIN_ADMIN_USERNAME})\n"
+            f"💳 Баланс: {result['balance']:,}{CURR}"
+        )
+
     async def show_info(self, callback_query: types.CallbackQuery):
         """Показать информацию о государственных услугах"""
         text = "📊 *ИНФОРМАЦИЯ О ГОСУДАРСТВЕ* 📊\n\n"
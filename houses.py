@@ -5,6 +5,8 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from database import Database
 from payments import PaymentSystem
 from confirmations import ConfirmationSystem
+from catalog import Catalog
+from paginator import ItemPaginator
 from config import *
 import random
 
@@ -17,9 +19,10 @@ class HouseShop:
         self.db = db
         self.payments = payments
         self.confirmations = confirmations
+        self.paginator = ItemPaginator(db)
         
         # КАТЕГОРИИ ДОМОВ (от дешевых до дорогих)
-        self.houses = [
+        self.default_houses = [
             # Эконом (1-5)
             {
                 'id': 1,
@@ -176,6 +179,56 @@ class HouseShop:
                 'image': '🚀'
             }
         ]
+        
+        # Дома от администрации (приходят из кэша товаров)
+        self.custom_houses = []
+        
+        self.category_titles = {
+            'econom': "💰 *ЭКОНОМ КЛАСС* (до 1 млн)",
+            'business': "💼 *БИЗНЕС КЛАСС* (1-5 млн)",
+            'elite': "👑 *ЭЛИТ КЛАСС* (от 5 млн)",
+            'all': "🏠 *ВСЕ ДОМА*"
+        }
+        
+        self.rebuild_catalog()
+
+    def rebuild_catalog(self):
+        """Пересобрать каталог после изменения списка домов"""
+        self.catalog = Catalog(
+            self.default_houses + self.custom_houses,
+            item_text=lambda house: (
+                f"{house['image']} *{house['name']}*\n"
+                f"   💰 {house['price']:,}{CURR}\n"
+                f"   🚪 {house['rooms']} комн | 📏 {house['area']}м² | ✨ {house['comfort']}%\n\n"
+            ),
+            item_button=lambda house: f"{house['image']} {house['name']} - {house['price']:,}{CURR}",
+            view_prefix='house_view_',
+            page_prefix='houses_page_',
+            footer=[InlineKeyboardButton("◀️ Назад", callback_data="houses_menu")],
+            price_tiers={
+                'econom': (None, 1000000),
+                'business': (1000000, 5000000),
+                'elite': (5000000, None)
+            }
+        )
+
+    def set_custom_items(self, items: list):
+        """Заменить дома от администрации и пересобрать каталог"""
+        self.custom_houses = [
+            {
+                'id': CUSTOM_ITEM_ID_OFFSET + item['id'],
+                'catalog_id': item['id'],
+                'name': item['name'],
+                'description': item['description'],
+                'price': item['price'],
+                'rooms': item['attributes']['rooms'],
+                'area': item['attributes']['area'],
+                'comfort': item['attributes']['comfort'],
+                'image': '🏠'
+            }
+            for item in items
+        ]
+        self.rebuild_catalog()
 
     async def show_houses_menu(self, message: types.Message):
         """Главное меню домов"""
@@ -200,48 +253,22 @@ class HouseShop:
             reply_markup=keyboard
         )
 
-    async def show_houses_by_category(self, callback_query: types.CallbackQuery, category: str):
+    async def show_houses_by_category(self, callback_query: types.CallbackQuery, category: str, page: int = 1):
         """Показать дома по категории"""
-        if category == 'econom':
-            houses = [h for h in self.houses if h['price'] <= 1000000]
-            title = "💰 *ЭКОНОМ КЛАСС* (до 1 млн)"
-        elif category == 'business':
-            houses = [h for h in self.houses if 1000000 < h['price'] <= 5000000]
-            title = "💼 *БИЗНЕС КЛАСС* (1-5 млн)"
-        elif category == 'elite':
-            houses = [h for h in self.houses if h['price'] > 5000000]
-            title = "👑 *ЭЛИТ КЛАСС* (от 5 млн)"
-        else:
-            houses = self.houses
-            title = "🏠 *ВСЕ ДОМА*"
+        catalog_page = self.catalog.page(category, page)
         
-        if not houses:
+        if not catalog_page:
             await callback_query.answer("В этой категории пока нет домов!", show_alert=True)
             return
         
-        text = f"{title}\n\n"
-        
-        for house in houses:
-            text += f"{house['image']} *{house['name']}*\n"
-            text += f"   💰 {house['price']:,}{CURR}\n"
-            text += f"   🚪 {house['rooms']} комн | 📏 {house['area']}м² | ✨ {house['comfort']}%\n\n"
-        
-        # Создаем кнопки для каждого дома
-        keyboard = InlineKeyboardMarkup(row_width=1)
-        for house in houses:
-            keyboard.add(InlineKeyboardButton(
-                f"{house['image']} {house['name']} - {house['price']:,}{CURR}",
-                callback_data=f"house_view_{house['id']}"
-            ))
+        text = f"{self.category_titles.get(category, self.category_titles['all'])}\n\n{catalog_page.text}"
         
-        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="houses_menu"))
-        
-        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
+        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=catalog_page.keyboard)
 
     async def view_house(self, callback_query: types.CallbackQuery, state: FSMContext):
         """Просмотр конкретного дома"""
         house_id = int(callback_query.data.replace('house_view_', ''))
-        house = next((h for h in self.houses if h['id'] == house_id), None)
+        house = self.catalog.get(house_id)
         
         if not house:
             await callback_query.answer("❌ Дом не найден!", show_alert=True)
@@ -254,11 +281,21 @@ class HouseShop:
         text += f"💰 *Цена:* {house['price']:,}{CURR}\n"
         text += f"🚪 *Комнат:* {house['rooms']}\n"
         text += f"📏 *Площадь:* {house['area']} м²\n"
-        text += f"✨ *Комфорт:* {house['comfort']}%\n\n"
-        text += f"💳 *Ваш баланс:* {user['balance']:,}{CURR}\n"
+        text += f"✨ *Комфорт:* {house['comfort']}%\n"
         
-        can_afford = user['balance'] >= house['price']
-        status = "✅ *Доступно для покупки*" if can_afford else "❌ *Недостаточно средств*"
+        in_stock = True
+        if 'catalog_id' in house:
+            stock_item = await self.db.get_catalog_item(house['catalog_id'])
+            in_stock = bool(stock_item and stock_item['stock'] > 0)
+            text += f"📦 *В наличии:* {stock_item['stock'] if stock_item else 0} шт\n"
+        
+        text += f"\n💳 *Ваш баланс:* {user['balance']:,}{CURR}\n"
+        
+        can_afford = user['balance'] >= house['price'] and in_stock
+        if can_afford:
+            status = "✅ *Доступно для покупки*"
+        else:
+            status = "❌ *Недостаточно средств*" if in_stock else "❌ *Нет в наличии*"
         text += status
         
         keyboard = InlineKeyboardMarkup(row_width=2)
@@ -266,13 +303,17 @@ class HouseShop:
             keyboard.add(InlineKeyboardButton("✅ Купить", callback_data=f"house_buy_{house['id']}"))
         keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="houses_all"))
         
-        await state.update_data(house=house)
+        await state.update_data(house=dict(house))
         await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
     async def confirm_buy_house(self, callback_query: types.CallbackQuery, state: FSMContext):
         """Подтверждение покупки дома"""
         house_id = int(callback_query.data.replace('house_buy_', ''))
-        house = next((h for h in self.houses if h['id'] == house_id), None)
+        house = self.catalog.get(house_id)
+        
+        if not house:
+            await callback_query.answer("❌ Дом не найден!", show_alert=True)
+            return
         
         await self.confirmations.ask_confirmation(
             callback_query.message,
@@ -283,7 +324,7 @@ class HouseShop:
                         f"💰 Цена: {house['price']:,}{CURR}\n\n"
                         f"Подтверждаете покупку?",
                 'user_id': callback_query.from_user.id,
-                'house': house
+                'house': dict(house)
             },
             'BUY_HOUSE_CONFIRM',
             'CANCEL'
@@ -295,31 +336,35 @@ class HouseShop:
         confirmed = data.get('confirmed_data', {})
         house = confirmed['house']
         
-        async with self.db.pool.acquire() as conn:
-            async with conn.transaction():
-                # Проверяем баланс
-                user = await conn.fetchrow('SELECT * FROM users WHERE user_id = $1', confirmed['user_id'])
-                if user['balance'] < house['price']:
-                    await callback_query.message.edit_text("❌ Недостаточно средств!")
-                    await state.finish()
-                    return
-                
-                # Списываем деньги
-                await conn.execute('UPDATE users SET balance = balance - $1 WHERE user_id = $2', 
-                                  house['price'], confirmed['user_id'])
-                
-                # Добавляем дом в инвентарь
-                await conn.execute('''
-                    INSERT INTO houses (user_id, house_id, house_name, price, rooms, area, comfort)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7)
-                ''', confirmed['user_id'], house['id'], house['name'], house['price'], 
-                    house['rooms'], house['area'], house['comfort'])
+        # Дом от администрации - покупка со склада
+        if 'catalog_id' in house:
+            result = await self.db.buy_catalog_item(confirmed['user_id'], house['catalog_id'])
+            await callback_query.message.edit_text(result['message'])
+            await state.finish()
+            return
+        
+        result = await self.db.purchase(confirmed['user_id'], house['price'], 'houses', {
+            'user_id': confirmed['user_id'],
+            'house_id': house['id'],
+            'house_name': house['name'],
+            'description': house['description'],
+            'price': house['price'],
+            'rooms': house['rooms'],
+            'area': house['area'],
+            'comfort': house['comfort']
+        })
+        
+        if not result['success']:
+            await callback_query.message.edit_text(result['message'])
+            await state.finish()
+            return
         
         await callback_query.message.edit_text(
-            f"✅ *Поздравляем с покупкой\\!*\n\n"
+            f"✅ *Поздравляем с покупкой!*\n\n"
             f"Вы стали владельцем {house['image']} *{house['name']}*\n"
-            f"💰 Потрачено: {house['price']:,}{CURR}",
-            parse_mode="MarkdownV2"
+            f"💰 Потрачено: {house['price']:,}{CURR}\n"
+            f"💳 Баланс: {result['balance']:,}{CURR}",
+            parse_mode="Markdown"
         )
         await state.finish()
 
@@ -353,14 +398,11 @@ class HouseShop:
         
         await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
-    async def sell_house_menu(self, callback_query: types.CallbackQuery):
-        """Меню продажи дома"""
-        user_id = callback_query.from_user.id
-        
-        async with self.db.pool.acquire() as conn:
-            houses = await conn.fetch('SELECT * FROM houses WHERE user_id = $1 ORDER BY price DESC', user_id)
+    async def sell_house_menu(self, callback_query: types.CallbackQuery, cursor: str = ''):
+        """Меню продажи дома (постранично)"""
+        page = await self.paginator.fetch(callback_query.from_user.id, 'house', cursor)
         
-        if not houses:
+        if not page:
             await callback_query.answer("❌ У вас нет домов для продажи!", show_alert=True)
             return
         
@@ -370,13 +412,15 @@ class HouseShop:
         
         keyboard = InlineKeyboardMarkup(row_width=1)
         
-        for house in houses:
+        for house in page.items:
             buy_price = int(house['price'] * GOVERNMENT_BUY_PERCENT / 100)
             keyboard.add(InlineKeyboardButton(
                 f"{house['house_name']} - {buy_price:,}{CURR}",
                 callback_data=f"sell_house_{house['id']}"
             ))
         
+        page.add_nav(keyboard, "houses_sell_page_")
+        keyboard.add(InlineKeyboardButton("💰 Продать все дома", callback_data="gov_sell_all_house"))
         keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="my_houses"))
         
         await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
@@ -415,22 +459,15 @@ class HouseShop:
         data = await state.get_data()
         confirmed = data.get('confirmed_data', {})
         
-        async with self.db.pool.acquire() as conn:
-            async with conn.transaction():
-                # Удаляем дом
-                await conn.execute('DELETE FROM houses WHERE id = $1', confirmed['house_id'])
-                
-                # Начисляем деньги пользователю
-                await conn.execute('UPDATE users SET balance = balance + $1 WHERE user_id = $2',
-                                  confirmed['buy_price'], confirmed['user_id'])
-                
-                # Комиссия админу
-                commission = confirmed['house_price'] - confirmed['buy_price']
-                await conn.execute('UPDATE users SET balance = balance + $1 WHERE user_id = $2',
-                                  commission, MAIN_ADMIN_ID)
+        result = await self.db.sell_items_to_government(callback_query.from_user.id, 'house', [confirmed['house_id']])
+        
+        if not result['success']:
+            await callback_query.message.edit_text("❌ Дом не найден!")
+            await state.finish()
+            return
         
         await callback_query.message.edit_text(
-            f"✅ Вы продали {confirmed['house_name']} государству за {confirmed['buy_price']:,}{CURR}\n"
-            f"Комиссия: {commission:,}{CURR} (идет @{MAIN_ADMIN_USERNAME})"
+            f"✅ Вы продали {confirmed['house_name']} государству за {result['payout']:,}{CURR}\n"
+            f"Комиссия: {result['fee']:,}{CURR} (идет @{MAIN_ADMIN_USERNAME})"
         )
         await state.finish()
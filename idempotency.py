@@ -0,0 +1,66 @@
+from aiogram import types
+from aiogram.dispatcher.handler import CancelHandler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from collections import OrderedDict
+from config import *
+import time
+
+class TTLSet:
+    """Ограниченное множество ключей с временем жизни"""
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.items = OrderedDict()  # key -> время добавления (по возрастанию)
+
+    def _evict(self, now: float):
+        while self.items:
+            added_at = next(iter(self.items.values()))
+            if now - added_at < self.ttl and len(self.items) < self.max_size:
+                break
+            self.items.popitem(last=False)
+
+    def add(self, key) -> bool:
+        """Добавить ключ. False - если он уже есть и ещё не истёк"""
+        now = time.monotonic()
+        self._evict(now)
+        
+        if key in self.items:
+            return False
+        
+        self.items[key] = now
+        return True
+
+    def __len__(self):
+        return len(self.items)
+
+class CallbackIdempotencyMiddleware(BaseMiddleware):
+    """Отбрасывает повторные нажатия на кнопки, которые меняют баланс или предметы"""
+
+    # Колбэки, повторная обработка которых приводит к повторным списаниям
+    GUARDED_PREFIXES = ('confirm_', 'cancel_', 'duel_accept_', 'duel_reject_', 'duel_roll_')
+    GUARDED_SUFFIXES = ('_CONFIRM',)
+
+    def __init__(self):
+        super().__init__()
+        self.seen = TTLSet(IDEMPOTENCY_TTL, IDEMPOTENCY_MAX_KEYS)
+        self.dropped = 0
+
+    def is_guarded(self, data: str) -> bool:
+        return bool(data) and (data.startswith(self.GUARDED_PREFIXES) or data.endswith(self.GUARDED_SUFFIXES))
+
+    async def on_pre_process_callback_query(self, callback_query: types.CallbackQuery, data: dict):
+        if not self.is_guarded(callback_query.data):
+            return
+        
+        # Повторная доставка того же апдейта и повторное нажатие той же кнопки
+        message_id = callback_query.message.message_id if callback_query.message else None
+        query_key = ('query', callback_query.id)
+        action_key = ('action', callback_query.from_user.id, message_id, callback_query.data)
+        
+        is_new_query = self.seen.add(query_key)
+        is_new_action = self.seen.add(action_key)
+        
+        if not (is_new_query and is_new_action):
+            self.dropped += 1
+            await callback_query.answer("⏳ Уже обрабатывается...")
+            raise CancelHandler()
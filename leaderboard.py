@@ -0,0 +1,119 @@
+from database import Database
+from config import *
+from typing import Any, Awaitable, Callable, Dict, List
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Leaderboard:
+    """Топ по одной метрике: в памяти все подходящие игроки выше порога floor, все остальные гарантированно не выше него"""
+    def __init__(self, name: str, key: Callable[[Dict], Any], eligible: Callable[[Dict], bool],
+                 loader: Callable[[int], Awaitable[List[Dict]]], size: int = LEADERBOARD_SIZE, reserve: int = LEADERBOARD_RESERVE):
+        self.name = name
+        self.key = key
+        self.eligible = eligible
+        self.loader = loader
+        self.size = size
+        self.capacity = size + reserve
+        self.entries = {}  # user_id -> строка игрока
+        self.floor = None  # None - в памяти вообще все подходящие игроки
+        self.ranked = None  # отсортированный топ, сбрасывается при изменениях
+        self.rebuilding = False
+        self.pending = []  # изменения, пришедшие во время перестроения
+        self.rebuild_task = None
+
+    def top(self) -> List[Dict]:
+        if self.ranked is None:
+            self.ranked = sorted(self.entries.values(), key=self.key, reverse=True)[:self.size]
+        return self.ranked
+
+    def update(self, row: Dict):
+        """Применить свежее состояние игрока из уведомления"""
+        if self.rebuilding:
+            self.pending.append(row)
+            return
+        
+        user_id = row['user_id']
+        if not self.eligible(row) or (self.floor is not None and self.key(row) < self.floor):
+            # Опустился ниже порога: между ним и топом могут быть игроки, которых нет в памяти
+            if self.entries.pop(user_id, None) is not None:
+                self.ranked = None
+                if self.floor is not None and len(self.entries) < self.size:
+                    self.schedule_rebuild()
+            return
+        
+        self.entries[user_id] = row
+        self.ranked = None
+        
+        if len(self.entries) > self.capacity:
+            lowest = min(self.entries.values(), key=self.key)
+            del self.entries[lowest['user_id']]
+            self.floor = self.key(lowest) if self.floor is None else max(self.floor, self.key(lowest))
+
+    async def rebuild(self):
+        """Перечитать топ из БД по индексу. Изменения за время запроса применяются поверх"""
+        self.rebuilding = True
+        try:
+            rows = await self.loader(self.capacity)
+            self.entries = {row['user_id']: row for row in rows}
+            self.floor = self.key(rows[-1]) if len(rows) >= self.capacity else None
+            self.ranked = None
+        except Exception as e:
+            logger.error(f"❌ Ошибка перестроения топа {self.name}: {e}")
+        finally:
+            self.rebuilding = False
+        
+        pending, self.pending = self.pending, []
+        for row in pending:
+            self.update(row)
+
+    def schedule_rebuild(self):
+        if self.rebuild_task is None or self.rebuild_task.done():
+            self.rebuild_task = asyncio.create_task(self.rebuild())
+
+class LeaderboardService:
+    """Топы игроков в памяти: экраны топов не ходят в БД, изменения балансов и статистики приходят через LISTEN/NOTIFY"""
+    def __init__(self, db: Database):
+        self.db = db
+        self.boards = {
+            'balance': Leaderboard(
+                'balance',
+                key=lambda row: row['balance'],
+                eligible=lambda row: not row['is_banned'],
+                loader=db.get_top_by_balance
+            ),
+            'casino': Leaderboard(
+                'casino',
+                key=lambda row: (row['total_wins'], row['total_games']),
+                eligible=lambda row: not row['is_banned'] and row['total_games'] > 0,
+                loader=db.get_top_by_casino_wins
+            )
+        }
+        self.conn = None
+
+    def top(self, board: str) -> List[Dict]:
+        return self.boards[board].top()
+
+    async def load(self):
+        """Построить все топы из БД. Вызывать после start(), чтобы не потерять изменения во время загрузки"""
+        await asyncio.gather(*(board.rebuild() for board in self.boards.values()))
+        logger.info(f"🏆 Топы загружены: {', '.join(f'{name} ({len(board.entries)})' for name, board in self.boards.items())}")
+
+    def on_notify(self, conn, pid, channel, payload):
+        row = json.loads(payload)
+        for board in self.boards.values():
+            board.update(row)
+
+    async def start(self):
+        """Отдельное соединение пула слушает канал изменений"""
+        if self.conn is None:
+            self.conn = await self.db.pool.acquire()
+            await self.conn.add_listener(LEADERBOARD_NOTIFY_CHANNEL, self.on_notify)
+
+    async def stop(self):
+        if self.conn:
+            await self.conn.remove_listener(LEADERBOARD_NOTIFY_CHANNEL, self.on_notify)
+            await self.db.pool.release(self.conn)
+            self.conn = None
@@ -0,0 +1,142 @@
+from database import Database
+from config import *
+from collections import deque
+from typing import Dict, List, Optional
+import asyncio
+import datetime
+import logging
+import math
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+class CryptoMarketEngine:
+    """Движок рынка: двигает цены всех монет раз в тик и держит снимок цен в памяти"""
+    def __init__(self, db: Database):
+        self.db = db
+        # Параллельные массивы по монетам - весь тик считается одним проходом
+        self.ids = []
+        self.prices = []
+        self.volatility = []
+        self.drift = []
+        self.coins = {}  # crypto_id -> dict монеты (снимок для экранов биржи)
+        self.candles = {}  # crypto_id -> последние часовые свечи (кэш для графиков)
+        self.last_prune = 0
+        self.listeners = []  # async callback(old_prices, new_prices) на каждый тик
+        self.tick_task = None
+
+    async def load(self):
+        """Загрузить монеты и текущие цены из БД"""
+        cryptos = await self.db.get_crypto_list()
+        cryptos.sort(key=lambda c: c['id'])
+        
+        self.ids = [c['id'] for c in cryptos]
+        self.prices = [c['price'] for c in cryptos]
+        self.volatility = [c['volatility'] for c in cryptos]
+        self.drift = [c['drift'] for c in cryptos]
+        self.coins = {
+            c['id']: {'id': c['id'], 'name': c['name'], 'symbol': c['symbol'], 'price': c['price']}
+            for c in cryptos
+        }
+        
+        since = datetime.datetime.now() - datetime.timedelta(hours=CRYPTO_CANDLES_CACHE_HOURS)
+        self.candles = {crypto_id: deque(maxlen=CRYPTO_CANDLES_CACHE_HOURS) for crypto_id in self.ids}
+        for candle in await self.db.get_crypto_candles('1h', since):
+            if candle['crypto_id'] in self.candles:
+                self.candles[candle['crypto_id']].append(candle)
+        
+        logger.info(f"✅ Рынок загружен: {len(self.ids)} монет")
+
+    def add_listener(self, callback):
+        """Подписаться на тики рынка (ордера, алерты)"""
+        self.listeners.append(callback)
+
+    def get_snapshot(self) -> List[Dict]:
+        """Текущие цены всех монет без запроса к БД"""
+        return [self.coins[crypto_id] for crypto_id in self.ids]
+
+    def get_coin(self, crypto_id: int) -> Optional[Dict]:
+        return self.coins.get(crypto_id)
+
+    def get_candles(self, crypto_id: int) -> List[Dict]:
+        """Часовые свечи монеты за последние CRYPTO_CANDLES_CACHE_HOURS часов"""
+        return list(self.candles.get(crypto_id, ()))
+
+    def update_candles(self, tick_time: datetime.datetime, prices: List[float]):
+        """Обновить кэш часовых свечей так же, как это делает БД"""
+        bucket = tick_time.replace(minute=0, second=0, microsecond=0)
+        for crypto_id, price in zip(self.ids, prices):
+            candles = self.candles[crypto_id]
+            if candles and candles[-1]['bucket'] == bucket:
+                candle = candles[-1]
+                candle['high'] = max(candle['high'], price)
+                candle['low'] = min(candle['low'], price)
+                candle['close'] = price
+            else:
+                candles.append({'crypto_id': crypto_id, 'resolution': '1h', 'bucket': bucket,
+                                'open': price, 'high': price, 'low': price, 'close': price})
+
+    def next_prices(self) -> List[float]:
+        """Геометрическое броуновское движение сразу для всех монет"""
+        dt = CRYPTO_TICK_INTERVAL / 86400  # волатильность и дрейф заданы в долях за сутки
+        sqrt_dt = math.sqrt(dt)
+        return [
+            max(round(price * math.exp((mu - 0.5 * sigma * sigma) * dt + sigma * sqrt_dt * random.gauss(0, 1)), 8), CRYPTO_MIN_PRICE)
+            for price, mu, sigma in zip(self.prices, self.drift, self.volatility)
+        ]
+
+    async def tick(self):
+        """Один шаг рынка: новые цены, запись одним запросом, обновление снимка"""
+        if not self.ids:
+            return
+        
+        new_prices = self.next_prices()
+        tick_time = datetime.datetime.now()
+        await self.db.update_crypto_prices(self.ids, new_prices, tick_time)
+        
+        old_prices = dict(zip(self.ids, self.prices))
+        self.prices = new_prices
+        for crypto_id, price in zip(self.ids, new_prices):
+            self.coins[crypto_id] = {**self.coins[crypto_id], 'price': price}
+        self.update_candles(tick_time, new_prices)
+        
+        new_prices_by_id = dict(zip(self.ids, new_prices))
+        for listener in self.listeners:
+            try:
+                await listener(old_prices, new_prices_by_id)
+            except Exception as e:
+                logger.error(f"❌ Ошибка обработчика тика: {e}")
+
+    async def prune_history(self):
+        """Удалить устаревшие тики и минутные свечи (не чаще CRYPTO_PRUNE_INTERVAL)"""
+        if time.monotonic() - self.last_prune < CRYPTO_PRUNE_INTERVAL:
+            return
+        self.last_prune = time.monotonic()
+        
+        now = datetime.datetime.now()
+        removed = await self.db.prune_crypto_history(
+            now - datetime.timedelta(days=CRYPTO_TICKS_RETENTION_DAYS),
+            now - datetime.timedelta(days=CRYPTO_MINUTE_CANDLES_RETENTION_DAYS)
+        )
+        if removed:
+            logger.info(f"🧹 Удалено {removed} старых тиков")
+
+    async def run(self):
+        """Фоновый цикл тиков"""
+        while True:
+            await asyncio.sleep(CRYPTO_TICK_INTERVAL)
+            try:
+                await self.tick()
+                await self.prune_history()
+            except Exception as e:
+                logger.error(f"❌ Ошибка тика рынка: {e}")
+
+    def start(self):
+        if self.tick_task is None:
+            self.tick_task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.tick_task:
+            self.tick_task.cancel()
+            self.tick_task = None
@@ -0,0 +1,337 @@
+from aiogram import types
+from aiogram.dispatcher import FSMContext
+from aiogram.dispatcher.filters.state import State, StatesGroup
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from database import Database, ITEM_NAME_COLUMNS
+from confirmations import ConfirmationSystem
+from notifier import ThrottledSender
+from paginator import ItemPaginator
+from config import *
+
+class MarketStates(StatesGroup):
+    waiting_for_listing_price = State()
+    waiting_for_price_filter = State()
+
+class Marketplace:
+    def __init__(self, bot, db: Database, confirmations: ConfirmationSystem, sender: ThrottledSender):
+        self.bot = bot
+        self.db = db
+        self.confirmations = confirmations
+        self.sender = sender
+        self.paginator = ItemPaginator(db)
+        
+        self.filters = {}  # user_id -> (min_price, max_price)
+        self.item_titles = {
+            'all': '📦 Все лоты',
+            'car': '🚗 Машины',
+            'phone': '📱 Телефоны',
+            'house': '🏠 Дома',
+            'accessory': '👕 Аксессуары'
+        }
+        self.item_icons = {'car': '🚗', 'phone': '📱', 'house': '🏠', 'accessory': '👕'}
+
+    def get_filter(self, user_id: int) -> tuple:
+        return self.filters.get(user_id, (1, MARKET_MAX_PRICE))
+
+    def format_filter(self, user_id: int) -> str:
+        if user_id not in self.filters:
+            return "без фильтра"
+        min_price, max_price = self.filters[user_id]
+        return f"{min_price:,} - {max_price:,}{CURR}"
+
+    async def show_market_menu(self, callback_query: types.CallbackQuery):
+        """Главное меню рынка"""
+        keyboard = InlineKeyboardMarkup(row_width=2)
+        keyboard.add(*[
+            InlineKeyboardButton(title, callback_data=f"market_browse_{item_type}")
+            for item_type, title in self.item_titles.items()
+        ])
+        keyboard.add(
+            InlineKeyboardButton("🔎 Фильтр цены", callback_data="market_filter"),
+            InlineKeyboardButton("💰 Выставить предмет", callback_data="market_sell"),
+            InlineKeyboardButton("📋 Мои лоты", callback_data="market_my"),
+            InlineKeyboardButton("◀️ Назад", callback_data="menu")
+        )
+        
+        await callback_query.message.edit_text(
+            "🛒 *РЫНОК* 🛒\n\n"
+            f"Покупайте и продавайте предметы другим игрокам.\n"
+            f"Комиссия с продажи: {MARKET_FEE*100:.0f}%\n"
+            f"Фильтр цены: {self.format_filter(callback_query.from_user.id)}\n\n"
+            f"Выберите категорию:",
+            parse_mode="Markdown",
+            reply_markup=keyboard
+        )
+
+    # ========== ПРОСМОТР ЛОТОВ ==========
+
+    async def browse(self, callback_query: types.CallbackQuery):
+        """Страница лотов: market_browse_{type}, market_next_{type}_{price}_{id}, market_prev_{type}_{price}_{id}"""
+        parts = callback_query.data.split('_')
+        direction, item_type = parts[1], parts[2]
+        cursor = (int(parts[3]), int(parts[4])) if direction in ('next', 'prev') else None
+        
+        min_price, max_price = self.get_filter(callback_query.from_user.id)
+        listings = await self.db.get_market_listings(
+            None if item_type == 'all' else item_type,
+            min_price,
+            max_price,
+            MARKET_PAGE_SIZE + 1,
+            after=cursor if direction == 'next' else None,
+            before=cursor if direction == 'prev' else None
+        )
+        
+        # Лишний лот показывает, есть ли страница дальше по направлению движения
+        has_more = len(listings) > MARKET_PAGE_SIZE
+        if direction == 'prev':
+            listings = listings[-MARKET_PAGE_SIZE:]
+            has_prev, has_next = has_more, True
+        else:
+            listings = listings[:MARKET_PAGE_SIZE]
+            has_prev, has_next = cursor is not None, has_more
+        
+        if not listings:
+            if cursor:
+                await callback_query.answer("❌ Больше лотов нет!", show_alert=True)
+            else:
+                await callback_query.answer("❌ Лотов не найдено!", show_alert=True)
+            return
+        
+        keyboard = InlineKeyboardMarkup(row_width=2)
+        for listing in listings:
+            keyboard.add(InlineKeyboardButton(
+                f"{self.item_icons[listing['item_type']]} {listing['item_name']} - {listing['price']:,}{CURR}",
+                callback_data=f"market_view_{listing['id']}"
+            ))
+        
+        nav_buttons = []
+        if has_prev:
+            first = listings[0]
+            nav_buttons.append(InlineKeyboardButton("◀️", callback_data=f"market_prev_{item_type}_{first['price']}_{first['id']}"))
+        if has_next:
+            last = listings[-1]
+            nav_buttons.append(InlineKeyboardButton("▶️", callback_data=f"market_next_{item_type}_{last['price']}_{last['id']}"))
+        if nav_buttons:
+            keyboard.row(*nav_buttons)
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="market"))
+        
+        await callback_query.message.edit_text(
+            f"🛒 *{self.item_titles[item_type]}*\n\n"
+            f"Фильтр цены: {self.format_filter(callback_query.from_user.id)}\n"
+            f"Лоты отсортированы по цене:",
+            parse_mode="Markdown",
+            reply_markup=keyboard
+        )
+
+    async def filter_start(self, callback_query: types.CallbackQuery, state: FSMContext):
+        await MarketStates.waiting_for_price_filter.set()
+        await callback_query.message.edit_text(
+            "🔎 *Фильтр цены*\n\n"
+            "Введите минимальную и максимальную цену через пробел\n"
+            "Например: 100000 5000000\n\n"
+            "Отправьте 0, чтобы сбросить фильтр",
+            parse_mode="Markdown"
+        )
+
+    async def process_price_filter(self, message: types.Message, state: FSMContext):
+        if message.text.strip() == '0':
+            self.filters.pop(message.from_user.id, None)
+            await state.finish()
+            await message.reply("✅ Фильтр цены сброшен!")
+            return
+        
+        try:
+            min_price, max_price = map(int, message.text.split())
+        except ValueError:
+            await message.reply("❌ Введите две цены через пробел!")
+            return
+        
+        if min_price < 1 or max_price < min_price:
+            await message.reply("❌ Минимальная цена должна быть больше 0 и не больше максимальной!")
+            return
+        
+        self.filters[message.from_user.id] = (min_price, min(max_price, MARKET_MAX_PRICE))
+        await state.finish()
+        await message.reply(f"✅ Фильтр цены: {self.format_filter(message.from_user.id)}")
+
+    # ========== ПОКУПКА ==========
+
+    async def view_listing(self, callback_query: types.CallbackQuery):
+        listing_id = int(callback_query.data.replace('market_view_', ''))
+        listing = await self.db.get_market_listing(listing_id)
+        
+        if not listing:
+            await callback_query.answer("❌ Лот уже продан или снят!", show_alert=True)
+            return
+        
+        keyboard = InlineKeyboardMarkup(row_width=1)
+        if listing['seller_id'] == callback_query.from_user.id:
+            keyboard.add(InlineKeyboardButton("❌ Снять с продажи", callback_data=f"market_cancel_{listing_id}"))
+        else:
+            keyboard.add(InlineKeyboardButton("💰 Купить", callback_data=f"market_buy_{listing_id}"))
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data=f"market_browse_{listing['item_type']}"))
+        
+        await callback_query.message.edit_text(
+            f"{self.item_icons[listing['item_type']]} *{listing['item_name']}*\n\n"
+            f"💰 Цена: {listing['price']:,}{CURR}\n"
+            f"📅 Выставлен: {listing['created_at'].strftime('%d.%m.%Y %H:%M')}",
+            parse_mode="Markdown",
+            reply_markup=keyboard
+        )
+
+    async def confirm_buy(self, callback_query: types.CallbackQuery, state: FSMContext):
+        listing_id = int(callback_query.data.replace('market_buy_', ''))
+        listing = await self.db.get_market_listing(listing_id)
+        
+        if not listing:
+            await callback_query.answer("❌ Лот уже продан или снят!", show_alert=True)
+            return
+        
+        await self.confirmations.ask_confirmation(
+            callback_query.message,
+            'market_buy',
+            {
+                'text': f"Покупка на рынке: *{listing['item_name']}*\n"
+                        f"💰 Цена: {listing['price']:,}{CURR}\n\n"
+                        f"Подтверждаете покупку?",
+                'listing_id': listing_id
+            },
+            'MARKET_BUY_CONFIRM',
+            'CANCEL'
+        )
+
+    async def execute_buy(self, callback_query: types.CallbackQuery, state: FSMContext):
+        data = await state.get_data()
+        confirmed = data.get('confirmed_data', {})
+        
+        result = await self.db.buy_market_listing(confirmed['listing_id'], callback_query.from_user.id)
+        if not result['success']:
+            await callback_query.message.edit_text(result['message'])
+            await state.finish()
+            return
+        
+        listing = result['listing']
+        await callback_query.message.edit_text(
+            f"✅ *{listing['item_name']}* куплен за {listing['price']:,}{CURR}!\n"
+            f"💳 Баланс: {result['balance']:,}{CURR}",
+            parse_mode="Markdown"
+        )
+        
+        self.sender.send(
+            listing['seller_id'],
+            f"🛒 Ваш лот *{listing['item_name']}* продан!\n"
+            f"💰 Получено: {listing['price'] - result['fee']:,}{CURR} (комиссия {result['fee']:,}{CURR})",
+            parse_mode="Markdown"
+        )
+        await state.finish()
+
+    # ========== ПРОДАЖА ==========
+
+    async def sell_start(self, callback_query: types.CallbackQuery):
+        keyboard = InlineKeyboardMarkup(row_width=2)
+        keyboard.add(*[
+            InlineKeyboardButton(title, callback_data=f"market_sell_type_{item_type}")
+            for item_type, title in self.item_titles.items() if item_type != 'all'
+        ])
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="market"))
+        
+        await callback_query.message.edit_text(
+            "💰 *Выставить предмет*\n\n"
+            "Пока лот на рынке, предмет недоступен для обмена и продажи государству.\n"
+            "Выберите категорию:",
+            parse_mode="Markdown",
+            reply_markup=keyboard
+        )
+
+    async def show_sell_items(self, callback_query: types.CallbackQuery):
+        """market_sell_type_{type}[_{n|p}_{price}_{id}]: предметы категории постранично"""
+        item_type, _, cursor = callback_query.data.replace('market_sell_type_', '').partition('_')
+        if item_type not in ITEM_NAME_COLUMNS:
+            await callback_query.answer("❌ Неизвестная категория!", show_alert=True)
+            return
+        
+        page = await self.paginator.fetch(callback_query.from_user.id, item_type, cursor)
+        
+        if not page:
+            await callback_query.answer("❌ В этой категории у вас ничего нет!", show_alert=True)
+            return
+        
+        keyboard = InlineKeyboardMarkup(row_width=1)
+        for item in page.items:
+            keyboard.add(InlineKeyboardButton(
+                f"{self.item_icons[item_type]} {item[ITEM_NAME_COLUMNS[item_type]]} ({item['price']:,}{CURR})",
+                callback_data=f"market_list_{item_type}_{item['id']}"
+            ))
+        page.add_nav(keyboard, f"market_sell_type_{item_type}_")
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="market_sell"))
+        
+        await callback_query.message.edit_text(
+            f"{self.item_titles[item_type]}\n\nВыберите предмет для продажи:",
+            reply_markup=keyboard
+        )
+
+    async def list_item_start(self, callback_query: types.CallbackQuery, state: FSMContext):
+        _, _, item_type, item_id = callback_query.data.split('_')
+        
+        await state.update_data(market_item_type=item_type, market_item_id=int(item_id))
+        await MarketStates.waiting_for_listing_price.set()
+        await callback_query.message.edit_text(f"💰 Введите цену лота (до {MARKET_MAX_PRICE:,}{CURR}):")
+
+    async def process_listing_price(self, message: types.Message, state: FSMContext):
+        try:
+            price = int(message.text)
+        except ValueError:
+            await message.reply("❌ Введите корректную цену!")
+            return
+        
+        if not 1 <= price <= MARKET_MAX_PRICE:
+            await message.reply(f"❌ Цена должна быть от 1 до {MARKET_MAX_PRICE:,}{CURR}!")
+            return
+        
+        data = await state.get_data()
+        listing = await self.db.create_market_listing(
+            message.from_user.id, data['market_item_type'], data['market_item_id'], price
+        )
+        await state.finish()
+        
+        if not listing:
+            await message.reply("❌ Предмет не найден!")
+            return
+        
+        await message.reply(
+            f"✅ *{listing['item_name']}* выставлен на рынок за {price:,}{CURR}!\n"
+            f"После продажи вы получите {price - int(price * MARKET_FEE):,}{CURR}",
+            parse_mode="Markdown"
+        )
+
+    async def show_my_listings(self, callback_query: types.CallbackQuery):
+        listings = await self.db.get_user_market_listings(callback_query.from_user.id, MARKET_PAGE_SIZE * 5)
+        
+        if not listings:
+            await callback_query.answer("❌ У вас нет лотов на рынке!", show_alert=True)
+            return
+        
+        keyboard = InlineKeyboardMarkup(row_width=1)
+        for listing in listings:
+            keyboard.add(InlineKeyboardButton(
+                f"❌ {self.item_icons[listing['item_type']]} {listing['item_name']} - {listing['price']:,}{CURR}",
+                callback_data=f"market_cancel_{listing['id']}"
+            ))
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="market"))
+        
+        await callback_query.message.edit_text(
+            "📋 *Мои лоты*\n\nНажмите на лот, чтобы снять его с продажи:",
+            parse_mode="Markdown",
+            reply_markup=keyboard
+        )
+
+    async def cancel_listing(self, callback_query: types.CallbackQuery):
+        listing_id = int(callback_query.data.replace('market_cancel_', ''))
+        listing = await self.db.cancel_market_listing(listing_id, callback_query.from_user.id)
+        
+        if not listing:
+            await callback_query.answer("❌ Лот уже продан или снят!", show_alert=True)
+            return
+        
+        await callback_query.answer(f"✅ {listing['item_name']} снят с продажи и возвращён вам")
+        await self.show_market_menu(callback_query)
@@ -0,0 +1,56 @@
+from aiogram.utils.exceptions import RetryAfter
+from config import *
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ThrottledSender:
+    """Очередь исходящих уведомлений с ограничением скорости отправки"""
+    def __init__(self, bot):
+        self.bot = bot
+        self.queue = asyncio.Queue(maxsize=NOTIFY_QUEUE_SIZE)
+        self.send_task = None
+        self.stats = {
+            'sent': 0,
+            'failed': 0,
+            'dropped': 0
+        }
+
+    def send(self, chat_id: int, text: str, **kwargs) -> bool:
+        """Поставить сообщение в очередь. False - если очередь переполнена"""
+        try:
+            self.queue.put_nowait((chat_id, text, kwargs))
+            return True
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            return False
+
+    async def run(self):
+        """Отправка сообщений не быстрее NOTIFY_RATE в секунду"""
+        interval = 1 / NOTIFY_RATE
+        
+        while True:
+            chat_id, text, kwargs = await self.queue.get()
+            try:
+                await self.bot.send_message(chat_id, text, **kwargs)
+                self.stats['sent'] += 1
+            except RetryAfter as e:
+                # Telegram попросил подождать - ждём и возвращаем сообщение в очередь
+                logger.warning(f"⏳ Флуд-лимит, пауза {e.timeout} сек")
+                await asyncio.sleep(e.timeout)
+                self.send(chat_id, text, **kwargs)
+            except Exception:
+                # Пользователь заблокировал бота или удалил аккаунт
+                self.stats['failed'] += 1
+            
+            await asyncio.sleep(interval)
+
+    def start(self):
+        if self.send_task is None:
+            self.send_task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.send_task:
+            self.send_task.cancel()
+            self.send_task = None
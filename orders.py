@@ -0,0 +1,134 @@
+from database import Database
+from notifier import ThrottledSender
+from config import *
+from typing import Dict, List, Tuple
+import heapq
+import logging
+
+logger = logging.getLogger(__name__)
+
+class OrderBook:
+    """Лимитные ордера биржи: кучи по цене и времени для каждой монеты"""
+    def __init__(self, bot, db: Database, sender: ThrottledSender):
+        self.bot = bot
+        self.db = db
+        self.sender = sender
+        self.open_orders = {}  # order_id -> ордер
+        # Покупки: max-куча по цене (-limit_price, order_id), срабатывают при цене <= лимита
+        self.buy_heaps = {}
+        # Продажи: min-куча по цене (limit_price, order_id), срабатывают при цене >= лимита
+        self.sell_heaps = {}
+        # Записи отменённых ордеров остаются в кучах до выталкивания
+        self.stale = 0
+
+    def _add(self, order: Dict):
+        self.open_orders[order['id']] = order
+        if order['side'] == 'buy':
+            heapq.heappush(self.buy_heaps.setdefault(order['crypto_id'], []), (-order['limit_price'], order['id']))
+        else:
+            heapq.heappush(self.sell_heaps.setdefault(order['crypto_id'], []), (order['limit_price'], order['id']))
+
+    def _compact(self):
+        """Пересобрать кучи, если в них накопилось много отменённых записей"""
+        if self.stale <= len(self.open_orders) + 1000:
+            return
+        
+        for heaps in (self.buy_heaps, self.sell_heaps):
+            for crypto_id, heap in heaps.items():
+                heaps[crypto_id] = [entry for entry in heap if entry[1] in self.open_orders]
+                heapq.heapify(heaps[crypto_id])
+        self.stale = 0
+
+    async def load(self):
+        """Загрузить открытые ордера из БД"""
+        for order in await self.db.get_open_crypto_orders():
+            self._add(order)
+        
+        logger.info(f"✅ Загружено {len(self.open_orders)} лимитных ордеров")
+
+    async def place_order(self, user_id: int, crypto_id: int, side: str, limit_price: float, amount: float) -> Dict:
+        """Выставить ордер: amount - сумма в валюте для покупки или единицы монеты для продажи"""
+        order = await self.db.create_crypto_order(user_id, crypto_id, side, limit_price, amount)
+        
+        if not order:
+            if side == 'buy':
+                return {'success': False, 'message': '❌ Недостаточно средств!'}
+            return {'success': False, 'message': '❌ Недостаточно монет!'}
+        
+        self._add(order)
+        
+        side_text = "покупку" if side == 'buy' else "продажу"
+        return {
+            'success': True,
+            'message': f"✅ Ордер #{order['id']} на {side_text} выставлен\nЦена срабатывания: {limit_price:.2f}{CURR}"
+        }
+
+    async def cancel_order(self, order_id: int, user_id: int) -> Dict:
+        """Отменить ордер и вернуть замороженные средства"""
+        order = await self.db.cancel_crypto_order(order_id, user_id)
+        
+        if not order:
+            return {'success': False, 'message': '❌ Ордер не найден или уже исполнен'}
+        
+        if self.open_orders.pop(order_id, None):
+            self.stale += 1
+            self._compact()
+        
+        return {'success': True, 'message': f'✅ Ордер #{order_id} отменён, средства возвращены'}
+
+    def match(self, prices: Dict[int, float]) -> List[Tuple[int, float]]:
+        """Вытолкнуть сработавшие ордера: O(log n) на каждое исполнение"""
+        fills = []
+        
+        for crypto_id, price in prices.items():
+            buys = self.buy_heaps.get(crypto_id)
+            while buys and -buys[0][0] >= price:
+                _, order_id = heapq.heappop(buys)
+                if order_id in self.open_orders:
+                    fills.append((order_id, price))
+                else:
+                    self.stale -= 1
+            
+            sells = self.sell_heaps.get(crypto_id)
+            while sells and sells[0][0] <= price:
+                _, order_id = heapq.heappop(sells)
+                if order_id in self.open_orders:
+                    fills.append((order_id, price))
+                else:
+                    self.stale -= 1
+        
+        return fills
+
+    async def on_tick(self, old_prices: Dict[int, float], new_prices: Dict[int, float]):
+        """Исполнить ордера, которые сработали на новом тике"""
+        fills = self.match(new_prices)
+        
+        for i in range(0, len(fills), CRYPTO_ORDERS_FILL_BATCH):
+            batch = fills[i:i + CRYPTO_ORDERS_FILL_BATCH]
+            try:
+                filled = await self.db.fill_crypto_orders([f[0] for f in batch], [f[1] for f in batch])
+            except Exception as e:
+                # Вернём ордера в кучи - попробуем на следующем тике
+                logger.error(f"❌ Ошибка исполнения ордеров: {e}")
+                for order_id, _ in batch:
+                    if order_id in self.open_orders:
+                        self._add(self.open_orders[order_id])
+                continue
+            
+            for order_id, _ in batch:
+                self.open_orders.pop(order_id, None)
+            
+            self.notify(filled)
+
+    def notify(self, filled: List[Dict]):
+        """Сообщить владельцам об исполнении ордеров"""
+        for order in filled:
+            if order['side'] == 'buy':
+                text = (f"✅ Лимитный ордер #{order['id']} исполнен!\n"
+                        f"Куплено {order['crypto_amount'] / CRYPTO_UNITS:.8f} по {order['fill_price']:.2f}{CURR}")
+            else:
+                text = (f"✅ Лимитный ордер #{order['id']} исполнен!\n"
+                        f"Продано {order['crypto_amount'] / CRYPTO_UNITS:.8f} по {order['fill_price']:.2f}{CURR}\n"
+                        f"Зачислено: {order['amount_usd']}{CURR}")
+            
+            self.sender.send(order['user_id'], text)
@@ -0,0 +1,57 @@
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from database import Database
+from config import *
+from typing import Dict, List, Optional
+
+class ItemPage:
+    """Страница предметов игрока и наличие соседних страниц"""
+    __slots__ = ('items', 'has_prev', 'has_next')
+
+    def __init__(self, items: List[Dict], has_prev: bool, has_next: bool):
+        self.items = items
+        self.has_prev = has_prev
+        self.has_next = has_next
+
+    def add_nav(self, keyboard: InlineKeyboardMarkup, prefix: str):
+        """Ряд ◀️/▶️ с курсором крайнего предмета: {prefix}p_{price}_{id} и {prefix}n_{price}_{id}"""
+        buttons = []
+        if self.has_prev:
+            first = self.items[0]
+            buttons.append(InlineKeyboardButton("◀️", callback_data=f"{prefix}p_{first['price']}_{first['id']}"))
+        if self.has_next:
+            last = self.items[-1]
+            buttons.append(InlineKeyboardButton("▶️", callback_data=f"{prefix}n_{last['price']}_{last['id']}"))
+        if buttons:
+            keyboard.row(*buttons)
+
+class ItemPaginator:
+    """Keyset-пагинация предметов игрока по (user_id, price DESC, id): страница не зависит от размера инвентаря"""
+    def __init__(self, db: Database, page_size: int = ITEMS_PAGE_SIZE):
+        self.db = db
+        self.page_size = page_size
+
+    async def fetch(self, user_id: int, item_type: str, cursor: str = '') -> Optional[ItemPage]:
+        """Страница по курсору из callback ('' - первая страница). None - если страница пуста"""
+        direction, price, item_id = cursor.split('_') if cursor else ('', 0, 0)
+        position = (int(price), int(item_id))
+        
+        # Лишний предмет показывает, есть ли страница дальше по направлению движения
+        items = await self.db.get_user_items_page(
+            item_type,
+            user_id,
+            self.page_size + 1,
+            after=position if direction == 'n' else None,
+            before=position if direction == 'p' else None
+        )
+        has_more = len(items) > self.page_size
+        
+        if direction == 'p':
+            items = items[-self.page_size:]
+            has_prev, has_next = has_more, True
+        else:
+            items = items[:self.page_size]
+            has_prev, has_next = direction == 'n', has_more
+        
+        if not items:
+            return None
+        return ItemPage(items, has_prev, has_next)
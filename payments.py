@@ -66,56 +66,73 @@ class PaymentSystem:
                     'fee': fee
                 }
 
-    async def process_crypto_buy(self, user_id: int, crypto_id: int, amount_usd: float, crypto_symbol: str, crypto_price: float) -> Dict:
+    async def process_crypto_buy(self, user_id: int, crypto_id: int, amount_usd: int, crypto_symbol: str, crypto_price: float) -> Dict:
         """Покупка крипты с комиссией админу"""
         fee = amount_usd * CRYPTO_FEE
         amount_after_fee = amount_usd - fee
-        crypto_amount = amount_after_fee / crypto_price
+        crypto_units = int(amount_after_fee / crypto_price * CRYPTO_UNITS)
+        
+        if crypto_units <= 0:
+            return {'success': False, 'message': '❌ Слишком маленькая сумма!'}
         
         async with self.db.pool.acquire() as conn:
             async with conn.transaction():
-                await conn.execute('UPDATE users SET balance = balance - $1 WHERE user_id = $2', amount_usd, user_id)
+                balance = await conn.fetchval('''
+                    UPDATE users SET balance = balance - $1
+                    WHERE user_id = $2 AND balance >= $1
+                    RETURNING balance
+                ''', amount_usd, user_id)
+                
+                if balance is None:
+                    return {'success': False, 'message': '❌ Недостаточно средств!'}
+                
                 await conn.execute('UPDATE users SET balance = balance + $1 WHERE user_id = $2', int(fee), self.admin_id)
                 
-                wallet = await conn.fetchrow('SELECT * FROM crypto_wallets WHERE user_id = $1 AND crypto_id = $2', user_id, crypto_id)
-                
-                if wallet:
-                    total_amount = float(wallet['amount']) + crypto_amount
-                    total_cost = (float(wallet['amount']) * float(wallet['average_buy_price'])) + amount_after_fee
-                    avg_price = total_cost / total_amount
-                    
-                    await conn.execute('''
-                        UPDATE crypto_wallets SET amount = $1, average_buy_price = $2
-                        WHERE user_id = $3 AND crypto_id = $4
-                    ''', total_amount, avg_price, user_id, crypto_id)
-                else:
-                    await conn.execute('''
-                        INSERT INTO crypto_wallets (user_id, crypto_id, amount, average_buy_price)
-                        VALUES ($1, $2, $3, $4)
-                    ''', user_id, crypto_id, crypto_amount, amount_after_fee / crypto_amount)
+                # Средняя цена покупки пересчитывается как средневзвешенная по количеству
+                total_units = await conn.fetchval('''
+                    INSERT INTO crypto_wallets (user_id, crypto_id, amount, average_buy_price)
+                    VALUES ($1, $2, $3, $4)
+                    ON CONFLICT (user_id, crypto_id) DO UPDATE SET
+                        amount = crypto_wallets.amount + EXCLUDED.amount,
+                        average_buy_price = (crypto_wallets.amount * COALESCE(crypto_wallets.average_buy_price, 0)
+                                             + EXCLUDED.amount * EXCLUDED.average_buy_price)
+                                            / (crypto_wallets.amount + EXCLUDED.amount)
+                    RETURNING amount
+                ''', user_id, crypto_id, crypto_units, crypto_price)
         
         return {
             'success': True,
-            'message': f'✅ Куплено {crypto_amount:.8f} {crypto_symbol} за {amount_after_fee:.2f}{CURR}\nКомиссия: {fee:.2f}{CURR}',
-            'crypto_amount': crypto_amount
+            'message': f'✅ Куплено {crypto_units / CRYPTO_UNITS:.8f} {crypto_symbol} за {amount_after_fee:.2f}{CURR}\n'
+                       f'Комиссия: {fee:.2f}{CURR}\n'
+                       f'В кошельке: {total_units / CRYPTO_UNITS:.8f} {crypto_symbol}',
+            'crypto_amount': crypto_units
         }
 
-    async def process_crypto_sell(self, user_id: int, crypto_id: int, crypto_amount: float, crypto_symbol: str, crypto_price: float, avg_price: float) -> Dict:
-        """Продажа крипты с комиссией админу"""
-        usd_amount = crypto_amount * crypto_price
+    async def process_crypto_sell(self, user_id: int, crypto_id: int, crypto_units: int, crypto_symbol: str, crypto_price: float) -> Dict:
+        """Продажа крипты с комиссией админу (crypto_units - в минимальных единицах)"""
+        usd_amount = crypto_units / CRYPTO_UNITS * crypto_price
         fee = usd_amount * CRYPTO_FEE
         usd_after_fee = usd_amount - fee
         
         async with self.db.pool.acquire() as conn:
             async with conn.transaction():
+                wallet = await conn.fetchrow('''
+                    UPDATE crypto_wallets SET amount = amount - $1
+                    WHERE user_id = $2 AND crypto_id = $3 AND amount >= $1
+                    RETURNING amount, average_buy_price
+                ''', crypto_units, user_id, crypto_id)
+                
+                if not wallet:
+                    return {'success': False, 'message': f'❌ Недостаточно {crypto_symbol}!'}
+                
                 await conn.execute('UPDATE users SET balance = balance + $1 WHERE user_id = $2', int(usd_after_fee), user_id)
                 await conn.execute('UPDATE users SET balance = balance + $1 WHERE user_id = $2', int(fee), self.admin_id)
         
-        profit = (crypto_price - avg_price) * crypto_amount
+        profit = (crypto_price - (wallet['average_buy_price'] or 0)) * crypto_units / CRYPTO_UNITS
         
         return {
             'success': True,
-            'message': f'✅ Продано {crypto_amount:.8f} {crypto_symbol} за {usd_after_fee:.2f}{CURR}\nКомиссия: {fee:.2f}{CURR}\nПрибыль: {profit:+.2f}{CURR}'
+            'message': f'✅ Продано {crypto_units / CRYPTO_UNITS:.8f} {crypto_symbol} за {usd_after_fee:.2f}{CURR}\nКомиссия: {fee:.2f}{CURR}\nПрибыль: {profit:+.2f}{CURR}'
         }
 
     async def get_admin_balance(self) -> int:
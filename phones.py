@@ -4,6 +4,7 @@ from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from database import Database
 from confirmations import ConfirmationSystem
+from catalog import Catalog
 from config import *
 import random
 
@@ -25,30 +26,67 @@ class PhoneShop:
             'OnePlus': {'min_price': 35000, 'max_price': 80000, 'camera': 50},
             'Sony': {'min_price': 45000, 'max_price': 120000, 'camera': 52}
         }
-
-    async def show_phone_shop(self, message: types.Message):
-        keyboard = InlineKeyboardMarkup(row_width=2)
         
-        for brand in list(self.phone_brands.keys())[:8]:
-            price_range = self.phone_brands[brand]
-            btn_text = f"{brand} ({price_range['min_price']//1000}к - {price_range['max_price']//1000}к)"
-            keyboard.add(InlineKeyboardButton(btn_text, callback_data=f"phone_buy_{brand}"))
+        # Модели от администрации (приходят из кэша товаров)
+        self.custom_phones = []
         
-        keyboard.add(
-            InlineKeyboardButton("📋 Мои телефоны", callback_data="my_phones"),
-            InlineKeyboardButton("◀️ Назад", callback_data="menu")
-        )
+        self.rebuild_catalog()
+
+    def rebuild_catalog(self):
+        """Пересобрать каталог после изменения списка моделей"""
+        brands = [{'id': brand, 'name': brand, 'price': info['min_price'], **info} for brand, info in self.phone_brands.items()]
         
+        self.catalog = Catalog(
+            brands + self.custom_phones,
+            item_text=lambda phone: '',
+            item_button=lambda phone: (
+                f"{phone['name']} ({phone['min_price']//1000}к - {phone['max_price']//1000}к)"
+                if phone['min_price'] != phone['max_price'] else f"{phone['name']} ({phone['price']//1000}к)"
+            ),
+            view_prefix='phone_buy_',
+            page_prefix='phones_page_',
+            footer=[
+                InlineKeyboardButton("📋 Мои телефоны", callback_data="my_phones"),
+                InlineKeyboardButton("◀️ Назад", callback_data="menu")
+            ]
+        )
+
+    def set_custom_items(self, items: list):
+        """Заменить модели от администрации и пересобрать каталог"""
+        self.custom_phones = [
+            {
+                'id': f"custom_{item['id']}",
+                'catalog_id': item['id'],
+                'name': item['name'],
+                'price': item['price'],
+                'min_price': item['price'],
+                'max_price': item['price'],
+                'camera': item['attributes']['camera']
+            }
+            for item in items
+        ]
+        self.rebuild_catalog()
+
+    async def show_phone_shop(self, message: types.Message):
         await message.reply(
             "📱 *МАГАЗИН ТЕЛЕФОНОВ* 📱\n\n"
             "Выберите марку телефона:",
             parse_mode="Markdown",
-            reply_markup=keyboard
+            reply_markup=self.catalog.page('all').keyboard
         )
 
+    async def show_phone_page(self, callback_query: types.CallbackQuery, page: int):
+        catalog_page = self.catalog.page('all', page)
+        if catalog_page:
+            await callback_query.message.edit_reply_markup(reply_markup=catalog_page.keyboard)
+
     async def select_phone_brand(self, callback_query: types.CallbackQuery, state: FSMContext):
         brand = callback_query.data.replace('phone_buy_', '')
-        price_range = self.phone_brands[brand]
+        price_range = self.catalog.get(brand)
+        
+        if not price_range:
+            await callback_query.answer("❌ Марка не найдена!", show_alert=True)
+            return
         
         price = random.randint(price_range['min_price'], price_range['max_price'])
         
@@ -58,13 +96,14 @@ class PhoneShop:
             callback_query.message,
             'buy_phone',
             {
-                'text': f"Покупка: *{brand}*\n"
+                'text': f"Покупка: *{price_range['name']}*\n"
                         f"💰 Цена: {price}{CURR}\n"
                         f"📷 Камера: {price_range['camera']} МП\n\n"
                         f"Подтверждаете покупку?",
                 'phone_brand': brand,
                 'phone_price': price,
-                'phone_camera': price_range['camera']
+                'phone_camera': price_range['camera'],
+                'catalog_id': price_range.get('catalog_id')
             },
             'BUY_PHONE_CONFIRM',
             'CANCEL'
@@ -74,13 +113,31 @@ class PhoneShop:
         data = await state.get_data()
         confirmed = data.get('confirmed_data', {})
         
-        result = await self.db.buy_phone(
-            callback_query.from_user.id,
-            confirmed['phone_brand'],
-            confirmed['phone_price']
-        )
+        # Модель от администрации - покупка со склада
+        if confirmed.get('catalog_id'):
+            result = await self.db.buy_catalog_item(callback_query.from_user.id, confirmed['catalog_id'])
+            await callback_query.message.edit_text(result['message'])
+            await state.finish()
+            return
         
-        await callback_query.message.edit_text(result['message'], parse_mode="Markdown")
+        result = await self.db.purchase(callback_query.from_user.id, confirmed['phone_price'], 'phones', {
+            'user_id': callback_query.from_user.id,
+            'brand': confirmed['phone_brand'],
+            'model': confirmed['phone_brand'],
+            'price': confirmed['phone_price'],
+            'camera': confirmed['phone_camera']
+        })
+        
+        if not result['success']:
+            await callback_query.message.edit_text(result['message'])
+            await state.finish()
+            return
+        
+        await callback_query.message.edit_text(
+            f"✅ Телефон *{confirmed['phone_brand']}* куплен за {confirmed['phone_price']:,}{CURR}!\n"
+            f"💳 Баланс: {result['balance']:,}{CURR}",
+            parse_mode="Markdown"
+        )
         await state.finish()
 
     async def show_my_phones(self, callback_query: types.CallbackQuery):
@@ -4,41 +4,182 @@ from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from database import Database
 from config import *
+from collections import OrderedDict
+import asyncio
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
 
 class SettingsStates(StatesGroup):
     waiting_for_nickname = State()
 
+# Битовые флаги настроек (в БД хранятся одним SMALLINT)
+SHOW_NICKNAME = 1 << 0
+ALLOW_TRADES = 1 << 1
+ALLOW_DUELS = 1 << 2
+ALLOW_TRANSFERS = 1 << 3
+ALLOW_CLAN_INVITES = 1 << 4
+NOTIFICATIONS = 1 << 5
+PRIVATE_MODE = 1 << 6
+HIDE_BALANCE = 1 << 7
+
+SETTING_FLAGS = {
+    'show_nickname': SHOW_NICKNAME,
+    'allow_trades': ALLOW_TRADES,
+    'allow_duels': ALLOW_DUELS,
+    'allow_transfers': ALLOW_TRANSFERS,
+    'allow_clan_invites': ALLOW_CLAN_INVITES,
+    'notifications': NOTIFICATIONS,
+    'private_mode': PRIVATE_MODE,
+    'hide_balance': HIDE_BALANCE
+}
+
+DEFAULT_FLAGS = SHOW_NICKNAME | ALLOW_TRADES | ALLOW_DUELS | ALLOW_TRANSFERS | ALLOW_CLAN_INVITES | NOTIFICATIONS
+
+class SettingsRecord:
+    """Компактные настройки пользователя: флаги в одном int + ник"""
+    __slots__ = ('flags', 'nickname')
+
+    def __init__(self, flags: int = DEFAULT_FLAGS, nickname: str = None):
+        self.flags = flags
+        self.nickname = nickname
+
+    def __getitem__(self, key: str):
+        # Совместимость со старым доступом вида settings['hide_balance']
+        if key == 'nickname':
+            return self.nickname
+        return bool(self.flags & SETTING_FLAGS[key])
+
+    def __setitem__(self, key: str, value):
+        if key == 'nickname':
+            self.nickname = value
+        elif value:
+            self.flags |= SETTING_FLAGS[key]
+        else:
+            self.flags &= ~SETTING_FLAGS[key]
+
+    def has(self, flag: int) -> bool:
+        return bool(self.flags & flag)
+
+    def toggle(self, flag: int):
+        self.flags ^= flag
+
+    def is_default(self) -> bool:
+        return self.flags == DEFAULT_FLAGS and self.nickname is None
+
 class UserSettings:
     def __init__(self, bot, db: Database):
         self.bot = bot
         self.db = db
-        # В реальном проекте эти настройки нужно хранить в БД
-        # Здесь для простоты используем словарь
-        self.user_settings = {}  # user_id -> settings dict
+        # LRU-кэш настроек: user_id -> SettingsRecord (ограничен SETTINGS_CACHE_SIZE)
+        self.user_settings = OrderedDict()
+        # Изменённые, но ещё не записанные в БД настройки (write-behind)
+        self.dirty_settings = {}
+        self.flush_task = None
 
-    def get_default_settings(self):
+    def get_default_settings(self) -> SettingsRecord:
         """Настройки по умолчанию"""
-        return {
-            'nickname': None,
-            'show_nickname': True,
-            'allow_trades': True,
-            'allow_duels': True,
-            'allow_transfers': True,
-            'allow_clan_invites': True,
-            'notifications': True,
-            'private_mode': False,
-            'hide_balance': False
-        }
+        return SettingsRecord()
 
-    async def get_user_settings(self, user_id: int) -> dict:
-        """Получить настройки пользователя"""
-        if user_id not in self.user_settings:
-            self.user_settings[user_id] = self.get_default_settings()
-        return self.user_settings[user_id]
+    def _settings_from_row(self, row) -> SettingsRecord:
+        if not row:
+            return self.get_default_settings()
+        return SettingsRecord(row['flags'], row['nickname'])
 
-    async def save_user_settings(self, user_id: int, settings: dict):
-        """Сохранить настройки пользователя"""
+    def _cache_put(self, user_id: int, settings: SettingsRecord):
+        """Положить настройки в LRU-кэш с вытеснением самых старых"""
         self.user_settings[user_id] = settings
+        self.user_settings.move_to_end(user_id)
+        while len(self.user_settings) > SETTINGS_CACHE_SIZE:
+            self.user_settings.popitem(last=False)
+
+    async def get_user_settings(self, user_id: int) -> SettingsRecord:
+        """Получить настройки пользователя"""
+        if user_id in self.user_settings:
+            self.user_settings.move_to_end(user_id)
+            return self.user_settings[user_id]
+        
+        # Ещё не сброшенные изменения важнее того, что лежит в БД
+        settings = self.dirty_settings.get(user_id)
+        if settings is None:
+            settings = self._settings_from_row(await self.db.get_user_settings(user_id))
+        
+        self._cache_put(user_id, settings)
+        return settings
+
+    async def get_settings_many(self, user_ids: List[int]) -> Dict[int, SettingsRecord]:
+        """Получить настройки сразу для многих пользователей (не больше одного запроса к БД)"""
+        result = {}
+        missing = []
+        
+        for user_id in dict.fromkeys(user_ids):
+            if user_id in self.user_settings:
+                self.user_settings.move_to_end(user_id)
+                result[user_id] = self.user_settings[user_id]
+            elif user_id in self.dirty_settings:
+                result[user_id] = self.dirty_settings[user_id]
+                self._cache_put(user_id, result[user_id])
+            else:
+                missing.append(user_id)
+        
+        if missing:
+            rows = await self.db.get_user_settings_many(missing)
+            for user_id in missing:
+                # Пока шёл запрос, настройки могли успеть сохранить
+                if user_id in self.dirty_settings:
+                    settings = self.dirty_settings[user_id]
+                else:
+                    settings = self._settings_from_row(rows.get(user_id))
+                result[user_id] = settings
+                self._cache_put(user_id, settings)
+        
+        return result
+
+    async def save_user_settings(self, user_id: int, settings: SettingsRecord):
+        """Сохранить настройки пользователя (запись в БД откладывается)"""
+        self._cache_put(user_id, settings)
+        self.dirty_settings[user_id] = settings
+
+    async def flush(self):
+        """Записать накопленные изменения в БД одним пакетом"""
+        if not self.dirty_settings:
+            return
+        
+        dirty, self.dirty_settings = self.dirty_settings, {}
+        
+        # Пользователям с настройками по умолчанию строка в БД не нужна
+        to_delete = [user_id for user_id, settings in dirty.items() if settings.is_default()]
+        to_save = {
+            user_id: (settings.flags, settings.nickname)
+            for user_id, settings in dirty.items() if not settings.is_default()
+        }
+        
+        try:
+            await self.db.save_user_settings_many(to_save, to_delete)
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения настроек: {e}")
+            # Возвращаем изменения в очередь, не перетирая более свежие
+            for user_id, settings in dirty.items():
+                self.dirty_settings.setdefault(user_id, settings)
+
+    async def run_flusher(self):
+        """Фоновая задача периодической записи настроек"""
+        while True:
+            await asyncio.sleep(SETTINGS_FLUSH_INTERVAL)
+            await self.flush()
+
+    def start(self):
+        """Запуск фоновой записи настроек"""
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self.run_flusher())
+
+    async def stop(self):
+        """Остановка фоновой записи с финальным сбросом"""
+        if self.flush_task:
+            self.flush_task.cancel()
+            self.flush_task = None
+        await self.flush()
 
     async def show_settings_menu(self, message: types.Message):
         """Показать меню настроек"""
@@ -127,19 +268,19 @@ class UserSettings:
         settings = await self.get_user_settings(user_id)
         
         setting_map = {
-            'show_nick': 'show_nickname',
-            'private': 'private_mode',
-            'balance': 'hide_balance',
-            'trades': 'allow_trades',
-            'duels': 'allow_duels',
-            'transfers': 'allow_transfers',
-            'clan': 'allow_clan_invites',
-            'notifications': 'notifications'
+            'show_nick': SHOW_NICKNAME,
+            'private': PRIVATE_MODE,
+            'balance': HIDE_BALANCE,
+            'trades': ALLOW_TRADES,
+            'duels': ALLOW_DUELS,
+            'transfers': ALLOW_TRANSFERS,
+            'clan': ALLOW_CLAN_INVITES,
+            'notifications': NOTIFICATIONS
         }
         
-        setting_key = setting_map.get(setting)
-        if setting_key:
-            settings[setting_key] = not settings[setting_key]
+        flag = setting_map.get(setting)
+        if flag:
+            settings.toggle(flag)
             await self.save_user_settings(user_id, settings)
         
         # Обновляем отображение
@@ -150,28 +291,41 @@ class UserSettings:
         settings = await self.get_user_settings(user_id)
         
         permission_map = {
-            'trade': 'allow_trades',
-            'duel': 'allow_duels',
-            'transfer': 'allow_transfers',
-            'clan_invite': 'allow_clan_invites'
+            'trade': ALLOW_TRADES,
+            'duel': ALLOW_DUELS,
+            'transfer': ALLOW_TRANSFERS,
+            'clan_invite': ALLOW_CLAN_INVITES
         }
         
-        permission_key = permission_map.get(action_type)
-        if permission_key:
-            return settings.get(permission_key, True)
+        flag = permission_map.get(action_type)
+        if flag:
+            return settings.has(flag)
         return True
 
-    async def get_display_name(self, user_id: int, username: str = None, first_name: str = None) -> str:
-        """Получить отображаемое имя пользователя"""
-        settings = await self.get_user_settings(user_id)
-        
-        if settings['private_mode']:
+    def format_display_name(self, settings: SettingsRecord, user_id: int, username: str = None, first_name: str = None) -> str:
+        """Отображаемое имя по уже полученным настройкам"""
+        if settings.flags & PRIVATE_MODE:
             return "🔒 Приватный пользователь"
         
-        if settings['show_nickname'] and settings['nickname']:
-            return settings['nickname']
+        if settings.flags & SHOW_NICKNAME and settings.nickname:
+            return settings.nickname
         
         if username:
             return f"@{username}"
         
         return first_name or f"ID{user_id}"
+
+    async def get_display_name(self, user_id: int, username: str = None, first_name: str = None) -> str:
+        """Получить отображаемое имя пользователя"""
+        settings = await self.get_user_settings(user_id)
+        return self.format_display_name(settings, user_id, username, first_name)
+
+    async def get_display_names_many(self, users) -> Dict[int, str]:
+        """Отображаемые имена для списка пользователей (строки с user_id, username, first_name)"""
+        settings_map = await self.get_settings_many([user['user_id'] for user in users])
+        return {
+            user['user_id']: self.format_display_name(
+                settings_map[user['user_id']], user['user_id'], user.get('username'), user.get('first_name')
+            )
+            for user in users
+        }
@@ -3,7 +3,9 @@ from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from database import Database
+from custom_catalog import CustomCatalog
 from config import *
+import json
 
 class ShopAdminStates(StatesGroup):
     waiting_for_item_type = State()
@@ -19,18 +21,13 @@ class ShopAdminStates(StatesGroup):
     waiting_for_item_quantity = State()
 
 class ShopAdmin:
-    def __init__(self, bot, db: Database):
+    def __init__(self, bot, db: Database, custom_catalog: CustomCatalog):
         self.bot = bot
         self.db = db
         self.admin_id = MAIN_ADMIN_ID
         
-        # Хранилище созданных предметов (в реальном проекте нужно сохранять в БД)
-        self.custom_items = {
-            'cars': [],
-            'phones': [],
-            'houses': [],
-            'accessories': []
-        }
+        # Созданные предметы хранятся в БД, список читается из общего кэша товаров
+        self.custom_catalog = custom_catalog
 
     async def check_admin(self, user_id: int) -> bool:
         """Проверка прав администратора"""
@@ -257,13 +254,11 @@ class ShopAdmin:
         
         # Сохраняем предмет
         item = {
-            'id': len(self.custom_items[data['item_type'] + 's']) + 1,
             'name': data['item_name'],
             'description': data['item_description'],
             'price': data['item_price'],
             'quantity': quantity,
-            'created_by': message.from_user.id,
-            'created_at': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            'created_by': message.from_user.id
         }
         
         # Добавляем специфические поля
@@ -276,7 +271,25 @@ class ShopAdmin:
             item['area'] = data['item_area']
             item['comfort'] = data['item_comfort']
         
-        self.custom_items[data['item_type'] + 's'].append(item)
+        # Характеристики для склада
+        if data['item_type'] == 'car':
+            attributes = {'speed': item['speed']}
+        elif data['item_type'] == 'phone':
+            attributes = {'camera': item['camera']}
+        elif data['item_type'] == 'house':
+            attributes = {'rooms': item['rooms'], 'area': item['area'], 'comfort': item['comfort']}
+        else:
+            attributes = {'category': 'аксессуары', 'style': 50}
+        
+        await self.db.add_items_bulk('catalog', [{
+            'item_type': data['item_type'],
+            'name': item['name'],
+            'description': item['description'],
+            'price': item['price'],
+            'attributes': json.dumps(attributes),
+            'stock': quantity,
+            'created_by': item['created_by']
+        }])
         
         # Формируем сообщение о создании
         type_names = {
@@ -312,31 +325,24 @@ class ShopAdmin:
         
         text = "📋 *СОЗДАННЫЕ ПРЕДМЕТЫ*\n\n"
         
-        if self.custom_items['cars']:
-            text += "*🚗 Машины:*\n"
-            for item in self.custom_items['cars']:
-                text += f"  • {item['name']} - {item['price']}{CURR} ({item['quantity']} шт)\n"
-            text += "\n"
-        
-        if self.custom_items['phones']:
-            text += "*📱 Телефоны:*\n"
-            for item in self.custom_items['phones']:
-                text += f"  • {item['name']} - {item['price']}{CURR} ({item['quantity']} шт)\n"
-            text += "\n"
-        
-        if self.custom_items['houses']:
-            text += "*🏠 Дома:*\n"
-            for item in self.custom_items['houses']:
-                text += f"  • {item['name']} - {item['price']}{CURR} ({item['quantity']} шт)\n"
-            text += "\n"
-        
-        if self.custom_items['accessories']:
-            text += "*👕 Аксессуары:*\n"
-            for item in self.custom_items['accessories']:
-                text += f"  • {item['name']} - {item['price']}{CURR} ({item['quantity']} шт)\n"
-            text += "\n"
-        
-        if not any(self.custom_items.values()):
+        groups = [
+            ('car', '*🚗 Машины:*'),
+            ('phone', '*📱 Телефоны:*'),
+            ('house', '*🏠 Дома:*'),
+            ('accessory', '*👕 Аксессуары:*')
+        ]
+        
+        has_items = False
+        for item_type, title in groups:
+            items = self.custom_catalog.get_items(item_type)
+            if items:
+                has_items = True
+                text += f"{title}\n"
+                for item in items:
+                    text += f"  • {item['name']} - {item['price']}{CURR}\n"
+                text += "\n"
+        
+        if not has_items:
             text += "Пока нет созданных предметов"
         
         keyboard = InlineKeyboardMarkup()
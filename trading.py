@@ -5,6 +5,7 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from database import Database
 from payments import PaymentSystem
 from confirmations import ConfirmationSystem
+from paginator import ItemPaginator
 from config import *
 
 class TradingStates(StatesGroup):
@@ -16,11 +17,26 @@ class TradingStates(StatesGroup):
     waiting_for_trade_offer = State()
 
 class Trading:
-    def __init__(self, bot, db: Database, payments: PaymentSystem, confirmations: ConfirmationSystem):
+    def __init__(self, bot, db: Database, payments: PaymentSystem, confirmations: ConfirmationSystem, user_settings=None):
         self.bot = bot
         self.db = db
         self.payments = payments
         self.confirmations = confirmations
+        
+        if user_settings is None:
+            from settings import UserSettings
+            user_settings = UserSettings(bot, db)
+        self.user_settings = user_settings
+        
+        self.paginator = ItemPaginator(db)
+        self.baskets = {}  # user_id -> {(item_type, item_id): {'label': ..., 'amount': ...}}
+        self.item_titles = {
+            'crypto': '💰 Криптовалюта',
+            'car': '🚗 Машины',
+            'phone': '📱 Телефоны',
+            'house': '🏠 Дома',
+            'accessory': '👕 Аксессуары'
+        }
 
     async def show_trading_menu(self, message: types.Message):
         """Главное меню торговли"""
@@ -28,6 +44,7 @@ class Trading:
         keyboard.add(
             InlineKeyboardButton("💸 Перевести деньги", callback_data="transfer_money"),
             InlineKeyboardButton("🤝 Обмен предметами", callback_data="trade_items"),
+            InlineKeyboardButton("🛒 Рынок", callback_data="market"),
             InlineKeyboardButton("💰 Продать государству", callback_data="gov_menu"),
             InlineKeyboardButton("📦 Мой инвентарь", callback_data="inventory"),
             InlineKeyboardButton("◀️ Назад", callback_data="menu")
@@ -50,12 +67,11 @@ class Trading:
         )
 
     # ========== ПЕРЕВОД ДЕНЕГ ==========
-    
+
     async def transfer_money_start(self, callback_query: types.CallbackQuery, state: FSMContext, user_settings=None):
         """Начало перевода денег"""
-        from settings import UserSettings
         if user_settings is None:
-            user_settings = UserSettings(self.bot, self.db)
+            user_settings = self.user_settings
         
         # Проверяем настройки отправителя
         sender_check = await user_settings.check_permission(
@@ -84,13 +100,14 @@ class Trading:
         username = message.text.replace('@', '')
         
         # Проверяем настройки получателя
-        from settings import UserSettings
-        user_settings = UserSettings(self.bot, self.db)
+        user_settings = self.user_settings
+        
+        data = await state.get_data()
         
         async with self.db.pool.acquire() as conn:
             receiver = await conn.fetchrow('SELECT * FROM users WHERE username ILIKE $1', username)
             
-            if receiver:
+            if receiver and data['trade_type'] == 'money':
                 receiver_check = await user_settings.check_permission(receiver['user_id'], 'transfer')
                 if not receiver_check:
                     await message.reply(f"❌ @{username} запретил получать переводы в настройках!")
@@ -98,14 +115,13 @@ class Trading:
                     return
         
         await state.update_data(to_username=username)
-        
-        data = await state.get_data()
+        data['to_username'] = username
         
         if data['trade_type'] == 'money':
             await message.reply("Введите сумму перевода:")
             await TradingStates.waiting_for_amount.set()
         else:
-            await self.show_user_items_for_trade(message, state)
+            await self.confirm_basket(message, state, receiver)
 
     async def process_amount(self, message: types.Message, state: FSMContext):
         """Обработка суммы перевода"""
@@ -159,12 +175,11 @@ class Trading:
         await state.finish()
 
     # ========== ОБМЕН ПРЕДМЕТАМИ ==========
-    
+
     async def trade_items_start(self, callback_query: types.CallbackQuery, state: FSMContext, user_settings=None):
-        """Начало обмена предметами"""
-        from settings import UserSettings
+        """Корзина обмена: можно собрать несколько предметов и отправить их одному получателю"""
         if user_settings is None:
-            user_settings = UserSettings(self.bot, self.db)
+            user_settings = self.user_settings
         
         # Проверяем настройки
         sender_check = await user_settings.check_permission(
@@ -179,224 +194,246 @@ class Trading:
             )
             return
         
+        await state.finish()
+        
+        basket = self.baskets.get(callback_query.from_user.id, {})
+        
+        text = "🤝 *ОБМЕН ПРЕДМЕТАМИ*\n\n🧺 *Корзина:*\n"
+        if basket:
+            for entry in basket.values():
+                text += f"• {entry['label']}\n"
+        else:
+            text += "пусто\n"
+        text += f"\nДобавьте предметы (до {TRADE_BASKET_MAX_ITEMS} шт) и отправьте их одному получателю."
+        
         keyboard = InlineKeyboardMarkup(row_width=2)
-        keyboard.add(
-            InlineKeyboardButton("💰 Криптовалюта", callback_data="trade_crypto"),
-            InlineKeyboardButton("🚗 Машины", callback_data="trade_cars"),
-            InlineKeyboardButton("📱 Телефоны", callback_data="trade_phones"),
-            InlineKeyboardButton("🏠 Дома", callback_data="trade_houses"),
-            InlineKeyboardButton("👕 Аксессуары", callback_data="trade_accessories"),
-            InlineKeyboardButton("◀️ Назад", callback_data="trading_menu")
-        )
+        keyboard.add(*[
+            InlineKeyboardButton(title, callback_data=f"trade_pick_{item_type}")
+            for item_type, title in self.item_titles.items()
+        ])
+        if basket:
+            keyboard.add(
+                InlineKeyboardButton("📨 Отправить", callback_data="trade_send"),
+                InlineKeyboardButton("🗑 Очистить", callback_data="trade_clear")
+            )
+        keyboard.add(InlineKeyboardButton("◀️ Назад", callback_data="trading_menu"))
         
-        await callback_query.message.edit_text(
-            "🤝 *ОБМЕН ПРЕДМЕТАМИ*\n\n"
-            "Что хотите передать?",
-            parse_mode="Markdown",
-            reply_markup=keyboard
-        )
-        await state.update_data(trade_type='item')
-        await TradingStates.waiting_for_trade_type.set()
+        await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
-    async def show_user_items_for_trade(self, message: types.Message, state: FSMContext):
-        """Показать предметы пользователя для обмена"""
-        data = await state.get_data()
-        trade_type = data.get('trade_subtype', data.get('trade_type'))
-        user_id = message.from_user.id
-        
-        items = []
-        if trade_type == 'crypto':
-            items = await self.db.get_user_crypto_wallet(user_id)
-        elif trade_type == 'cars':
-            items = await self.db.get_user_cars(user_id)
-        elif trade_type == 'phones':
-            items = await self.db.get_user_phones(user_id)
-        elif trade_type == 'houses':
-            async with self.db.pool.acquire() as conn:
-                items = await conn.fetch('SELECT * FROM houses WHERE user_id = $1', user_id)
-        elif trade_type == 'accessories':
-            items = await self.db.get_user_accessories(user_id)
+    async def get_crypto_items(self, user_id: int) -> list:
+        """Криптовалюта пользователя: (id, подпись, количество)"""
+        wallet = await self.db.get_user_crypto_wallet(user_id)
+        return [
+            (item['crypto_id'], f"{item['symbol']}: {item['amount'] / CRYPTO_UNITS:.8f}", item['amount'])
+            for item in wallet
+        ]
+
+    def item_label(self, item_type: str, item: dict) -> str:
+        if item_type == 'car':
+            return f"🚗 {item['model']}"
+        if item_type == 'phone':
+            return f"📱 {item['model']}"
+        if item_type == 'house':
+            return f"🏠 {item['house_name']}"
+        return f"👕 {item['accessory_name']}"
+
+    async def show_trade_picker(self, callback_query: types.CallbackQuery, item_type: str, cursor: str = ''):
+        """Выбор предметов категории в корзину (предметы - постранично)"""
+        page = None
+        if item_type == 'crypto':
+            items = await self.get_crypto_items(callback_query.from_user.id)
+        else:
+            page = await self.paginator.fetch(callback_query.from_user.id, item_type, cursor)
+            items = [(item['id'], self.item_label(item_type, item), None) for item in page.items] if page else []
         
         if not items:
-            await message.reply(f"❌ У вас нет {trade_type} для передачи!")
-            await state.finish()
+            await callback_query.answer("❌ В этой категории у вас ничего нет!", show_alert=True)
             return
         
+        basket = self.baskets.get(callback_query.from_user.id, {})
+        
         keyboard = InlineKeyboardMarkup(row_width=1)
+        for item_id, label, amount in items:
+            mark = "✅" if (item_type, item_id) in basket else "➕"
+            keyboard.add(InlineKeyboardButton(f"{mark} {label}", callback_data=f"trade_toggle_{item_type}_{item_id}"))
+        if page:
+            page.add_nav(keyboard, f"trade_pick_{item_type}_")
+        keyboard.add(InlineKeyboardButton("🧺 К корзине", callback_data="trade_items"))
+        
+        await callback_query.message.edit_text(
+            f"{self.item_titles[item_type]}\n\nНажмите на предмет, чтобы добавить его в корзину или убрать:",
+            reply_markup=keyboard
+        )
+
+    async def toggle_trade_item(self, callback_query: types.CallbackQuery, state: FSMContext):
+        """Добавить предмет в корзину или убрать из неё. Отметка меняется прямо на текущей странице"""
+        item_type, item_id = callback_query.data.replace('trade_toggle_', '').rsplit('_', 1)
+        item_id = int(item_id)
+        basket = self.baskets.setdefault(callback_query.from_user.id, {})
+        
+        keyboard = callback_query.message.reply_markup
+        button = next(
+            (button for row in keyboard.inline_keyboard for button in row if button.callback_data == callback_query.data),
+            None
+        )
+        if not button:
+            await callback_query.answer("❌ Предмет не найден!", show_alert=True)
+            return
+        label = button.text.split(' ', 1)[1]
         
-        for item in items:
-            if trade_type == 'crypto':
-                value = float(item['amount']) * float(item['price'])
-                btn_text = f"{item['symbol']}: {float(item['amount']):.8f} ({value:.2f}{CURR})"
-                callback_data = f"trade_item_crypto_{item['crypto_id']}_{item['amount']}"
-            elif trade_type == 'cars':
-                btn_text = f"{item['model']} - {item['price']:,}{CURR}"
-                callback_data = f"trade_item_car_{item['id']}"
-            elif trade_type == 'phones':
-                btn_text = f"{item['model']} - {item['price']:,}{CURR}"
-                callback_data = f"trade_item_phone_{item['id']}"
-            elif trade_type == 'houses':
-                btn_text = f"{item['house_name']} - {item['price']:,}{CURR}"
-                callback_data = f"trade_item_house_{item['id']}"
-            elif trade_type == 'accessories':
-                btn_text = f"{item['accessory_name']} - {item['price']:,}{CURR}"
-                callback_data = f"trade_item_accessory_{item['id']}"
+        if (item_type, item_id) in basket:
+            del basket[(item_type, item_id)]
+            button.text = f"➕ {label}"
+        else:
+            if len(basket) >= TRADE_BASKET_MAX_ITEMS:
+                await callback_query.answer(f"❌ В корзине не больше {TRADE_BASKET_MAX_ITEMS} предметов!", show_alert=True)
+                return
             
-            keyboard.add(InlineKeyboardButton(btn_text, callback_data=callback_data))
+            # Сколько крипты отдать, спрашиваем отдельно; владение предметами проверяется при передаче
+            if item_type == 'crypto':
+                await self.crypto_amount_start(callback_query, state, item_id)
+                return
+            
+            basket[(item_type, item_id)] = {'label': label, 'amount': None}
+            button.text = f"✅ {label}"
         
-        keyboard.add(InlineKeyboardButton("◀️ Отмена", callback_data="trading_menu"))
+        await callback_query.message.edit_reply_markup(reply_markup=keyboard)
+
+    async def get_wallet_entry(self, user_id: int, crypto_id: int):
+        wallet = await self.db.get_user_crypto_wallet(user_id)
+        return next((entry for entry in wallet if entry['crypto_id'] == crypto_id and entry['amount'] > 0), None)
+
+    async def crypto_amount_start(self, callback_query: types.CallbackQuery, state: FSMContext, crypto_id: int):
+        """Запрос количества монет для корзины"""
+        entry = await self.get_wallet_entry(callback_query.from_user.id, crypto_id)
+        if not entry:
+            await callback_query.answer("❌ Предмет не найден!", show_alert=True)
+            return
         
-        await message.reply("Выберите предмет для передачи:", reply_markup=keyboard)
+        await state.update_data(trade_crypto_id=crypto_id)
+        await TradingStates.waiting_for_item_quantity.set()
+        await callback_query.message.edit_text(
+            f"💰 Сколько {entry['symbol']} добавить в корзину?\n"
+            f"Доступно: {entry['amount'] / CRYPTO_UNITS:.8f}"
+        )
 
-    async def process_trade_item(self, callback_query: types.CallbackQuery, state: FSMContext, user_settings=None):
-        """Обработка выбранного предмета"""
-        from settings import UserSettings
-        if user_settings is None:
-            user_settings = UserSettings(self.bot, self.db)
+    async def process_crypto_amount(self, message: types.Message, state: FSMContext):
+        """Количество монет для корзины (не больше, чем в кошельке)"""
+        try:
+            amount = round(float(message.text.replace(',', '.')) * CRYPTO_UNITS)
+        except (ValueError, OverflowError):
+            await message.reply("❌ Введите корректное количество!")
+            return
         
-        data = callback_query.data.split('_')
-        item_type = data[2]
+        data = await state.get_data()
+        entry = await self.get_wallet_entry(message.from_user.id, data['trade_crypto_id'])
         
-        if item_type == 'crypto':
-            crypto_id = int(data[3])
-            amount = float(data[4])
-            await state.update_data(trade_item_type='crypto', trade_item_id=crypto_id, trade_amount=amount)
-        elif item_type == 'car':
-            car_id = int(data[3])
-            await state.update_data(trade_item_type='car', trade_item_id=car_id)
-        elif item_type == 'phone':
-            phone_id = int(data[3])
-            await state.update_data(trade_item_type='phone', trade_item_id=phone_id)
-        elif item_type == 'house':
-            house_id = int(data[3])
-            await state.update_data(trade_item_type='house', trade_item_id=house_id)
-        elif item_type == 'accessory':
-            accessory_id = int(data[3])
-            await state.update_data(trade_item_type='accessory', trade_item_id=accessory_id)
+        if not entry:
+            await message.reply("❌ Предмет не найден!")
+            await state.finish()
+            return
+        
+        if not 0 < amount <= entry['amount']:
+            await message.reply(f"❌ Количество должно быть больше 0 и не больше {entry['amount'] / CRYPTO_UNITS:.8f}!")
+            return
+        
+        await state.finish()
+        
+        basket = self.baskets.setdefault(message.from_user.id, {})
+        if ('crypto', entry['crypto_id']) not in basket and len(basket) >= TRADE_BASKET_MAX_ITEMS:
+            await message.reply(f"❌ В корзине не больше {TRADE_BASKET_MAX_ITEMS} предметов!")
+            return
+        
+        label = f"{entry['symbol']}: {amount / CRYPTO_UNITS:.8f}"
+        basket[('crypto', entry['crypto_id'])] = {'label': label, 'amount': amount}
+        
+        keyboard = InlineKeyboardMarkup(row_width=1)
+        keyboard.add(
+            InlineKeyboardButton("🧺 К корзине", callback_data="trade_items"),
+            InlineKeyboardButton(self.item_titles['crypto'], callback_data="trade_pick_crypto")
+        )
+        await message.reply(f"✅ В корзине: {label}", reply_markup=keyboard)
+
+    async def clear_basket(self, callback_query: types.CallbackQuery, state: FSMContext):
+        self.baskets.pop(callback_query.from_user.id, None)
+        await self.trade_items_start(callback_query, state)
+
+    async def send_basket_start(self, callback_query: types.CallbackQuery, state: FSMContext):
+        """Запрос получателя корзины"""
+        if not self.baskets.get(callback_query.from_user.id):
+            await callback_query.answer("❌ Корзина пуста!", show_alert=True)
+            return
         
         await callback_query.message.edit_text("Введите @username получателя:")
+        await state.update_data(trade_type='basket')
         await TradingStates.waiting_for_username.set()
 
-    async def confirm_trade(self, message: types.Message, state: FSMContext):
-        """Подтверждение передачи предмета"""
-        username = message.text.replace('@', '')
+    async def confirm_basket(self, message: types.Message, state: FSMContext, receiver):
+        """Подтверждение передачи корзины. Получатель найден один раз и дальше передаётся по id"""
         data = await state.get_data()
+        basket = self.baskets.get(message.from_user.id)
         
-        # Проверяем настройки получателя
-        from settings import UserSettings
-        user_settings = UserSettings(self.bot, self.db)
+        if not basket:
+            await message.reply("❌ Корзина пуста!")
+            await state.finish()
+            return
         
-        async with self.db.pool.acquire() as conn:
-            receiver = await conn.fetchrow('SELECT * FROM users WHERE username ILIKE $1', username)
-            
-            if receiver:
-                receiver_check = await user_settings.check_permission(receiver['user_id'], 'trade')
-                if not receiver_check:
-                    await message.reply(f"❌ @{username} запретил получать предметы в настройках!")
-                    await state.finish()
-                    return
+        if not receiver:
+            await message.reply("❌ Получатель не найден!")
+            await state.finish()
+            return
         
-        # Получаем информацию о предмете
-        item_info = ""
-        if data['trade_item_type'] == 'crypto':
-            crypto = await self.db.get_crypto_by_id(data['trade_item_id'])
-            item_info = f"{data['trade_amount']:.8f} {crypto['symbol']}"
-        elif data['trade_item_type'] == 'car':
-            async with self.db.pool.acquire() as conn:
-                car = await conn.fetchrow('SELECT * FROM cars WHERE id = $1', data['trade_item_id'])
-                item_info = f"🚗 {car['model']}"
-        elif data['trade_item_type'] == 'phone':
-            async with self.db.pool.acquire() as conn:
-                phone = await conn.fetchrow('SELECT * FROM phones WHERE id = $1', data['trade_item_id'])
-                item_info = f"📱 {phone['model']}"
-        elif data['trade_item_type'] == 'house':
-            async with self.db.pool.acquire() as conn:
-                house = await conn.fetchrow('SELECT * FROM houses WHERE id = $1', data['trade_item_id'])
-                item_info = f"🏠 {house['house_name']}"
-        elif data['trade_item_type'] == 'accessory':
-            async with self.db.pool.acquire() as conn:
-                acc = await conn.fetchrow('SELECT * FROM accessories WHERE id = $1', data['trade_item_id'])
-                item_info = f"👕 {acc['accessory_name']}"
+        if receiver['user_id'] == message.from_user.id:
+            await message.reply("❌ Нельзя передать предметы самому себе!")
+            await state.finish()
+            return
+        
+        if not await self.user_settings.check_permission(receiver['user_id'], 'trade'):
+            await message.reply(f"❌ @{data['to_username']} запретил получать предметы в настройках!")
+            await state.finish()
+            return
         
         await self.confirmations.ask_confirmation(
             message,
-            'trade_item',
+            'trade_basket',
             {
                 'text': f"🤝 *Подтверждение передачи*\n\n"
-                        f"Кому: @{username}\n"
-                        f"Предмет: {item_info}\n\n"
-                        f"Подтверждаете?",
+                        f"Кому: @{data['to_username']}\n"
+                        f"Предметы ({len(basket)} шт):\n"
+                        + ''.join(f"• {entry['label']}\n" for entry in basket.values())
+                        + "\nПодтверждаете?",
                 'from_id': message.from_user.id,
-                'to_username': username,
-                'item_type': data['trade_item_type'],
-                'item_id': data['trade_item_id'],
-                'item_amount': data.get('trade_amount')
+                'to_id': receiver['user_id'],
+                'to_username': data['to_username'],
+                'items': [[item_type, item_id, entry['amount']] for (item_type, item_id), entry in basket.items()]
             },
-            'TRADE_ITEM_CONFIRM',
+            'TRADE_BASKET_CONFIRM',
             'CANCEL'
         )
 
-    async def execute_trade(self, callback_query: types.CallbackQuery, state: FSMContext):
-        """Выполнение передачи предмета"""
+    async def execute_basket(self, callback_query: types.CallbackQuery, state: FSMContext):
+        """Передача всей корзины одной транзакцией"""
         data = await state.get_data()
         confirmed = data.get('confirmed_data', {})
         
-        # Находим получателя
-        async with self.db.pool.acquire() as conn:
-            receiver = await conn.fetchrow('SELECT * FROM users WHERE username ILIKE $1', confirmed['to_username'])
-            
-            if not receiver:
-                await callback_query.message.edit_text("❌ Получатель не найден!")
-                await state.finish()
-                return
-            
-            async with conn.transaction():
-                if confirmed['item_type'] == 'crypto':
-                    # Передача крипты
-                    await conn.execute('''
-                        UPDATE crypto_wallets 
-                        SET amount = amount - $1 
-                        WHERE user_id = $2 AND crypto_id = $3
-                    ''', confirmed['item_amount'], confirmed['from_id'], confirmed['item_id'])
-                    
-                    receiver_wallet = await conn.fetchrow('''
-                        SELECT * FROM crypto_wallets 
-                        WHERE user_id = $1 AND crypto_id = $2
-                    ''', receiver['user_id'], confirmed['item_id'])
-                    
-                    if receiver_wallet:
-                        await conn.execute('''
-                            UPDATE crypto_wallets 
-                            SET amount = amount + $1 
-                            WHERE user_id = $2 AND crypto_id = $3
-                        ''', confirmed['item_amount'], receiver['user_id'], confirmed['item_id'])
-                    else:
-                        await conn.execute('''
-                            INSERT INTO crypto_wallets (user_id, crypto_id, amount, average_buy_price)
-                            VALUES ($1, $2, $3, $4)
-                        ''', receiver['user_id'], confirmed['item_id'], confirmed['item_amount'], 0)
-                
-                elif confirmed['item_type'] == 'car':
-                    await conn.execute('''
-                        UPDATE cars SET user_id = $1 WHERE id = $2
-                    ''', receiver['user_id'], confirmed['item_id'])
-                
-                elif confirmed['item_type'] == 'phone':
-                    await conn.execute('''
-                        UPDATE phones SET user_id = $1 WHERE id = $2
-                    ''', receiver['user_id'], confirmed['item_id'])
-                
-                elif confirmed['item_type'] == 'house':
-                    await conn.execute('''
-                        UPDATE houses SET user_id = $1 WHERE id = $2
-                    ''', receiver['user_id'], confirmed['item_id'])
-                
-                elif confirmed['item_type'] == 'accessory':
-                    await conn.execute('''
-                        UPDATE accessories SET user_id = $1 WHERE id = $2
-                    ''', receiver['user_id'], confirmed['item_id'])
+        items = {}
+        crypto = {}
+        for item_type, item_id, amount in confirmed['items']:
+            if item_type == 'crypto':
+                crypto[item_id] = amount
+            else:
+                items.setdefault(item_type, []).append(item_id)
+        
+        result = await self.db.transfer_items(confirmed['from_id'], confirmed['to_id'], items, crypto)
+        
+        if not result['success']:
+            await callback_query.message.edit_text(result['message'])
+            await state.finish()
+            return
+        
+        self.baskets.pop(confirmed['from_id'], None)
         
         await callback_query.message.edit_text(
-            f"✅ Предмет успешно передан пользователю @{confirmed['to_username']}!"
+            f"✅ Передано предметов: {result['count']} пользователю @{confirmed['to_username']}!"
         )
         await state.finish()
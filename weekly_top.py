@@ -1,12 +1,98 @@
 from aiogram import types
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from database import Database
-from config import MAIN_ADMIN_USERNAME
+from notifier import ThrottledSender
+from config import *
+from typing import Dict, List
+import asyncio
+import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 class WeeklyTop:
-    def __init__(self, bot, db: Database):
+    """Недельные топы: раз в неделю (в понедельник 00:00) снимок и призы одной транзакцией, экраны читают снимок из памяти"""
+    def __init__(self, bot, db: Database, user_settings=None, sender: ThrottledSender = None):
         self.bot = bot
         self.db = db
+        self.sender = sender
+        
+        if user_settings is None:
+            from settings import UserSettings
+            user_settings = UserSettings(bot, db)
+        self.user_settings = user_settings
+        
+        # Снимок меняется только раз в неделю - держим его до следующего понедельника
+        self.loaders = {
+            'balance': self.db.get_weekly_top_balance,
+            'referrals': self.db.get_weekly_top_referrals,
+            'clans': self.db.get_weekly_top_clans
+        }
+        self.cache = {}  # board -> (строки снимка, истекает)
+        self.run_task = None
+
+    @staticmethod
+    def next_week_start(now: datetime.datetime = None) -> datetime.datetime:
+        """Ближайший понедельник 00:00 после now"""
+        now = now or datetime.datetime.now()
+        monday = datetime.datetime.combine(now.date() - datetime.timedelta(days=now.weekday()), datetime.time())
+        return monday + datetime.timedelta(days=7)
+
+    async def get_top(self, board: str) -> List[Dict]:
+        cached = self.cache.get(board)
+        if cached and cached[1] > datetime.datetime.now():
+            return cached[0]
+        
+        top = await self.loaders[board]()
+        self.cache[board] = (top, self.next_week_start())
+        return top
+
+    # ========== ПОДВЕДЕНИЕ ИТОГОВ ==========
+
+    async def close_week(self, now: datetime.datetime = None):
+        """Подвести итоги прошедшей недели (пн-вс). Повторный вызов за ту же неделю ничего не делает"""
+        week_end = self.next_week_start(now).date() - datetime.timedelta(days=8)
+        week_start = week_end - datetime.timedelta(days=6)
+        
+        result = await self.db.snapshot_weekly_tops(week_start, week_end, WEEKLY_TOP_SIZE)
+        self.cache.clear()
+        if result is None:
+            return
+        
+        logger.info(f"🏆 Недельные топы {week_start} - {week_end}: призы получили {len(result['winners'])} игроков и {len(result['clan_winners'])} кланов")
+        if not self.sender:
+            return
+        
+        for winner in result['winners']:
+            self.sender.send(
+                winner['user_id'],
+                f"🏆 Итоги недели: вы в призах еженедельного топа!\n💰 Приз: {winner['prize']:,}{CURR}"
+            )
+        for clan in result['clan_winners']:
+            self.sender.send(
+                clan['owner_id'],
+                f"🏰 Итоги недели: ваш клан в призах топа кланов!\n💰 В казну клана: {clan['prize']:,}{CURR}"
+            )
+
+    async def run(self):
+        # Итоги прошлой недели, если бот был выключен в понедельник
+        while True:
+            try:
+                await self.close_week()
+            except Exception as e:
+                logger.error(f"❌ Ошибка подведения недельных топов: {e}")
+            
+            delay = (self.next_week_start() - datetime.datetime.now()).total_seconds()
+            await asyncio.sleep(delay + 1)
+
+    def start(self):
+        if self.run_task is None:
+            self.run_task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.run_task:
+            self.run_task.cancel()
+            self.run_task = None
 
     async def show_weekly_tops(self, message: types.Message):
         keyboard = InlineKeyboardMarkup(row_width=2)
@@ -26,18 +112,19 @@ class WeeklyTop:
         )
 
     async def show_weekly_balance(self, callback_query: types.CallbackQuery):
-        top = await self.db.get_weekly_top_balance()
+        top = await self.get_top('balance')
         
         if not top:
             await callback_query.answer("Топ еще не сформирован!", show_alert=True)
             return
         
+        names = await self.user_settings.get_display_names_many(top)
+        
         text = "💰 *ТОП ПО БАЛАНСУ ЗА НЕДЕЛЮ* 💰\n\n"
         
         for item in top:
             medal = "🥇" if item['rank'] == 1 else "🥈" if item['rank'] == 2 else "🥉" if item['rank'] == 3 else "🔹"
-            name = item['username'] or f"ID{item['user_id']}"
-            text += f"{medal} {item['rank']}. @{name} — {item['balance']}{CURR}\n"
+            text += f"{medal} {item['rank']}. {names[item['user_id']]} — {item['balance']}{CURR}\n"
         
         text += f"\n🏆 Победитель получает приз!\n"
         text += f"📅 Неделя: {top[0]['week_start']} - {top[0]['week_end']}"
@@ -48,18 +135,19 @@ class WeeklyTop:
         await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
     async def show_weekly_referrals(self, callback_query: types.CallbackQuery):
-        top = await self.db.get_weekly_top_referrals()
+        top = await self.get_top('referrals')
         
         if not top:
             await callback_query.answer("Топ еще не сформирован!", show_alert=True)
             return
         
+        names = await self.user_settings.get_display_names_many(top)
+        
         text = "👥 *ТОП ПО РЕФЕРАЛАМ ЗА НЕДЕЛЮ* 👥\n\n"
         
         for item in top:
             medal = "🥇" if item['rank'] == 1 else "🥈" if item['rank'] == 2 else "🥉" if item['rank'] == 3 else "🔹"
-            name = item['username'] or f"ID{item['user_id']}"
-            text += f"{medal} {item['rank']}. @{name} — {item['referral_count']} рефералов\n"
+            text += f"{medal} {item['rank']}. {names[item['user_id']]} — {item['referral_count']} рефералов\n"
         
         text += f"\n🏆 Победитель получает приз!\n"
         text += f"📅 Неделя: {top[0]['week_start']} - {top[0]['week_end']}"
@@ -70,7 +158,7 @@ class WeeklyTop:
         await callback_query.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
     async def show_weekly_clans(self, callback_query: types.CallbackQuery):
-        top = await self.db.get_weekly_top_clans()
+        top = await self.get_top('clans')
         
         if not top:
             await callback_query.answer("Топ еще не сформирован!", show_alert=True)